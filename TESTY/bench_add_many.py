@@ -0,0 +1,68 @@
+"""
+Бенчмарк `MainGeneric.add_many`: вставка через ORM-объекты против пакетной вставки (`bulk=True`).
+
+Вставляет транзакции из `TESTY/data_generator.generate_data` во временную базу SQLite
+и сравнивает время обычного пути (flush + refresh каждой записи) и пакетного пути
+с разными размерами пакета, с возвратом идентификаторов и без.
+
+Запуск:
+    python -m TESTY.bench_add_many
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.dao.base import Base
+from app.dao.generic import MainGeneric
+from app.dao.models import User, Category, Subcategory, Transaction
+from TESTY.data_generator import users, categories, subcategories, generate_data
+
+
+# (название, параметры add_many)
+SCENARIOS = [
+    ("ORM + refresh", {}),
+    ("bulk, пакет 500, ids", {"bulk": True, "chunk_size": 500}),
+    ("bulk, пакет 5000, ids", {"bulk": True, "chunk_size": 5000}),
+    ("bulk, пакет 5000, без ids", {"bulk": True, "chunk_size": 5000, "return_ids": False}),
+]
+
+
+async def run_scenario(params, values):
+    """Вставляет записи в чистую временную базу и возвращает время вставки в секундах."""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}")
+        session_maker = async_sessionmaker(engine, class_=AsyncSession)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(User.__table__.insert(), [{k: v for k, v in u.items() if k != "id"} for u in users])
+            await conn.execute(Category.__table__.insert(), categories)
+            await conn.execute(Subcategory.__table__.insert(), subcategories)
+
+        async with session_maker() as session:
+            started = time.perf_counter()
+            await MainGeneric(Transaction).add_many(session=session, values=values, **params)
+            await session.commit()
+            elapsed = time.perf_counter() - started
+
+        await engine.dispose()
+    return elapsed
+
+
+async def main():
+    logger.remove()  # Логи каждой вставки искажают замер
+    values = generate_data()
+    print(f"Записей: {len(values)}")
+    baseline = None
+    for title, params in SCENARIOS:
+        elapsed = await run_scenario(params, values)
+        baseline = baseline or elapsed
+        print(f"{title:<28} {elapsed:8.3f} с  {len(values) / elapsed:10.0f} зап/с  x{baseline / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
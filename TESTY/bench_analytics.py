@@ -0,0 +1,105 @@
+"""
+Бенчмарк аналитики пользователя (`app/reports/analytics.py`).
+
+Во временной базе SQLite создаются транзакции одного пользователя (по умолчанию 100 000)
+и транзакции других пользователей того же объёма. Затем замеряются (медиана по повторам):
+- холодный запрос: полная загрузка (дата, подкатегория, сумма) по индексу в массивы NumPy и расчёт;
+- повторный запрос: проверка версии данных, массивы из кэша `UserArraysCache` и расчёт;
+- запрос после новых транзакций: догрузка только новых строк и расчёт.
+
+Расчёт — `compute_analytics` (разбивка, помесячная динамика, скользящие средние, выбросы).
+Проверка завершается с кодом 1, если повторный запрос или запрос после новых транзакций
+дольше порога. Холодный запрос выводится для сведения: его время определяется чтением
+строк из SQLite.
+
+Запуск:
+    python -m TESTY.bench_analytics [КОЛИЧЕСТВО_ТРАНЗАКЦИЙ] [ПОРОГ_МС]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+from loguru import logger
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.dao.base import Base
+from app.dao.models import User, Category, Subcategory, Transaction
+from app.reports.analytics import UserArraysCache, compute_analytics
+from app.reports.export import render_pool
+from TESTY.bench_report_memory import make_rows
+from TESTY.data_generator import users, categories, subcategories
+
+
+REPEATS = 7
+INSERT_CHUNK = 50_000
+
+
+async def main():
+    logger.remove()  # Логи искажают замер
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 100.0
+    user_telegram_id = users[0]["telegram_id"]
+    lookup = np.full(max(s["id"] for s in subcategories) + 1, -1, dtype=np.int64)
+    for subcategory in subcategories:
+        lookup[subcategory["id"]] = subcategory["category_id"]
+    names = {subcategory["id"]: subcategory["name"] for subcategory in subcategories}
+    income_category_id = next(c["id"] for c in categories if c["name"] == "Доход")
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'analytics.db')}")
+        session_maker = async_sessionmaker(engine, class_=AsyncSession)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(User.__table__.insert(), [{k: v for k, v in u.items() if k != "id"} for u in users])
+            await conn.execute(Category.__table__.insert(), categories)
+            await conn.execute(Subcategory.__table__.insert(), subcategories)
+            # Транзакции пользователя и столько же транзакций остальных пользователей
+            rows = [dict(row, user_telegram_id=user_telegram_id) for row in make_rows(count)]
+            rows += [row for row in make_rows(count) if row["user_telegram_id"] != user_telegram_id]
+            for start in range(0, len(rows), INSERT_CHUNK):
+                await conn.execute(Transaction.__table__.insert(), rows[start:start + INSERT_CHUNK])
+            await conn.exec_driver_sql("ANALYZE")
+
+        async def analytics(cache: UserArraysCache):
+            started = time.perf_counter()
+            async with session_maker() as session:
+                arrays = await cache.get(session, user_telegram_id)
+            return compute_analytics(arrays, lookup, income_category_id, names), time.perf_counter() - started
+
+        timings = {"холодный": [], "повторный": [], "новые транзакции": []}
+        for _ in range(REPEATS):
+            cache = UserArraysCache()
+            result, elapsed = await analytics(cache)
+            timings["холодный"].append(elapsed)
+            timings["повторный"].append((await analytics(cache))[1])
+            async with engine.begin() as conn:
+                await conn.execute(Transaction.__table__.insert(), [
+                    dict(row, user_telegram_id=user_telegram_id) for row in make_rows(10)
+                ])
+            result, elapsed = await analytics(cache)
+            timings["новые транзакции"].append(elapsed)
+        arrays_bytes = cache.stats()["bytes"]
+        render_pool.shutdown()
+        await engine.dispose()
+
+    print(f"Транзакций пользователя: {result['transactions']}, массивы {arrays_bytes / 2 ** 20:.2f} МиБ, порог {threshold:.0f} мс")
+    print(
+        f"Месяцев: {len(result['months'])}, подкатегорий: {len(result['categories'])}, "
+        f"выбросов: {len(result['outliers'])}"
+    )
+    medians = {title: statistics.median(times) * 1000 for title, times in timings.items()}
+    for title, median in medians.items():
+        print(f"{title:<18} {median:8.1f} мс (медиана из {REPEATS})")
+    if max(medians["повторный"], medians["новые транзакции"]) > threshold:
+        print("ПРОВАЛ: аналитика дольше порога")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Бенчмарк хранилища состояний бота (`app/bot/storage.py`): задержка чтения / записи состояния на обновление.
+
+Для каждого пользователя воспроизводится сценарий ввода транзакции, как в `app/bot/handlers.py`:
+- "Доход": запись `category_id`, переход в `Form.subcategory`;
+- подкатегория: чтение состояния и данных, запись `subcategory_id`, переход в `Form.amount`;
+- сумма: чтение состояния и данных, очистка состояния.
+
+Перед каждым обновлением, как в диспетчере aiogram, читается текущее состояние, а при
+включённой изоляции событий берётся блокировка чата (`RedisEventIsolation`).
+Сравниваются хранилище в памяти и Redis (fakeredis в процессе или настоящий сервер по URL).
+Также выводится размер данных состояния в обычном и компактном JSON.
+
+Запуск:
+    python -m TESTY.bench_fsm_storage [КОЛИЧЕСТВО_ПОЛЬЗОВАТЕЛЕЙ] [REDIS_URL]
+
+Без REDIS_URL нужны пакеты fakeredis и lupa (блокировка выполняется скриптом Lua):
+`pip install fakeredis lupa`.
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import DisabledEventIsolation, MemoryStorage
+from aiogram.fsm.storage.redis import RedisEventIsolation
+from redis.asyncio import Redis
+
+from app.bot.states import Form
+from app.bot.storage import KEY_BUILDER, compact_json_dumps, create_redis_storage
+
+
+BOT_ID = 123456
+CONCURRENCY = 50  # Одновременно обрабатываемых обновлений
+
+
+async def update(storage, isolation, key: StorageKey, step: int, latencies: list):
+    """Одно обновление сценария: блокировка чата, чтение состояния и работа хэндлера."""
+    started = time.perf_counter()
+    async with isolation.lock(key):
+        state = FSMContext(storage=storage, key=key)
+        current = await state.get_state()
+        if step == 0:
+            await state.update_data(category_id=1)
+            await state.set_state(Form.subcategory)
+        elif step == 1:
+            assert current == Form.subcategory.state
+            data = await state.get_data()
+            await state.update_data(category_id=data["category_id"], subcategory_id=6)
+            await state.set_state(Form.amount)
+        else:
+            assert current == Form.amount.state
+            await state.get_data()
+            await state.clear()
+    latencies.append(time.perf_counter() - started)
+
+
+async def run(title: str, storage, isolation, users: int):
+    """Выполняет сценарий для всех пользователей и выводит задержку на обновление."""
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def user_flow(user_id: int):
+        key = StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id)
+        for step in range(3):
+            async with semaphore:
+                await update(storage, isolation, key, step, latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_flow(100_000 + index) for index in range(users)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"{title:<32} обновлений {len(latencies):6d}  "
+        f"p50 {statistics.median(latencies) * 1000:7.3f} мс  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.3f} мс  "
+        f"{len(latencies) / elapsed:8.0f} обн/с"
+    )
+
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    if len(sys.argv) > 2:
+        redis = Redis.from_url(sys.argv[2])
+        redis_title = "Redis"
+    else:
+        from fakeredis import FakeAsyncRedis
+        redis = FakeAsyncRedis()
+        redis_title = "Redis (fakeredis)"
+
+    data = {"category_id": 1, "subcategory_id": 6}
+    print(
+        f"Пользователей: {users}, данные состояния: JSON {len(json.dumps(data))} байт, "
+        f"компактный JSON {len(compact_json_dumps(data))} байт"
+    )
+
+    await run("память", MemoryStorage(), DisabledEventIsolation(), users)
+    storage = create_redis_storage(redis)
+    await run(redis_title, storage, DisabledEventIsolation(), users)
+    await run(f"{redis_title} + блокировка", storage, RedisEventIsolation(redis, key_builder=KEY_BUILDER), users)
+
+    # После сценария состояния очищены, ключей не остаётся; TTL проверяется на незавершённом вводе
+    key = StorageKey(bot_id=BOT_ID, chat_id=1, user_id=1)
+    await FSMContext(storage=storage, key=key).set_state(Form.amount)
+    state_key = KEY_BUILDER.build(key, "state")
+    print(f"Ключей fsm:* после сценария: {len(await redis.keys('fsm:*')) - 1}, TTL состояния {await redis.ttl(state_key)} с")
+    await redis.delete(state_key)
+    await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
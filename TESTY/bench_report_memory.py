@@ -0,0 +1,110 @@
+"""
+Бенчмарк памяти при формировании отчёта: pandas против потоковой выгрузки (`app/reports/export.py`).
+
+Заполняет временную базу SQLite транзакциями и формирует отчёт за всё время двумя способами:
+- pandas: все записи (`find_transactions(paginate=False)`) -> DataFrame -> `to_excel` / `to_csv`;
+- потоковый: порции из курсора (`stream_transactions`) -> `export_report`.
+
+Пиковое потребление памяти измеряется через `tracemalloc` (выделения Python-объектов).
+
+Запуск:
+    python -m TESTY.bench_report_memory [КОЛИЧЕСТВО_ТРАНЗАКЦИЙ]
+"""
+
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+from loguru import logger
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.dao.base import Base
+from app.dao.generic import MainGeneric, get_transactions_statements
+from app.dao.models import User, Category, Subcategory, Transaction
+from app.reports.export import export_report
+from TESTY.data_generator import users, categories, subcategories
+
+
+def make_rows(count: int):
+    """Случайные транзакции пользователей из `data_generator`."""
+    now = datetime.now()
+    for _ in range(count):
+        subcategory = random.choice(subcategories)
+        yield {
+            "user_telegram_id": random.choice(users)["telegram_id"],
+            "date": now - timedelta(minutes=random.randint(0, 60 * 24 * 365 * 3)),
+            "amount": round(random.uniform(10, 5000), 2),
+            "category_id": subcategory["category_id"],
+            "subcategory_id": subcategory["id"],
+            "comment": "Комментарий к транзакции",
+        }
+
+
+async def pandas_report(session_maker, format: str) -> int:
+    """Прежний путь: полный список записей и DataFrame."""
+    async with session_maker() as session:
+        result = await MainGeneric(Transaction).find_transactions(session=session, paginate=False)
+    buffer = io.BytesIO()
+    frame = pd.DataFrame(result["records"])
+    if format == "csv":
+        frame.to_csv(buffer, index=False)
+    else:
+        frame.to_excel(buffer, index=False, engine="openpyxl")
+    return len(buffer.getvalue())
+
+
+async def streaming_report(session_maker, format: str) -> int:
+    """Потоковый путь: порции из курсора сразу пишутся в файл."""
+    buffer = io.BytesIO()
+    columns = get_transactions_statements(())["base"].selected_columns.keys()
+    async with session_maker() as session:
+        chunks = MainGeneric(Transaction).stream_transactions(session=session, chunk_size=1000)
+        await export_report(chunks, format, buffer, columns=columns)
+    return len(buffer.getvalue())
+
+
+async def measure(func, session_maker, format: str):
+    """Возвращает (пик памяти в МиБ, время в секундах, размер файла в байтах)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = await func(session_maker, format)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20, elapsed, size
+
+
+async def main():
+    logger.remove()  # Логи искажают замер
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}")
+        session_maker = async_sessionmaker(engine, class_=AsyncSession)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(User.__table__.insert(), [{k: v for k, v in u.items() if k != "id"} for u in users])
+            await conn.execute(Category.__table__.insert(), categories)
+            await conn.execute(Subcategory.__table__.insert(), subcategories)
+        async with session_maker() as session:
+            await MainGeneric(Transaction).add_many(
+                session=session, values=list(make_rows(count)), bulk=True, chunk_size=5000, return_ids=False
+            )
+            await session.commit()
+
+        print(f"Транзакций: {count}")
+        for format in ("csv", "xlsx"):
+            for title, func in (("pandas", pandas_report), ("потоковый", streaming_report)):
+                peak, elapsed, size = await measure(func, session_maker, format)
+                print(f"{format:<5} {title:<10} пик {peak:8.1f} МиБ  {elapsed:7.2f} с  файл {size / 2 ** 20:6.1f} МиБ")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
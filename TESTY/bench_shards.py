@@ -0,0 +1,89 @@
+"""
+Бенчмарк записи транзакций при разном количестве шардов (`app/dao/shards.py`).
+
+Транзакции многих пользователей записываются пакетами, как в очереди записи бота:
+у каждого шарда один писатель, каждый пакет — отдельная транзакция в шарде.
+Шарды — отдельные временные файлы SQLite с профилем из настроек (WAL и т.д.),
+поэтому писатели разных шардов работают параллельно и не ждут общую блокировку файла.
+
+Запуск:
+    python -m TESTY.bench_shards [ПОЛЬЗОВАТЕЛЕЙ] [ПАКЕТОВ_НА_ПОЛЬЗОВАТЕЛЯ] [РАЗМЕР_ПАКЕТА]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from loguru import logger
+
+from app.dao.generic import MainGeneric
+from app.dao.models import Transaction
+from app.dao.shards import ShardRouter
+from TESTY.data_generator import subcategories
+
+
+SHARD_COUNTS = (1, 2, 4, 8)
+
+
+def make_batch(user_telegram_id: int, size: int):
+    """Пакет случайных транзакций пользователя."""
+    now = datetime.now()
+    rows = []
+    for _ in range(size):
+        subcategory = random.choice(subcategories)
+        rows.append({
+            "user_telegram_id": user_telegram_id,
+            "date": now - timedelta(minutes=random.randint(0, 60 * 24 * 365)),
+            "amount": round(random.uniform(10, 5000), 2),
+            "category_id": subcategory["category_id"],
+            "subcategory_id": subcategory["id"],
+        })
+    return rows
+
+
+async def run(shard_count: int, users: int, batches: int, batch_size: int) -> float:
+    """Записывает users × batches пакетов в shard_count шардов и возвращает время в секундах."""
+    with tempfile.TemporaryDirectory() as directory:
+        router = ShardRouter.from_urls([
+            f"sqlite+aiosqlite:///{os.path.join(directory, f'shard{shard}.db')}" for shard in range(shard_count)
+        ])
+        await router.create_all()
+        payload = {user: [make_batch(user, batch_size) for _ in range(batches)] for user in range(1, users + 1)}
+
+        # Пакеты каждого шарда записывает один писатель, как `WriteQueue`
+        shard_batches = {shard: [] for shard in range(shard_count)}
+        for user, user_batches in payload.items():
+            shard_batches[router.shard_for(user)].extend(user_batches)
+
+        async def writer(shard: int):
+            for rows in shard_batches[shard]:
+                async with router.session(shard, commit=True) as session:
+                    await MainGeneric(Transaction).add_many(session=session, values=rows, bulk=True, return_ids=False)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(writer(shard) for shard in shard_batches))
+        elapsed = time.perf_counter() - started
+        await router.dispose()
+    return elapsed
+
+
+async def main():
+    logger.remove()  # Логи каждой вставки искажают замер
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    batches = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    total = users * batches * batch_size
+    print(f"Пользователей: {users}, пакетов на пользователя: {batches}, записей в пакете: {batch_size}")
+    baseline = None
+    for shard_count in SHARD_COUNTS:
+        elapsed = await run(shard_count, users, batches, batch_size)
+        baseline = baseline or elapsed
+        print(f"шардов {shard_count:<3} {elapsed:8.3f} с  {total / elapsed:10.0f} зап/с  x{baseline / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
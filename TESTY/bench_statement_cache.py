@@ -0,0 +1,80 @@
+"""
+Микро-бенчмарк кэша запросов транзакций (`get_transactions_statements`).
+
+Сравнивает накладные расходы на один вызов до и после кэширования:
+1. Построение запроса: сборка JOIN четырёх таблиц, фильтров и CTE на каждый вызов
+   против получения готового запроса из кэша.
+2. Полный вызов `MainGeneric.find_transactions` (страница по LIMIT/OFFSET) на небольшой базе
+   SQLite в памяти, где время выполнения самого запроса мало и заметны расходы на стороне Python.
+
+Запуск:
+    python -m TESTY.bench_statement_cache
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+import app.dao.generic as generic
+from app.dao.base import Base
+from app.dao.generic import MainGeneric, get_transactions_statements, transactions_query_params
+from app.dao.models import User, Category, Subcategory, Transaction
+from TESTY.data_generator import users, categories, subcategories, generate_data
+
+
+FILTERS = {"username": "LandoCalrissian", "name": "Доход"}
+CALLS = 2000
+
+
+def bench_build(build, calls=CALLS):
+    """Среднее время построения запроса страницы в микросекундах."""
+    start_date, end_date = datetime.now() - timedelta(days=90), datetime.now()
+    started = time.perf_counter()
+    for _ in range(calls):
+        filter_keys, params = transactions_query_params(FILTERS, start_date, end_date)
+        build(filter_keys)["page"]
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def bench_find(session, calls=CALLS // 4):
+    """Среднее время вызова find_transactions в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(calls):
+        await MainGeneric(Transaction).find_transactions(
+            session=session, filters=FILTERS, period="3months", page=2, page_size=10, with_total=False
+        )
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def main():
+    logger.remove()  # Логи каждого вызова искажают замер
+    uncached = get_transactions_statements.__wrapped__
+
+    print(f"Построение запроса, мкс/вызов: без кэша {bench_build(uncached):8.1f}, "
+          f"с кэшем {bench_build(get_transactions_statements):8.1f}")
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(User.__table__.insert(), [{k: v for k, v in u.items() if k != "id"} for u in users])
+        await conn.execute(Category.__table__.insert(), categories)
+        await conn.execute(Subcategory.__table__.insert(), subcategories)
+        await conn.execute(Transaction.__table__.insert(), generate_data()[:1000])
+
+    async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+        await bench_find(session, calls=50)  # Прогрев
+
+        generic.get_transactions_statements = uncached
+        before = await bench_find(session)
+        generic.get_transactions_statements = get_transactions_statements
+        after = await bench_find(session)
+
+    await engine.dispose()
+    print(f"find_transactions, мкс/вызов:  без кэша {before:8.1f}, с кэшем {after:8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
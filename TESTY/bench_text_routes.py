@@ -0,0 +1,129 @@
+"""
+Бенчмарк маршрутизации текстовых сообщений бота: цепочка фильтров против таблицы `text_routes`.
+
+Для N кнопок (по 5 на хэндлер, как на клавиатурах бота) собираются два диспетчера:
+- цепочка: хэндлеры `@router.message(lambda message: message.text in [...])`, aiogram
+  проверяет фильтры по порядку, пока один не совпадёт;
+- таблица: те же хэндлеры в `TextRoutes` и один хэндлер `dispatch_text` (`app/bot/text_routes.py`).
+
+Сообщение — текст последней кнопки (худший случай для цепочки). Выводится время полной
+обработки обновления диспетчером и отдельно время выбора хэндлера (фильтры цепочки
+против `TextRoutes.resolve`), в микросекундах на обновление.
+
+Запуск:
+    python -m TESTY.bench_text_routes [КОЛИЧЕСТВО_ОБНОВЛЕНИЙ]
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher, Router, types
+from aiogram.types import Chat, Message, Update, User
+
+from app.bot.text_routes import TextRouteFilter, TextRoutes
+
+
+BUTTON_COUNTS = (10, 100, 1000)
+BUTTONS_PER_HANDLER = 5
+ROUNDS = 3
+
+
+def button_groups(buttons: int) -> list:
+    texts = [f"Кнопка {index}" for index in range(buttons)]
+    return [texts[index:index + BUTTONS_PER_HANDLER] for index in range(0, buttons, BUTTONS_PER_HANDLER)]
+
+
+async def handle(message: types.Message):
+    return None
+
+
+def make_handler():
+    """Отдельный хэндлер на группу кнопок, как хэндлеры бота."""
+    async def handler(message: types.Message):
+        return None
+    return handler
+
+
+def chain_dispatcher(groups: list):
+    """Диспетчер с фильтром-лямбдой на каждый хэндлер; возвращает его и список фильтров."""
+    router = Router()
+    filters = []
+    for texts in groups:
+        text_filter = (lambda texts: lambda message: message.text in texts)(list(texts))
+        filters.append(text_filter)
+        router.message(text_filter)(handle)
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp, filters
+
+
+def table_dispatcher(groups: list):
+    """Диспетчер с таблицей маршрутов; возвращает его и таблицу."""
+    routes = TextRoutes()
+    for texts in groups:
+        routes.text(*texts)(make_handler())
+    router = Router()
+
+    @router.message(TextRouteFilter(routes))
+    async def dispatch_text(message: types.Message, text_route, **data):
+        return await text_route.call(message, **data)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp, routes
+
+
+def make_update(update_id: int, text: str) -> Update:
+    user = User(id=1_000_000 + update_id % 1000, is_bot=False, first_name="Нагрузка")
+    return Update(update_id=update_id, message=Message(
+        message_id=update_id, date=datetime.now(), chat=Chat(id=user.id, type="private"), from_user=user, text=text
+    ))
+
+
+async def feed(dp: Dispatcher, bot: Bot, updates: list) -> float:
+    """Лучшее из `ROUNDS` среднее время обработки обновления диспетчером, микросекунды."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for update in updates:
+            await dp.feed_update(bot, update)
+        best = min(best, (time.perf_counter() - started) / len(updates) * 1e6)
+    return best
+
+
+def select(resolve, messages: list) -> float:
+    """Лучшее из `ROUNDS` среднее время выбора хэндлера, микросекунды."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        for message in messages:
+            resolve(message)
+        best = min(best, (time.perf_counter() - started) / len(messages) * 1e6)
+    return best
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    bot = Bot(token="123456:" + "A" * 35)
+    print(f"Обновлений: {count}, текст последней кнопки")
+    print(f"{'кнопок':>7} {'цепочка, мкс':>14} {'таблица, мкс':>14} {'выбор: цепочка':>16} {'выбор: таблица':>16}")
+    for buttons in BUTTON_COUNTS:
+        groups = button_groups(buttons)
+        text = groups[-1][-1]
+        updates = [make_update(update_id, text) for update_id in range(count)]
+        messages = [update.message for update in updates]
+
+        chain, filters = chain_dispatcher(groups)
+        table, routes = table_dispatcher(groups)
+        chain_feed = await feed(chain, bot, updates)
+        table_feed = await feed(table, bot, updates)
+        chain_select = select(lambda message: next(f for f in filters if f(message)), messages)
+        table_select = select(lambda message: routes.resolve(None, message.text), messages)
+        print(f"{buttons:>7} {chain_feed:>14.1f} {table_feed:>14.1f} {chain_select:>16.2f} {table_select:>16.2f}")
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
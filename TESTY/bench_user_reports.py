@@ -0,0 +1,135 @@
+"""
+Бенчмарк отчёта по транзакциям пользователя против отчёта по всей таблице.
+
+Раньше бот формировал отчёт без фильтров: каждый запрос читал и выгружал транзакции
+всех пользователей. Теперь отчёт ограничен фильтром `user_telegram_id`
+(`app/reports/builder.user_report_filters`) и читается по индексу `ix_transactions_user_date`.
+
+Во временной базе SQLite создаются USERS пользователей по PER_USER транзакций,
+затем отчёт за всё время формируется (`stream_transactions` -> `export_report`):
+- по всей таблице (прежнее поведение бота);
+- для нескольких случайных пользователей (среднее время).
+
+Также проверяется план запроса отчёта по пользователю: таблица транзакций должна
+читаться через индекс. При размере по умолчанию (10 000 × 1 000) заполнение базы
+занимает несколько минут, а отчёт по всей таблице — десятки минут; для быстрой
+проверки уменьшите параметры.
+
+Запуск:
+    python -m TESTY.bench_user_reports [USERS] [PER_USER] [ФОРМАТ]
+"""
+
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.dao.base import Base
+from app.dao.generic import MainGeneric, get_transactions_statements
+from app.dao.models import User, Category, Subcategory, Transaction
+from app.reports.builder import user_report_filters
+from app.reports.export import export_report
+from TESTY.data_generator import categories, subcategories
+from TESTY.query_plans import explain, uses_index
+
+
+FIRST_USER_ID = 1_000_000
+INSERT_CHUNK = 50_000
+SAMPLE_USERS = 5
+
+
+def make_rows(user_count: int, per_user: int):
+    """Порции по INSERT_CHUNK транзакций: у каждого пользователя ровно per_user транзакций."""
+    now = datetime.now()
+    chunk = []
+    for index in range(user_count):
+        user_telegram_id = FIRST_USER_ID + index
+        for _ in range(per_user):
+            subcategory = random.choice(subcategories)
+            chunk.append({
+                "user_telegram_id": user_telegram_id,
+                "date": now - timedelta(minutes=random.randint(0, 60 * 24 * 365 * 3)),
+                "amount": round(random.uniform(10, 5000), 2),
+                "category_id": subcategory["category_id"],
+                "subcategory_id": subcategory["id"],
+                "comment": "Комментарий к транзакции",
+            })
+            if len(chunk) == INSERT_CHUNK:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+async def build(session_maker, filters, format: str):
+    """Формирует отчёт за всё время и возвращает (время в секундах, размер файла в байтах)."""
+    buffer = io.BytesIO()
+    columns = get_transactions_statements(())["base"].selected_columns.keys()
+    started = time.perf_counter()
+    async with session_maker() as session:
+        chunks = MainGeneric(Transaction).stream_transactions(session=session, filters=filters, chunk_size=1000)
+        await export_report(chunks, format, buffer, columns=columns)
+    return time.perf_counter() - started, len(buffer.getvalue())
+
+
+async def main():
+    logger.remove()  # Логи искажают замер
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    format = sys.argv[3] if len(sys.argv) > 3 else "xlsx"
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'users.db')}")
+        session_maker = async_sessionmaker(engine, class_=AsyncSession)
+
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(User.__table__.insert(), [
+                {"telegram_id": FIRST_USER_ID + index, "username": f"user{index}"} for index in range(user_count)
+            ])
+            await conn.execute(Category.__table__.insert(), categories)
+            await conn.execute(Subcategory.__table__.insert(), subcategories)
+            for chunk in make_rows(user_count, per_user):
+                await conn.execute(Transaction.__table__.insert(), chunk)
+            await conn.exec_driver_sql("ANALYZE")
+        print(
+            f"Пользователей: {user_count}, транзакций на пользователя: {per_user}, "
+            f"всего: {user_count * per_user} (заполнение {time.perf_counter() - started:.0f} с)"
+        )
+
+        sample = random.sample(range(FIRST_USER_ID, FIRST_USER_ID + user_count), min(SAMPLE_USERS, user_count))
+        filters = user_report_filters(sample[0])
+        statement = get_transactions_statements(tuple(sorted(filters)))["all"]
+        async with engine.connect() as conn:
+            plan = await conn.run_sync(lambda connection: explain(connection, statement))
+        print("План запроса отчёта по пользователю:")
+        for step in plan:
+            print(f"    {step}")
+
+        user_times = []
+        for user_telegram_id in sample:
+            elapsed, size = await build(session_maker, user_report_filters(user_telegram_id), format)
+            user_times.append(elapsed)
+        user_elapsed = sum(user_times) / len(user_times)
+        print(f"{format:<5} по пользователю  {user_elapsed * 1000:10.1f} мс  файл {size / 2 ** 10:9.1f} КиБ")
+
+        full_elapsed, size = await build(session_maker, None, format)
+        print(f"{format:<5} вся таблица      {full_elapsed * 1000:10.1f} мс  файл {size / 2 ** 10:9.1f} КиБ")
+        print(f"Отчёт по пользователю быстрее в {full_elapsed / user_elapsed:.0f} раз")
+        await engine.dispose()
+
+    if not uses_index(plan):
+        print("ПРОВАЛ: отчёт по пользователю читает транзакции без индекса")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""
+Проверка задержки цикла событий при формировании отчётов (`app/reports/export.py`).
+
+Во временной базе SQLite создаются транзакции, затем несколько отчётов XLSX формируются
+одновременно — в текущем потоке и через пул `RenderPool`. Параллельно задача-монитор
+каждые 10 мс засыпает и измеряет, на сколько позже запланированного она просыпается:
+это время, на которое были бы задержаны обновления бота и запросы API.
+
+Проверка завершается с кодом 1, если 99-й перцентиль задержки при формировании через пул
+превышает порог. Максимум выводится для сведения: единичные пики зависят от планировщика
+ОС и конкуренции потоков за GIL.
+
+Запуск:
+    python -m TESTY.check_loop_lag [КОЛИЧЕСТВО_ТРАНЗАКЦИЙ] [ПОРОГ_P99_МС]
+"""
+
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.dao.base import Base
+from app.dao.generic import MainGeneric
+from app.dao.models import User, Category, Subcategory, Transaction
+from app.reports.export import RenderPool, export_report
+from TESTY.bench_report_memory import make_rows
+from TESTY.data_generator import users, categories, subcategories
+
+
+INTERVAL = 0.01  # Период монитора, секунды
+CONCURRENT_REPORTS = 4
+
+
+async def monitor(lags: list, stop: asyncio.Event):
+    """Записывает задержку пробуждения относительно запланированного времени."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        planned = loop.time() + INTERVAL
+        await asyncio.sleep(INTERVAL)
+        lags.append(max(0.0, loop.time() - planned))
+
+
+async def build(session_maker, pool):
+    buffer = io.BytesIO()
+    async with session_maker() as session:
+        chunks = MainGeneric(Transaction).stream_transactions(session=session, chunk_size=1000)
+        if pool is None:
+            await export_report(chunks, "xlsx", buffer)
+        else:
+            async with pool.slot():
+                await export_report(chunks, "xlsx", buffer, pool=pool)
+    return len(buffer.getvalue())
+
+
+async def measure(session_maker, pool):
+    """Формирует отчёты одновременно и возвращает (макс. задержка мс, p99 мс, время с)."""
+    lags = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(monitor(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(build(session_maker, pool) for _ in range(CONCURRENT_REPORTS)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await watcher
+    lags.sort()
+    return lags[-1] * 1000, lags[int(len(lags) * 0.99) - 1] * 1000, elapsed
+
+
+async def main():
+    logger.remove()  # Логи искажают замер
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 50.0
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'lag.db')}")
+        session_maker = async_sessionmaker(engine, class_=AsyncSession)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(User.__table__.insert(), [{k: v for k, v in u.items() if k != "id"} for u in users])
+            await conn.execute(Category.__table__.insert(), categories)
+            await conn.execute(Subcategory.__table__.insert(), subcategories)
+        async with session_maker() as session:
+            await MainGeneric(Transaction).add_many(
+                session=session, values=list(make_rows(count)), bulk=True, chunk_size=5000, return_ids=False
+            )
+            await session.commit()
+
+        print(f"Транзакций: {count}, одновременных отчётов: {CONCURRENT_REPORTS}, порог p99: {threshold:.0f} мс")
+        pool = RenderPool(workers=2, max_pending=CONCURRENT_REPORTS)
+        results = {}
+        for title, render_pool in (("в цикле событий", None), ("пул потоков", pool)):
+            worst, p99, elapsed = await measure(session_maker, render_pool)
+            results[title] = p99
+            print(f"{title:<16} задержка макс {worst:8.1f} мс  p99 {p99:7.1f} мс  время {elapsed:6.2f} с")
+        pool.shutdown()
+        await engine.dispose()
+
+    if results["пул потоков"] > threshold:
+        print("ПРОВАЛ: p99 задержки цикла событий превышает порог")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""
+Нагрузочный тест приёма обновлений через вебхук (`app/bot/webhook.py`).
+
+Локально поднимаются:
+- заглушка Bot API Telegram (aiohttp): отвечает на любой метод сообщением
+  с задержкой `API_DELAY`, как если бы бот обращался к Telegram;
+- приложение FastAPI с эндпоинтом вебхука на uvicorn; обновления обрабатываются
+  настоящими хэндлерами бота (`dp`) от имени бота, направленного на заглушку.
+
+Клиент отправляет синтетические обновления ("/start", "Помощь", "Отчёт" от разных
+пользователей) с заданной степенью параллелизма и измеряет:
+- пропускную способность и задержку ответа вебхука (подтверждение приёма);
+- время до окончания обработки всех обновлений хэндлерами.
+
+С адресом URL обновления отправляются на уже запущенный сервер (`python -m app.main webhook`,
+в том числе с несколькими процессами); измеряются только ответы вебхука.
+
+Запуск:
+    python -m TESTY.load_webhook [КОЛИЧЕСТВО_ОБНОВЛЕНИЙ] [ПАРАЛЛЕЛЬНО] [URL]
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import time
+
+import aiohttp
+import uvicorn
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+from fastapi import FastAPI
+from loguru import logger
+
+from app.bot.bot import dp
+from app.bot.webhook import SECRET_HEADER, WebhookProcessor, create_webhook_router
+from app.settings.config import webhook_path, webhook_max_concurrency, webhook_max_pending
+
+
+API_DELAY = 0.02  # Задержка ответа заглушки Bot API, секунды
+SECRET = "load-test"
+TEXTS = ["/start", "Помощь", "Отчёт"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_update(update_id: int) -> dict:
+    """Синтетическое обновление с сообщением от пользователя."""
+    user_id = 1_000_000 + update_id % 1000
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Нагрузка"},
+            "text": TEXTS[update_id % len(TEXTS)],
+        },
+    }
+
+
+async def fake_api(request: web.Request) -> web.Response:
+    """Заглушка Bot API: любой метод возвращает отправленное сообщение."""
+    await asyncio.sleep(API_DELAY)
+    return web.json_response({"ok": True, "result": {
+        "message_id": 1, "date": int(time.time()), "chat": {"id": 1, "type": "private"}, "text": "ok",
+    }})
+
+
+async def post_updates(url: str, count: int, concurrency: int, secret: str):
+    """Отправляет обновления и возвращает (задержки ответов, коды ответов, время)."""
+    latencies, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, headers={SECRET_HEADER: secret}) as session:
+        async def post(update_id: int):
+            async with semaphore:
+                started = time.perf_counter()
+                async with session.post(url, json=make_update(update_id)) as response:
+                    await response.read()
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(update_id) for update_id in range(count)))
+        return latencies, statuses, time.perf_counter() - started
+
+
+def report(latencies: list, statuses: dict, elapsed: float):
+    latencies.sort()
+    print(
+        f"Ответы вебхука: {len(latencies) / elapsed:8.0f} запросов/с  "
+        f"p50 {latencies[len(latencies) // 2] * 1000:6.1f} мс  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:6.1f} мс  коды {statuses}"
+    )
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f"Обновлений: {count}, параллельно: {concurrency}")
+
+    if len(sys.argv) > 3:
+        report(*await post_updates(sys.argv[3], count, concurrency, os.getenv("webhook_secret", "")))
+        return
+
+    logger.remove()  # Логи хэндлеров искажают замер
+    api_runner = web.AppRunner(web.Application())
+    api_runner.app.router.add_route("*", "/{tail:.*}", fake_api)
+    await api_runner.setup()
+    api_port = free_port()
+    await web.TCPSite(api_runner, "127.0.0.1", api_port).start()
+
+    bot = Bot(
+        token="123456:" + "A" * 35,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{api_port}"))
+    )
+    processor = WebhookProcessor(dp, bot, max_concurrency=webhook_max_concurrency, max_pending=webhook_max_pending)
+    app = FastAPI()
+    app.include_router(create_webhook_router(processor, secret=SECRET))
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    report(*await post_updates(f"http://127.0.0.1:{port}{webhook_path}", count, concurrency, SECRET))
+    started = time.perf_counter()
+    await processor.stop(emit_shutdown=False)
+    stats = processor.stats()
+    print(
+        f"Обработка: дообработка после последнего ответа {time.perf_counter() - started:6.2f} с, "
+        f"обработано {stats['processed']}, ошибок {stats['failed']}, отклонено {stats['rejected']}, "
+        f"среднее {stats['avg_process_ms']:.1f} мс (задержка Bot API {API_DELAY * 1000:.0f} мс)"
+    )
+
+    server.should_exit = True
+    await serving
+    await bot.session.close()
+    await api_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
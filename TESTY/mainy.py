@@ -36,6 +36,8 @@ async def main():
 
     print("=== Добавляем несколько (10000) рандомных транзакций:")
     #await POTY.test_add_many_transactions()
+    print("=== Добавляем несколько (10000) рандомных транзакций пакетной вставкой:")
+    #await POTY.test_add_many_transactions_bulk()
     print("=== ")
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+"""
+Проверка планов запросов `MainGeneric.find_transactions` (EXPLAIN QUERY PLAN).
+
+Для каждой формы фильтров, которую используют бот и API, берутся те же готовые запросы,
+что выполняет `find_transactions` (`get_transactions_statements`: подсчёт записей, все записи,
+страница, страница по курсору), с параметрами `transactions_query_params`, и проверяется,
+что таблица `transactions` читается через индекс, а не полным сканированием. Изменение
+формы рабочих запросов сразу отражается в проверке.
+
+Проверка выполняется на временной базе SQLite в памяти с тестовыми данными
+из `TESTY/data_generator.py`, поэтому не зависит от рабочей базы.
+
+Запуск:
+    python -m TESTY.query_plans
+"""
+
+from datetime import datetime
+
+from sqlalchemy import create_engine
+
+from app.dao.base import Base
+from app.dao.generic import get_period_bounds, get_transactions_statements, transactions_query_params
+from app.dao.models import User, Category, Subcategory, Transaction
+from TESTY.data_generator import users, categories, subcategories, generate_data
+
+
+# Формы фильтров: (название, фильтры, период)
+FILTER_SHAPES = [
+    ("без фильтров", {}, "all"),
+    ("за месяц", {}, "month"),
+    ("по пользователю", {"user_telegram_id": 12345678}, "all"),
+    ("по пользователю за месяц", {"user_telegram_id": 12345678}, "month"),
+    ("по имени пользователя", {"username": "LandoCalrissian"}, "3months"),
+    ("по пользователю и подкатегории", {"user_telegram_id": 12345678, "subcategory_id": 6}, "year"),
+    ("по категории", {"category_id": 1}, "6months"),
+    ("по имени пользователя и категории", {"username": "LandoCalrissian", "name": "Доход"}, "3months"),
+]
+
+
+# Параметры страницы для каждого запроса, как их передаёт find_transactions
+PAGE_PARAMS = {
+    "count": {},
+    "all": {},
+    "page": {"limit": 10, "offset": 100},
+    "keyset": {"limit": 11},
+    "keyset_after": {"limit": 11, "cursor_date": datetime(2024, 6, 1), "cursor_id": 1},
+}
+
+
+def build_queries(filters, period):
+    """Готовые запросы find_transactions для формы фильтров и параметры их выполнения."""
+    start_date, end_date = get_period_bounds(period)
+    filter_keys, params = transactions_query_params(filters, start_date, end_date)
+    statements = get_transactions_statements(filter_keys)
+    return {kind: (statements[kind], {**params, **extra}) for kind, extra in PAGE_PARAMS.items()}
+
+
+def explain(connection, query, params):
+    """Возвращает строки EXPLAIN QUERY PLAN для запроса SQLAlchemy с параметрами."""
+    compiled = query.compile(connection)
+    values = compiled.construct_params(params)
+    rows = connection.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {compiled}",
+        tuple(values[name] for name in compiled.positiontup)
+    ).fetchall()
+    return [row[-1] for row in rows]
+
+
+def uses_index(plan):
+    """Таблица transactions читается через индекс (SEARCH / SCAN ... USING INDEX)."""
+    transaction_steps = [step for step in plan if " transactions" in step]
+    return bool(transaction_steps) and all("USING" in step for step in transaction_steps)
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [{k: v for k, v in u.items() if k != "id"} for u in users])
+        connection.execute(Category.__table__.insert(), categories)
+        connection.execute(Subcategory.__table__.insert(), subcategories)
+        connection.execute(Transaction.__table__.insert(), generate_data())
+        connection.exec_driver_sql("ANALYZE")
+
+    failures = []
+    with engine.connect() as connection:
+        for title, filters, period in FILTER_SHAPES:
+            for kind, (query, params) in build_queries(filters, period).items():
+                plan = explain(connection, query, params)
+                status = "OK" if uses_index(plan) else "FAIL"
+                print(f"[{status}] {title} / {kind}")
+                for step in plan:
+                    print(f"    {step}")
+                if status == "FAIL":
+                    failures.append(f"{title} / {kind}")
+
+    assert not failures, f"Запросы без индекса: {failures}"
+    print("Все формы фильтров используют индексы.")
+
+
+if __name__ == "__main__":
+    main()
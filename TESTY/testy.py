@@ -48,7 +48,7 @@ class GETY:
             period=period,
             filters=filters
 )      
-        print(records)
+        print(records.headers["content-disposition"], len(records.body), "байт")
 
 
     @staticmethod
@@ -117,3 +117,10 @@ class POTY:
         model_name = "Transaction"
         values = generate_data()
         await add_many_model_data(model_name=model_name, values=values)
+
+    @staticmethod
+    async def test_add_many_transactions_bulk():
+        model_name = "Transaction"
+        values = generate_data()
+        result = await add_many_model_data(model_name=model_name, values=values, bulk=True, return_ids=False)
+        print(result)
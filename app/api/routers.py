@@ -10,12 +10,23 @@
 - Получение одной записи по идентификатору (например, telegram_id).
 - Добавление одной или нескольких записей в указанную модель.
 - Получение транзакций с объединением данных из связанных таблиц (пользователи, категории, подкатегории).
+- Сводки доходов и расходов (SUM / COUNT / AVG) с группировкой на стороне базы данных.
+- Аналитика по транзакциям пользователя (разбивка по подкатегориям, динамика по месяцам, выбросы).
 
 Структура модуля:
 - `handle_model_errors`: Декоратор для обработки ошибок, связанных с моделями.
 - `home_page`: Эндпоинт для получения списка таблиц в базе данных.
 - `get_many_model_data`: Эндпоинт для получения всех записей модели с фильтрацией и пагинацией.
-- `get_many_transactions`: Эндпоинт для получения транзакций с объединением данных из связанных таблиц.
+- `get_many_transactions`: Эндпоинт `/transactions/get_many` для получения транзакций с объединением данных
+  из связанных таблиц (пагинация по номеру страницы или курсору, способ подсчёта количества).
+- `get_report`: Эндпоинт для скачивания отчёта.
+- `get_summary`: Эндпоинт для получения сумм / количества / средних по транзакциям с группировкой в БД.
+- `get_user_analytics`: Эндпоинт с аналитикой по транзакциям пользователя.
+- `get_write_queue_stats`: Эндпоинт с метриками очереди пакетной записи транзакций.
+- `get_report_cache_stats`: Эндпоинт с метриками кэша отчётов.
+- `get_report_jobs_stats`: Эндпоинт с метриками очереди заданий на отчёты.
+- `get_report_job`: Эндпоинт со статусом задания на отчёт.
+- `get_metrics`: Эндпоинт метрик в формате Prometheus.
 - `get_user`: Эндпоинт для получения одной записи User по telegram_id.
 - `add_one_model_data`: Эндпоинт для добавления одной записи в модель.
 - `add_many_model_data`: Эндпоинт для добавления нескольких записей в модель.
@@ -24,24 +35,39 @@
 - Модели должны быть заранее зарегистрированы в `/app/dao/models.py/MODELS`.
 - Для работы с транзакциями используется метод `find_transactions`, который объединяет данные из таблиц `Transaction`, `User`, `Category` и `Subcategory`.
 - Логирование и обработка ошибок интегрированы в каждый эндпоинт.
+- Добавление категорий и подкатегорий инвалидирует кэш справочника (`app/cache/catalog.py`).
+- Транзакции читаются и записываются через маршрутизатор шардов (`app/dao/shards.py`),
+  справочники дублируются во все шарды.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import inspect
 from functools import wraps
-import pandas as pd
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 
-from app.dao.base import DatabaseSession as DB, engine
+from app.dao.base import DatabaseSession as DB, read_engine
 from app.dao.schemas import UserSchema
 from app.dao.models import MODELS
 from app.dao.generic import MainGeneric
+from app.dao.shards import shard_router
+from app.dao.write_queue import transaction_write_queue
+from app.cache.catalog import catalog
+from app.cache.reports import report_cache
+from app.reports.analytics import user_analytics, user_arrays_cache
+from app.reports.builder import build_report
+from app.reports.export import REPORT_MEDIA_TYPES, render_pool
+from app.reports.jobs import report_job_queue
+from app.reports.scheduler import report_prebuilder
+from app.metrics.registry import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
 
 # Создание роутера для API
 router = APIRouter()
 
+# Модели справочника: их изменение инвалидирует кэш справочника бота
+CATALOG_MODELS = (MODELS["Category"], MODELS["Subcategory"])
+
 # Декоратор для обработки ошибок, связанных с моделями
 def handle_model_errors(func):
     """
@@ -55,6 +81,9 @@ def handle_model_errors(func):
             raise HTTPException(status_code=404, detail="Model not found")
         try:
             return await func(model, *args, **kwargs)
+        except HTTPException:
+            # Ошибки запроса (например, 400 при некорректных параметрах) возвращаются как есть
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     return wrapper
@@ -65,7 +94,11 @@ async def fetch_transactions(
     filters: Optional[Dict[str, Any]] = None,
     paginate: bool = False,
     page: int = 1,
-    page_size: int = 10
+    page_size: int = 10,
+    keyset: bool = False,
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    count_mode: str = "cached"
 ) -> Dict[str, Any]:
     """
     Вспомогательная функция для получения данных о транзакциях.
@@ -76,21 +109,53 @@ async def fetch_transactions(
         paginate (bool): Флаг, указывающий, нужно ли использовать пагинацию. По умолчанию False.
         page (int): Номер страницы для пагинации. По умолчанию 1.
         page_size (int): Количество записей на странице. По умолчанию 20.
+        keyset (bool): Пагинация по курсору вместо номера страницы. По умолчанию False.
+        cursor (Optional[str]): Курсор "next_cursor" предыдущей страницы. По умолчанию None.
+        with_total (bool): Считать ли общее количество записей. По умолчанию True.
+        count_mode (str): Способ подсчёта: "exact", "cached" или "estimate". По умолчанию "cached".
 
     Returns:
         Dict[str, Any]: Результат запроса, содержащий записи и метаданные (если используется пагинация).
     """
-    model = MODELS["Transaction"]
-    async with DB.get_session(commit=False) as session:
-        result = await MainGeneric(model).find_transactions(
-            session=session,
-            filters=filters,
-            paginate=paginate,
-            page=page,
-            page_size=page_size,
-            period=period
-        )
-    return result
+    return await shard_router.find_transactions(
+        filters=filters,
+        paginate=paginate,
+        page=page,
+        page_size=page_size,
+        period=period,
+        keyset=keyset,
+        cursor=cursor,
+        with_total=with_total,
+        count_mode=count_mode
+    )
+
+
+# Вспомогательная функция для потокового чтения транзакций
+async def stream_transactions(
+    period: str = "all",
+    filters: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 1000
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Вспомогательная функция для потокового чтения транзакций порциями.
+
+    Сессия остаётся открытой, пока вызывающий код читает порции, поэтому в памяти
+    одновременно находится только одна порция записей.
+
+    Args:
+        period (str): Период, за который нужно получить данные. По умолчанию "all".
+        filters (Optional[Dict[str, Any]]): Фильтры для выборки данных. По умолчанию None.
+        chunk_size (int): Количество записей в одной порции. По умолчанию 1000.
+
+    Yields:
+        List[Dict[str, Any]]: Порция записей о транзакциях.
+    """
+    async for chunk in shard_router.stream_transactions(
+        filters=filters,
+        period=period,
+        chunk_size=chunk_size
+    ):
+        yield chunk
 
 
 @router.get("/")
@@ -100,11 +165,50 @@ async def home_page():
     Возвращает список всех таблиц в базе данных.
     """
     print("Welcome to home_page.")
-    async with engine.connect() as connection:
+    async with read_engine.connect() as connection:
         tables = await connection.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
         return {"tables": tables}
 
 
+# Регистрируется до `/{model_name}/get_many`, иначе путь обрабатывался бы get_many_model_data
+@router.get("/transactions/get_many")
+async def get_many_transactions(
+    period: str = "all",
+    filters: Optional[Dict[str, Any]] = None,
+    paginate: bool = True,
+    page: int = 1,
+    page_size: int = 10,
+    keyset: bool = False,
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    count_mode: str = "cached"
+) -> Dict[str, Any]:
+    """
+    Получение записей по фильтрам за указанный период с пагинацией по Транзакциям с объединением данных из связанных таблиц.
+
+    Args:
+        period (str): Период, за который нужно получить данные. По умолчанию "all".
+        filters (Optional[Dict[str, Any]]): Фильтры для выборки данных. По умолчанию None.
+        paginate (bool): Флаг, указывающий, нужно ли использовать пагинацию. По умолчанию True.
+        page (int): Номер страницы для пагинации. По умолчанию 1.
+        page_size (int): Количество записей на странице. По умолчанию 20.
+        keyset (bool): Пагинация по курсору (date, id) вместо номера страницы. По умолчанию False.
+        cursor (Optional[str]): Курсор "next_cursor" предыдущей страницы. По умолчанию None.
+        with_total (bool): Считать ли общее количество записей. По умолчанию True.
+        count_mode (str): Способ подсчёта общего количества записей: "exact" (на каждой странице),
+            "cached" (один раз до следующей записи в таблицы) или "estimate" (по дневным итогам).
+            По умолчанию "cached".
+
+    Returns:
+        Dict[str, Any]: Результат запроса, содержащий записи и метаданные (если используется пагинация).
+        В режиме курсора вместо "page" возвращается "next_cursor".
+    """
+    return await fetch_transactions(
+        period, filters, paginate, page, page_size,
+        keyset=keyset, cursor=cursor, with_total=with_total, count_mode=count_mode
+    )
+
+
 @router.get("/{model_name}/get_many")
 @handle_model_errors
 async def get_many_model_data(model, filters: Optional[Dict[str, Any]] = None):
@@ -118,7 +222,14 @@ async def get_many_model_data(model, filters: Optional[Dict[str, Any]] = None):
     Returns:
         Список записей, соответствующих фильтрам.
     """
-    async with DB.get_session(commit=False) as session:
+    if model is MODELS["Transaction"]:
+        results = await shard_router.fan_out(
+            lambda session: MainGeneric(model).find_many(session=session, filters=filters)
+        )
+        records = [record for result in results for record in result["records"]]
+        return {"records": records, "total_records": len(records)}
+
+    async with DB.get_session(commit=False, read_only=True) as session:
         result = await MainGeneric(model).find_many(
             session=session, 
             filters=filters,
@@ -126,67 +237,149 @@ async def get_many_model_data(model, filters: Optional[Dict[str, Any]] = None):
         return result
 
 
-@router.get("/{model_name}/get_many")
-async def get_many_transactions(
+@router.get("/{model_name}/{period}/report")
+async def get_report(
     period: str = "all",
     filters: Optional[Dict[str, Any]] = None,
-    paginate: bool = True,
+    paginate: bool = False,
     page: int = 1,
-    page_size: int = 10
+    page_size: int = 20,
+    format: str = "xlsx",
+    user_telegram_id: Optional[int] = None
+) -> Response:
+    """
+    Формирование отчёта в формате CSV или XLSX на основе данных о транзакциях.
+
+    Отчёт собирается в памяти (`app/reports/builder.build_report`) и возвращается как файл для скачивания.
+    Без пагинации транзакции читаются потоково порциями. С `user_telegram_id` отчёт содержит
+    только транзакции пользователя и читается по индексу из его шарда.
+    """
+    if user_telegram_id is not None:
+        filters = {**(filters or {}), "user_telegram_id": user_telegram_id}
+    try:
+        content, filename = await build_report(period, filters, paginate, page, page_size, format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Произошла ошибка при выгрузке данных: {str(e)}"
+        )
+    return Response(
+        content=content,
+        media_type=REPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/{model_name}/{period}/summary")
+async def get_summary(
+    period: str = "all",
+    group_by: str = "month",
+    filters: Optional[Dict[str, Any]] = None,
+    use_rollup: bool = True
 ) -> Dict[str, Any]:
     """
-    Получение записей по фильтрам за указанный период с пагинацией по Транзакциям с объединением данных из связанных таблиц.
+    Сводка доходов и расходов: сумма, количество и среднее транзакций по группам.
 
     Args:
         period (str): Период, за который нужно получить данные. По умолчанию "all".
+        group_by (str): Ключи группировки через запятую: user, category, subcategory, day, week, month.
+            По умолчанию "month".
         filters (Optional[Dict[str, Any]]): Фильтры для выборки данных. По умолчанию None.
-        paginate (bool): Флаг, указывающий, нужно ли использовать пагинацию. По умолчанию True.
-        page (int): Номер страницы для пагинации. По умолчанию 1.
-        page_size (int): Количество записей на странице. По умолчанию 20.
+        use_rollup (bool): Читать из таблицы дневных итогов, если фильтры это позволяют. По умолчанию True.
 
     Returns:
-        Dict[str, Any]: Результат запроса, содержащий записи и метаданные (если используется пагинация).
+        Dict[str, Any]: Сгруппированные итоги, рассчитанные в базе данных.
     """
-    return await fetch_transactions(period, filters, paginate, page, page_size)
+    keys = [key.strip() for key in group_by.split(",") if key.strip()]
+    return await shard_router.aggregate(
+        group_by=keys,
+        filters=filters,
+        period=period,
+        use_rollup=use_rollup
+    )
 
 
-@router.get("/{model_name}/{period}/report")
-async def get_report(
-    period: str = "all",
-    filters: Optional[Dict[str, Any]] = None,
-    paginate: bool = False,
-    page: int = 1,
-    page_size: int = 20,
-    format: str = "xlsx"
-) -> Dict[str, str]:
+@router.get("/analytics/{user_telegram_id}")
+async def get_user_analytics(user_telegram_id: int, period: str = "all") -> Dict[str, Any]:
     """
-    Формирование отчёта в формате CSV или XLSX на основе данных о транзакциях.
+    Аналитика по транзакциям пользователя: разбивка по подкатегориям, помесячные доходы и расходы,
+    изменение расходов к предыдущему месяцу, скользящие средние, норма сбережений и выбросы.
+
+    Args:
+        user_telegram_id (int): Идентификатор пользователя в Telegram.
+        period (str): Период, за который нужно получить данные. По умолчанию "all".
+
+    Returns:
+        Dict[str, Any]: Показатели `app/reports/analytics.compute_analytics`.
     """
-    try:
-        report = await fetch_transactions(period, filters, paginate, page, page_size)
-
-        # Создаем DataFrame из полученных данных
-        df = pd.DataFrame(report["records"])
-
-        if format == "csv":
-            filename = 'data/output.csv'
-            df.to_csv(filename, index=False)
-            return {"msg": "Данные выгружены в CSV"}
-        elif format == "xlsx":
-            filename = 'data/output.xlsx'
-            df.to_excel(filename, index=False)
-            return {"msg": "Данные выгружены в XLSX"}
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Неподдерживаемый формат выгрузки. Доступные форматы: csv, xlsx"
-            )
+    return await user_analytics(user_telegram_id, period)
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Произошла ошибка при выгрузке данных: {str(e)}"
-        )   
+
+@router.get("/write_queue/stats")
+async def get_write_queue_stats() -> Dict[str, Any]:
+    """
+    Метрики очереди пакетной записи транзакций бота: размеры пакетов и задержка в очереди.
+    """
+    return transaction_write_queue.stats()
+
+
+@router.get("/report_cache/stats")
+async def get_report_cache_stats() -> Dict[str, Any]:
+    """
+    Метрики кэша отчётов (размер в памяти, попадания и промахи), пула кодирования отчётов,
+    предварительного формирования отчётов и кэша массивов аналитики.
+    """
+    return {
+        **report_cache.stats(),
+        "render_pool": render_pool.stats(),
+        "prebuild": report_prebuilder.stats(),
+        "analytics": user_arrays_cache.stats(),
+    }
+
+
+@router.get("/report_jobs/stats")
+async def get_report_jobs_stats() -> Dict[str, Any]:
+    """
+    Метрики очереди заданий на отчёты: длина очереди, количество заданий по состояниям, длительности.
+    """
+    return report_job_queue.stats()
+
+
+@router.get("/report_jobs/{job_id}")
+async def get_report_job(job_id: str) -> Dict[str, Any]:
+    """
+    Статус задания на отчёт.
+
+    Args:
+        job_id (str): Идентификатор задания.
+
+    Returns:
+        Dict[str, Any]: Параметры, статус и длительности задания.
+    """
+    job = await report_job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    return job.to_dict()
+
+
+# Метрики очередей, кэшей и пулов в /metrics: значения stats() в момент запроса
+metrics.register_stats("write_queue", transaction_write_queue.stats)
+metrics.register_stats("report_cache", report_cache.stats)
+metrics.register_stats("render_pool", render_pool.stats)
+metrics.register_stats("report_prebuild", report_prebuilder.stats)
+metrics.register_stats("report_jobs", report_job_queue.stats)
+metrics.register_stats("analytics_cache", user_arrays_cache.stats)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """
+    Метрики в формате Prometheus: длительность, ошибки и время БД по хэндлерам бота
+    и маршрутам API (`app/metrics/middleware.py`), метрики очередей, кэшей и пулов.
+    """
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
 
 
 @router.get("/user/get_one")
@@ -202,7 +395,7 @@ async def get_user(model, tg_id: int):
         Запись, соответствующая указанному tg_id.
     """
     model = MODELS["User"]
-    async with DB.get_session(commit=False) as session:
+    async with DB.get_session(commit=False, read_only=True) as session:
         result = await MainGeneric(model).find_user(session=session, tg_id=tg_id)
         return result
 
@@ -220,22 +413,43 @@ async def add_one_model_data(model, values):
     Returns:
         Добавленная запись.
     """
-    async with DB.get_session(commit=True) as session:
-        return await MainGeneric(model).add_one(session=session, values=values)
+    result = await shard_router.add_one(model, values)
+    if model in CATALOG_MODELS:
+        catalog.invalidate()
+    return result
 
 
 @router.post("/{model_name}/add_many")
 @handle_model_errors
-async def add_many_model_data(model, values):
+async def add_many_model_data(
+    model, values,
+    bulk: bool = False,
+    chunk_size: int = 1000,
+    return_ids: bool = True
+):
     """
     Добавление нескольких записей в указанную модель.
 
     Args:
         model: Модель SQLAlchemy.
         values: Список данных для добавления (список словарей или объектов Pydantic).
+        bulk: Пакетная вставка без создания ORM-объектов. По умолчанию False.
+        chunk_size: Размер пакета для пакетной вставки, не меньше 1. По умолчанию 1000.
+        return_ids: Возвращать идентификаторы при пакетной вставке. По умолчанию True.
     
     Returns:
         Список добавленных записей.
+        При пакетной вставке — количество добавленных записей и их идентификаторы.
+
+    Raises:
+        HTTPException: Если при пакетной вставке `chunk_size` меньше 1 (400).
     """
-    async with DB.get_session(commit=True) as session:
-        return await MainGeneric(model).add_many(session=session, values=values)
+    result = await shard_router.add_many(
+        model, values,
+        bulk=bulk,
+        chunk_size=chunk_size,
+        return_ids=return_ids
+    )
+    if model in CATALOG_MODELS:
+        catalog.invalidate()
+    return result
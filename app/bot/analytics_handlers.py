@@ -0,0 +1,102 @@
+"""
+Модуль аналитики по транзакциям в Telegram-боте.
+
+Этот модуль содержит хэндлер для отправки пользователю сводной аналитики по его транзакциям
+(`app/reports/analytics.py`):
+- Доходы, расходы и норма сбережений за всё время.
+- Крупнейшие подкатегории расходов и их доли.
+- Расходы последнего месяца, изменение к предыдущему месяцу и скользящее среднее.
+- Необычно крупные расходы (выбросы).
+
+Основные компоненты:
+- `analytics_command`: Обработчик команды "Аналитика". Считает и отправляет аналитику.
+- `format_analytics`: Формирует текст сообщения из результатов аналитики.
+
+Логирование:
+- Логируются запросы аналитики и ошибки при её расчёте.
+- Логи включают идентификатор пользователя.
+"""
+
+from typing import Any, Dict
+
+from aiogram import types
+from loguru import logger
+
+from app.bot.keyboards import get_main_keyboard
+from app.reports.analytics import user_analytics
+from app.bot.text_routes import text_routes
+
+TOP_CATEGORIES = 5  # Подкатегорий расходов в сообщении
+TOP_OUTLIERS = 3  # Выбросов в сообщении
+
+
+def _money(value: float) -> str:
+    return f"{value:,.2f}".replace(",", " ")
+
+
+def _percent(value) -> str:
+    return f"{value * 100:+.1f}%" if value is not None else "—"
+
+
+def _share(value) -> str:
+    return f"{value * 100:.1f}%" if value is not None else "—"
+
+
+def format_analytics(analytics: Dict[str, Any]) -> str:
+    """
+    Формирует текст сообщения с аналитикой.
+
+    Args:
+        analytics (Dict[str, Any]): Результат `user_analytics`.
+
+    Returns:
+        str: Текст сообщения.
+    """
+    if not analytics["transactions"]:
+        return "Пока нет транзакций для аналитики."
+
+    lines = [
+        f"Аналитика с {analytics['first_date']} по {analytics['last_date']} ({analytics['transactions']} транзакций)",
+        f"Доходы: {_money(analytics['income'])}",
+        f"Расходы: {_money(analytics['expense'])}",
+        f"Норма сбережений: {_percent(analytics['savings_rate'])}",
+    ]
+
+    expenses = [item for item in analytics["categories"] if item["type"] == "expense"][:TOP_CATEGORIES]
+    if expenses:
+        lines += ["", "Крупнейшие расходы:"]
+        lines += [
+            f"- {item['subcategory']}: {_money(item['amount'])} ({_share(item['share'])})"
+            for item in expenses
+        ]
+
+    month = analytics["months"][-1]
+    lines += [
+        "",
+        f"Месяц {month['month']}: расходы {_money(month['expense'])} "
+        f"({_percent(month['expense_delta_pct'])} к прошлому месяцу), "
+        f"в среднем за последние месяцы {_money(month['expense_rolling_avg'])}",
+    ]
+
+    if analytics["outliers"]:
+        lines += ["", "Необычно крупные расходы:"]
+        lines += [
+            f"- {item['date']} {item['subcategory']}: {_money(item['amount'])} "
+            f"(обычно {_money(item['subcategory_mean'])})"
+            for item in analytics["outliers"][:TOP_OUTLIERS]
+        ]
+    return "\n".join(lines)
+
+
+@text_routes.text("Аналитика")
+async def analytics_command(message: types.Message):
+    """
+    Обработчик команды "Аналитика". Считает аналитику по транзакциям пользователя и отправляет её.
+    """
+    logger.info(f"Пользователь {message.from_user.id} запросил аналитику.")
+    try:
+        analytics = await user_analytics(message.from_user.id)
+        await message.answer(format_analytics(analytics), reply_markup=get_main_keyboard())
+    except Exception as e:
+        logger.error(f"Ошибка при расчёте аналитики для пользователя {message.from_user.id}: {e}")
+        await message.answer("Произошла ошибка при расчёте аналитики.", reply_markup=get_main_keyboard())
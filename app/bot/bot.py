@@ -3,8 +3,14 @@
 
 Этот модуль отвечает за:
 - Загрузку переменных окружения из файла .env.
-- Инициализацию бота и диспетчера.
-- Регистрацию всех хэндлеров.
+- Инициализацию бота и диспетчера (хранилище состояний — память процесса или Redis, `app/bot/storage.py`).
+- Регистрацию всех хэндлеров (команды — роутером `handlers.py`, кнопки и ввод — таблицей `app/bot/text_routes.py`).
+- Подключение middleware метрик обработки обновлений (`app/metrics/middleware.py`).
+- Загрузку справочника категорий при запуске.
+- Запуск и остановку очереди пакетной записи транзакций.
+- Запуск и остановку очереди фоновых заданий на отчёты и доставку готовых отчётов.
+- Запуск и остановку предварительного формирования отчётов.
+- Запуск фоновых задач только в ведущем процессе при нескольких процессах (`app/cache/leader.py`).
 - Запуск бота.
 """
 
@@ -12,10 +18,19 @@ from aiogram import Bot, Dispatcher
 import os
 from dotenv import load_dotenv
 
-# Импортируем хэндлеры
+# Импортируем хэндлеры: модули регистрируют кнопки в таблице text_routes
 from app.bot.handlers import router as main_router
-from app.bot.help_handlers import router as help_router
-from app.bot.report_handlers import router as report_router
+from app.bot import help_handlers, report_handlers, analytics_handlers  # noqa: F401
+from app.bot.report_handlers import report_delivery
+from app.bot.text_routes import router as text_router
+from app.bot.storage import create_fsm_storage, create_events_isolation
+from app.dao.write_queue import transaction_write_queue
+from app.reports.jobs import report_job_queue
+from app.reports.scheduler import report_prebuilder
+from app.cache.catalog import catalog
+from app.cache.leader import RedisLeader
+from app.metrics.middleware import HandlerNameMiddleware, UpdateMetricsMiddleware, instrument_db
+from app.settings.config import report_prebuild_enabled, metrics_enabled, background_leader, background_leader_ttl
 
 # Загружаем переменные из .env файла
 load_dotenv("app/settings/.env")
@@ -29,9 +44,43 @@ else:
 
 # Инициализация бота и диспетчера
 bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher()
+dp = Dispatcher(storage=create_fsm_storage(), events_isolation=create_events_isolation())
 
 # Регистрируем хэндлеры
 dp.include_router(main_router)
-dp.include_router(help_router)
-dp.include_router(report_router)
+dp.include_router(text_router)
+
+# Метрики: длительность, ошибки и время БД каждого обновления по хэндлерам
+if metrics_enabled:
+    instrument_db()
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    dp.message.middleware(HandlerNameMiddleware())
+    dp.callback_query.middleware(HandlerNameMiddleware())
+
+# Справочник категорий загружается один раз при запуске
+dp.startup.register(catalog.load)
+
+# Очередь пакетной записи транзакций: запуск вместе с ботом, дозапись при остановке
+dp.startup.register(transaction_write_queue.start)
+dp.shutdown.register(transaction_write_queue.stop)
+
+# Очередь заданий на отчёты: готовые отчёты отправляются в чат задания
+report_job_queue.delivery = report_delivery(bot)
+
+# Фоновые задачи: обработчики заданий на отчёты (поставленные задания выполняются до остановки)
+# и предварительное формирование отчётов за стандартные периоды
+background_tasks = [(report_job_queue.start, report_job_queue.stop)]
+if report_prebuild_enabled:
+    background_tasks.append((report_prebuilder.start, report_prebuilder.stop))
+
+if background_leader:
+    # Несколько процессов: фоновые задачи работают только в ведущем процессе
+    leader = RedisLeader("background", ttl=background_leader_ttl)
+    for start, stop in background_tasks:
+        leader.run_while_leader(start, stop)
+    dp.startup.register(leader.start)
+    dp.shutdown.register(leader.stop)
+else:
+    for start, stop in background_tasks:
+        dp.startup.register(start)
+        dp.shutdown.register(stop)
@@ -5,12 +5,17 @@
 - Добавление доходов и расходов.
 - Выбор категорий и подкатегорий.
 - Ввод суммы транзакции.
-- Сохранение данных в базу данных.
+- Сохранение данных в базу данных (через очередь пакетной записи `transaction_write_queue`).
+
+Кнопки и ввод в состояниях маршрутизируются таблицей `text_routes` (`app/bot/text_routes.py`),
+команда /start — роутером модуля.
 
 Основные компоненты:
 - `start`: Обработчик команды /start. Отправляет приветственное сообщение и главное меню.
-- `process_category`: Обработчик выбора категории (Доход/Расход). Запрашивает подкатегории.
+- `process_category`: Обработчик выбора категории (Доход/Расход). Предлагает подкатегории из кэша справочника.
+- `back_to_main_menu`: Обработчик "Назад" без состояния, при выборе подкатегории и периода отчёта.
 - `process_subcategory`: Обработчик выбора подкатегории. Переводит в состояние ввода суммы.
+- `back_to_subcategory`: Обработчик "Назад" при вводе суммы. Возвращает к выбору подкатегории.
 - `process_amount`: Обработчик ввода суммы. Сохраняет транзакцию в базу данных.
 
 Логирование:
@@ -24,8 +29,10 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from loguru import logger
 
-from app.bot.keyboards import get_main_keyboard, get_subcategories_keyboard
-from app.api.routers import get_many_model_data, add_one_model_data
+from app.bot.keyboards import get_main_keyboard
+from app.bot.text_routes import text_routes
+from app.cache.catalog import catalog
+from app.dao.write_queue import transaction_write_queue
 from app.bot.states import Form
 
 # Создаем роутер для хэндлеров
@@ -44,87 +51,83 @@ async def start(message: types.Message):
         reply_markup=keyboard
     )
 
-@router.message(lambda message: message.text in ["Доход", "Расход"])
+@text_routes.text("Доход", "Расход")
 async def process_category(message: types.Message, state: FSMContext):
     """
-    Обработчик выбора категории (Доход/Расход). Запрашивает подкатегории и переводит в состояние выбора подкатегории.
+    Обработчик выбора категории (Доход/Расход). Предлагает подкатегории и переводит в состояние выбора подкатегории.
+    Подкатегории и клавиатура берутся из кэша справочника, без обращения к БД.
     """
     category = message.text
     logger.info(f"Пользователь {message.from_user.id} выбрал категорию: {category}")
-    await state.update_data(category=category)  # Сохраняем категорию
-
-    categories = {"Доход": 1, "Расход": 2}
-    category_id = categories.get(category)
 
-    # Получаем подкатегории
-    subcategories = await get_many_model_data(
-        model_name="Subcategory",
-        filters={"category_id": category_id}
-    )
-    subcategories = [{"id": sc.id, "name": sc.name} for sc in subcategories["records"]]
-    logger.info(f"Получены подкатегории для {category}: {subcategories}")
+    category_id = await catalog.category_id(category)
+    if category_id is None:
+        logger.warning(f"Категория {category} не найдена в справочнике.")
+        await message.answer("Категория не найдена.", reply_markup=get_main_keyboard())
+        return
 
-    # Сохраняем подкатегории в состояние
-    await state.update_data(subcategories=subcategories)
+    # В состоянии храним только идентификатор категории
+    await state.update_data(category_id=category_id)
 
-    # Создаем клавиатуру с подкатегориями
-    subcategory_names = [subcat["name"] for subcat in subcategories]
     await message.answer(
         "Выберите подкатегорию:",
-        reply_markup=get_subcategories_keyboard(subcategory_names)
+        reply_markup=await catalog.keyboard(category_id)
     )
 
     await state.set_state(Form.subcategory)  # Переходим в состояние выбора подкатегории
 
-@router.message(Form.subcategory)
-async def process_subcategory(message: types.Message, state: FSMContext):
+@text_routes.text("Назад", state=[None, Form.subcategory, Form.report_period])
+async def back_to_main_menu(message: types.Message, state: FSMContext):
     """
-    Обработчик выбора подкатегории. Переводит в состояние ввода суммы или возвращает в главное меню.
+    Обработчик "Назад" без состояния, при выборе подкатегории и периода отчёта. Возвращает в главное меню.
     """
-    if message.text == "Назад":
-        logger.info(f"Пользователь {message.from_user.id} нажал 'Назад'.")
-        await state.clear()
-        await message.answer(
-            "Выберите действие:",
-            reply_markup=get_main_keyboard()
-        )
-        return
+    logger.info(f"Пользователь {message.from_user.id} нажал 'Назад'. Возврат в главное меню.")
+    await state.clear()
+    await message.answer(
+        "Выберите действие:",
+        reply_markup=get_main_keyboard()
+    )
 
+@text_routes.free_input(Form.subcategory)
+async def process_subcategory(message: types.Message, state: FSMContext):
+    """
+    Обработчик выбора подкатегории. Переводит в состояние ввода суммы.
+    """
     subcategory_name = message.text
     logger.info(f"Пользователь {message.from_user.id} выбрал подкатегорию: {subcategory_name}")
     data = await state.get_data()
-    subcategories = data.get("subcategories")
 
     # Находим выбранную подкатегорию
-    selected_subcategory = next((sc for sc in subcategories if sc["name"] == subcategory_name), None)
-    if not selected_subcategory:
+    subcategory_id = await catalog.subcategory_id(data.get("category_id"), subcategory_name)
+    if subcategory_id is None:
         logger.warning(f"Подкатегория {subcategory_name} не найдена для пользователя {message.from_user.id}.")
         await message.answer("Подкатегория не найдена.")
         return
 
     # Сохраняем subcategory_id в состояние
-    await state.update_data(subcategory_id=selected_subcategory["id"])
+    await state.update_data(subcategory_id=subcategory_id)
 
     await message.answer("Введите сумму:")
     await state.set_state(Form.amount)  # Переходим в состояние ввода суммы
 
-@router.message(Form.amount)
-async def process_amount(message: types.Message, state: FSMContext):
+@text_routes.text("Назад", state=Form.amount)
+async def back_to_subcategory(message: types.Message, state: FSMContext):
     """
-    Обработчик ввода суммы. Сохраняет транзакцию в БД или возвращает к выбору подкатегории.
+    Обработчик "Назад" при вводе суммы. Возвращает к выбору подкатегории.
     """
-    if message.text == "Назад":
-        logger.info(f"Пользователь {message.from_user.id} нажал 'Назад'")
-        await state.set_state(Form.subcategory)
-        data = await state.get_data()
-        subcategories = data.get("subcategories")
-        subcategory_names = [sc["name"] for sc in subcategories]
-        await message.answer(
-            "Выберите подкатегорию:",
-            reply_markup=get_subcategories_keyboard(subcategory_names)
-        )
-        return
+    logger.info(f"Пользователь {message.from_user.id} нажал 'Назад'")
+    await state.set_state(Form.subcategory)
+    data = await state.get_data()
+    await message.answer(
+        "Выберите подкатегорию:",
+        reply_markup=await catalog.keyboard(data.get("category_id"))
+    )
 
+@text_routes.free_input(Form.amount)
+async def process_amount(message: types.Message, state: FSMContext):
+    """
+    Обработчик ввода суммы. Сохраняет транзакцию в БД.
+    """
     try:
         amount = float(message.text)
         logger.info(f"Пользователь {message.from_user.id} ввел сумму: {amount}")
@@ -134,15 +137,15 @@ async def process_amount(message: types.Message, state: FSMContext):
         transaction_data = {
             "date": datetime.now(),
             "user_telegram_id": message.from_user.id,
-            "category_id": 1 if data["category"] == "Доход" else 2,
+            "category_id": data["category_id"],
             "subcategory_id": data["subcategory_id"],
             "amount": amount,
             "comment": "" 
         }
 
-        # Сохраняем данные в БД
-        response = await add_one_model_data(model_name="Transaction", values=transaction_data)
-        logger.info(f"Транзакция сохранена для пользователя {message.from_user.id}. Ответ API: {response}")
+        # Сохраняем данные в БД: запись попадает в общий пакет и подтверждается после коммита
+        await transaction_write_queue.submit(transaction_data)
+        logger.info(f"Транзакция сохранена для пользователя {message.from_user.id}.")
 
         await message.answer("Данные успешно сохранены!")
         await state.clear()
@@ -5,6 +5,8 @@
 - Чтение текста помощи из файла `help.txt`.
 - Отправка текста с поддержкой MarkdownV2.
 
+Кнопка "Помощь" маршрутизируется таблицей `text_routes` (`app/bot/text_routes.py`) в любом состоянии.
+
 Основные компоненты:
 - `help_command`: Обработчик команды "Помощь". Отправляет пользователю содержимое файла `help.txt`.
 
@@ -14,16 +16,12 @@
 - Логи включают идентификатор пользователя и детали выполняемых операций.
 """
 
-from aiogram import Router, types
-from aiogram.filters import Command
-import os
+from aiogram import types
 from loguru import logger
 from app.bot.keyboards import get_main_keyboard
+from app.bot.text_routes import text_routes
 
-# Создаем роутер для хэндлеров
-router = Router()
-
-@router.message(lambda message: message.text == "Помощь")
+@text_routes.text("Помощь")
 async def help_command(message: types.Message):
     """
     Обработчик команды "Помощь". Отправляет пользователю содержимое файла help.txt
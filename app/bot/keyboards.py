@@ -7,7 +7,7 @@
 - Меню выбора периода для отчетов.
 
 Основные функции:
-- `get_main_keyboard`: Создает главное меню с кнопками "Доход", "Расход", "Отчёт" и "Помощь".
+- `get_main_keyboard`: Создает главное меню с кнопками "Доход", "Расход", "Отчёт", "Аналитика" и "Помощь".
 - `get_subcategories_keyboard`: Создает клавиатуру для выбора подкатегорий.
 - `get_report_period_keyboard`: Создает клавиатуру для выбора периода отчета.
 
@@ -18,14 +18,15 @@ from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
 def get_main_keyboard():
     """
-    Создает главное меню с кнопками "Доход", "Расход", "Отчёт" и "Помощь".
+    Создает главное меню с кнопками "Доход", "Расход", "Отчёт", "Аналитика" и "Помощь".
 
     Returns:
         ReplyKeyboardMarkup: Главное меню с кнопками.
     """
     keyboard = ReplyKeyboardMarkup(keyboard=[
         [KeyboardButton(text="Доход"), KeyboardButton(text="Расход")],
-        [KeyboardButton(text="Отчёт"), KeyboardButton(text="Помощь")]
+        [KeyboardButton(text="Отчёт"), KeyboardButton(text="Аналитика")],
+        [KeyboardButton(text="Помощь")]
     ], resize_keyboard=True)
     return keyboard
 
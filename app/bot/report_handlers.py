@@ -2,13 +2,18 @@
 Модуль для формирования отчетов в Telegram-боте.
 
 Этот модуль содержит хэндлеры для создания и отправки финансовых отчетов:
-- Выбор периода для отчета (месяц, 3 месяца, полгода, год, всё время).
-- Формирование отчета в формате XLSX.
-- Отправка отчета пользователю.
+- Выбор периода для отчета (месяц, 3 месяца, полгода, год, всё время) в состоянии `Form.report_period`.
+- Постановка задания на отчёт XLSX по транзакциям пользователя в фоновую очередь (`app/reports/jobs.py`).
+- Отправка готового отчета пользователю, когда задание выполнено (в том числе обработчиком
+  другого процесса: доставка использует только бота и чат задания).
 
 Основные компоненты:
 - `report_command`: Обработчик команды "Отчёт". Предлагает выбрать период для отчета.
-- `process_report_period`: Обработчик выбора периода. Формирует и отправляет отчет.
+- `process_report_period`: Обработчик выбора периода. Ставит задание и сразу отвечает пользователю.
+- `report_delivery`: Создаёт функцию доставки готовых отчётов в чат задания (`ReportJobQueue.delivery`).
+
+Кнопки маршрутизируются таблицей `text_routes` (`app/bot/text_routes.py`): "Отчёт" — в любом
+состоянии, периоды — только в `Form.report_period`, "Назад" в нём — `back_to_main_menu` (`app/bot/handlers.py`).
 
 Логирование:
 - Логируются действия пользователей (выбор периода, формирование отчета).
@@ -17,62 +22,73 @@
 
 """
 
-from aiogram import Router, types
-from aiogram.filters import Command
-from aiogram.types import FSInputFile
+from aiogram import Bot, types
+from aiogram.types import BufferedInputFile
 from aiogram.fsm.context import FSMContext
 from loguru import logger
 
-from app.api.routers import get_report
+from app.reports.builder import REPORT_PERIODS, user_report_filters
+from app.reports.jobs import report_job_queue, ReportQueueFull
 from app.bot.keyboards import get_main_keyboard, get_report_period_keyboard
+from app.bot.states import Form
+from app.bot.text_routes import text_routes
+
 
-# Создаем роутер для хэндлеров
-router = Router()
+def report_delivery(bot: Bot):
+    """
+    Создаёт функцию доставки отчётов в чат, из которого они были запрошены (`ReportJob.chat_id`).
+
+    Args:
+        bot (Bot): Бот, через который отправляются отчёты.
+    """
+    async def deliver(job, content, filename):
+        if content is None:
+            await bot.send_message(job.chat_id, "Произошла ошибка при формировании отчёта.")
+            return
+        logger.info(f"Отчёт {job.id} отправляется пользователю {job.user_id}.")
+        # Файл отправляется из памяти, без промежуточной записи на диск
+        await bot.send_document(
+            job.chat_id, BufferedInputFile(content, filename=filename), caption="Ваш отчёт готов!"
+        )
+    return deliver
 
-@router.message(lambda message: message.text == "Отчёт")
+@text_routes.text("Отчёт")
 async def report_command(message: types.Message, state: FSMContext):
     """
     Обработчик команды "Отчёт". Предлагает пользователю выбрать период для формирования отчёта.
     """
     logger.info(f"Пользователь {message.from_user.id} запросил отчёт.")
+    await state.set_state(Form.report_period)
     await message.answer("Выберите период для отчёта:", reply_markup=get_report_period_keyboard())
 
-@router.message(lambda message: message.text in ["Месяц", "3 месяца", "Полгода", "Год", "Всё время", "Назад"])
+@text_routes.text(*REPORT_PERIODS, state=Form.report_period)
 async def process_report_period(message: types.Message, state: FSMContext):
     """
-    Обработчик выбора периода для отчёта. Формирует отчёт за выбранный период или возвращает в главное меню.
+    Обработчик выбора периода для отчёта. Ставит задание на отчёт за выбранный период.
     """
     logger.info(f"Пользователь {message.from_user.id} выбрал период: {message.text}")
+    await state.clear()
 
-    if message.text == "Назад":
-        logger.info(f"Пользователь {message.from_user.id} нажал 'Назад'. Возврат в главное меню.")
-        await state.clear()
-        await message.answer(
-            "Выберите действие:",
-            reply_markup=get_main_keyboard()
-        )
-        return
-
-    periods = {
-        "Месяц": "month", 
-        "3 месяца": "3months", 
-        "Полгода": "6months",
-        "Год": "year", 
-        "Всё время": "all"
-    }
-    period = periods.get(message.text)
+    period = REPORT_PERIODS.get(message.text)
 
-    # Запрашиваем отчёт
+    # Ставим задание в очередь: отчёт придёт отдельным сообщением, когда будет готов
     logger.info(f"Формирование отчёта за период: {period} для пользователя {message.from_user.id}")
-    response = await get_report(period=period, format="xlsx")
-
-    if response.get("msg") in ["Данные выгружены в XLSX"]:
-        logger.info(f"Отчёт успешно сформирован для пользователя {message.from_user.id}.")
-        file = FSInputFile("data/output.xlsx")
-        await message.answer_document(file, caption="Ваш отчёт готов!")
+    try:
+        job, created = await report_job_queue.submit(
+            user_id=message.from_user.id,
+            period=period,
+            format="xlsx",
+            filters=user_report_filters(message.from_user.id),
+            chat_id=message.chat.id
+        )
+    except ReportQueueFull as e:
+        logger.warning(f"Очередь отчётов заполнена, запрос пользователя {message.from_user.id} отклонён: {e}")
+        await message.answer("Сейчас формируется слишком много отчётов, попробуйте позже.")
     else:
-        logger.error(f"Ошибка при формировании отчёта для пользователя {message.from_user.id}. Ответ API: {response}")
-        await message.answer("Произошла ошибка при формировании отчёта.")
+        if created and job.active:
+            await message.answer("Отчёт формируется…")
+        elif job.active:
+            await message.answer("Отчёт за этот период уже формируется, пришлю его, как только он будет готов.")
 
     # Возврат в главное меню
     logger.info(f"Возврат в главное меню для пользователя {message.from_user.id}.")
@@ -13,7 +13,9 @@ class Form(StatesGroup):
         category (State): Состояние выбора категории (Доход/Расход).
         subcategory (State): Состояние выбора подкатегории.
         amount (State): Состояние ввода суммы транзакции.
+        report_period (State): Состояние выбора периода отчёта.
     """
     category = State()
     subcategory = State()
-    amount = State()
\ No newline at end of file
+    amount = State()
+    report_period = State()
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Модуль хранилища состояний FSM бота.
+
+По умолчанию aiogram хранит состояния (`Form`) и их данные в памяти процесса: бот может
+работать только одним процессом, а незавершённый ввод транзакции теряется при перезапуске.
+С флагом `fsm_redis = True` состояния хранятся в Redis через общий клиент `app/cache/redis.py`:
+- несколько процессов бота видят одно и то же состояние пользователя;
+- ключи имеют вид `fsm:<id бота>:<чат>:<пользователь>:state|data` и живут
+  `fsm_state_ttl` / `fsm_data_ttl` секунд, брошенный ввод не копится в Redis;
+- данные состояния — только идентификаторы (`category_id`, `subcategory_id`),
+  сериализуются компактным JSON без пробелов;
+- `fsm_events_isolation`: блокировка в Redis на чат, чтобы обновления одного пользователя,
+  пришедшие в разные процессы, не обрабатывались одновременно.
+
+Основные функции:
+- `compact_json_dumps`: Компактная сериализация данных состояния.
+- `create_fsm_storage`: Хранилище состояний по настройкам.
+- `create_events_isolation`: Изоляция обработки обновлений по настройкам.
+"""
+
+import json
+from typing import Any
+
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage
+from aiogram.fsm.storage.memory import DisabledEventIsolation, MemoryStorage
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisEventIsolation, RedisStorage
+from redis.asyncio import Redis
+
+from app.cache.redis import get_redis
+from app.settings.config import fsm_redis, fsm_state_ttl, fsm_data_ttl, fsm_events_isolation
+
+
+# Ключи с идентификатором бота: несколько ботов могут использовать один Redis
+KEY_BUILDER = DefaultKeyBuilder(prefix="fsm", with_bot_id=True)
+
+
+def compact_json_dumps(data: Any) -> str:
+    """Сериализует данные состояния в JSON без пробелов."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def create_redis_storage(redis: Redis) -> RedisStorage:
+    """
+    Создаёт хранилище состояний в Redis с TTL и компактным JSON.
+
+    Args:
+        redis (Redis): Асинхронный клиент Redis.
+
+    Returns:
+        RedisStorage: Хранилище состояний.
+    """
+    return RedisStorage(
+        redis,
+        key_builder=KEY_BUILDER,
+        state_ttl=fsm_state_ttl,
+        data_ttl=fsm_data_ttl,
+        json_dumps=compact_json_dumps
+    )
+
+
+def create_fsm_storage() -> BaseStorage:
+    """
+    Хранилище состояний бота: Redis при `fsm_redis = True`, иначе память процесса.
+
+    Returns:
+        BaseStorage: Хранилище состояний для `Dispatcher`.
+    """
+    if fsm_redis:
+        return create_redis_storage(get_redis())
+    return MemoryStorage()
+
+
+def create_events_isolation() -> BaseEventIsolation:
+    """
+    Изоляция обработки обновлений: блокировка в Redis на чат при `fsm_redis` и
+    `fsm_events_isolation`, иначе без блокировок (как по умолчанию в aiogram).
+
+    Returns:
+        BaseEventIsolation: Изоляция событий для `Dispatcher`.
+    """
+    if fsm_redis and fsm_events_isolation:
+        return RedisEventIsolation(get_redis(), key_builder=KEY_BUILDER)
+    return DisabledEventIsolation()
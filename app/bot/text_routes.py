@@ -0,0 +1,144 @@
+"""
+Модуль маршрутизации текстовых сообщений бота по таблице.
+
+Кнопки Reply-клавиатур приходят обычным текстом. Раньше каждый хэндлер проверял его своим
+фильтром `lambda message: message.text in [...]`, aiogram перебирал хэндлеры по порядку
+подключения роутеров, а "Назад" обрабатывался разными хэндлерами в зависимости от этого порядка.
+
+Теперь хэндлеры регистрируются в общей таблице `text_routes` по ключу (состояние, текст),
+а в диспетчере стоит один хэндлер `dispatch_text`, который находит маршрут за
+не больше чем три обращения к словарю, сколько бы кнопок ни было:
+1. Точное совпадение (текущее состояние, текст), например (`Form.amount`, "Назад").
+2. Кнопка, доступная в любом состоянии (`ANY_STATE`), например "Помощь".
+3. Свободный ввод в текущем состоянии (название подкатегории, сумма).
+
+Один и тот же ключ нельзя зарегистрировать дважды: неоднозначный маршрут приводит к
+`ValueError` при импорте, а не к выбору хэндлера по порядку роутеров. Текущее
+состояние берётся из `raw_state`, которое FSM middleware aiogram уже прочитало,
+без дополнительного обращения к хранилищу.
+
+Основные компоненты:
+- `TextRoutes`: Таблица маршрутов и регистрация хэндлеров.
+- `TextRouteFilter`: Фильтр aiogram, находящий маршрут сообщения.
+- `text_routes`: Общая таблица маршрутов бота.
+- `router`: Роутер с хэндлером `dispatch_text`.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from aiogram import Router, types
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.filters import Filter
+from aiogram.fsm.state import State
+
+
+# Ключ состояния для кнопок, доступных в любом состоянии
+ANY_STATE = "*"
+
+StateKey = Union[State, str, None]
+
+
+def _state_name(state: StateKey) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+class TextRoutes:
+    """
+    Таблица маршрутов текстовых сообщений: (состояние, текст) -> хэндлер.
+    """
+    def __init__(self):
+        self._routes: Dict[Tuple[Optional[str], Optional[str]], CallableObject] = {}
+        self.texts: frozenset = frozenset()
+
+    def _add(self, states: Iterable[StateKey], texts: Iterable[Optional[str]], callback: Callable):
+        route = CallableObject(callback)
+        for state in states:
+            for text in texts:
+                key = (_state_name(state), text)
+                if key in self._routes:
+                    raise ValueError(
+                        f"Маршрут {key} уже обрабатывается {self._routes[key].callback.__name__}, "
+                        f"повторная регистрация: {callback.__name__}"
+                    )
+                self._routes[key] = route
+        self.texts = frozenset(text for _, text in self._routes if text is not None)
+
+    def text(self, *texts: str, state: Union[StateKey, Iterable[StateKey]] = ANY_STATE):
+        """
+        Регистрирует хэндлер кнопок с текстами `texts`.
+
+        Args:
+            *texts (str): Тексты кнопок.
+            state (Union[StateKey, Iterable[StateKey]]): Состояние или список состояний, в которых
+                действует маршрут: `None` — без состояния, `ANY_STATE` — в любом. По умолчанию `ANY_STATE`.
+
+        Raises:
+            ValueError: Если для какого-то (состояния, текста) хэндлер уже зарегистрирован.
+        """
+        states = state if isinstance(state, (list, tuple, set)) else [state]
+
+        def decorator(callback: Callable) -> Callable:
+            self._add(states, texts, callback)
+            return callback
+        return decorator
+
+    def free_input(self, state: StateKey):
+        """
+        Регистрирует хэндлер любого текста в состоянии `state`, для которого нет кнопки.
+
+        Args:
+            state (StateKey): Состояние ввода (например, `Form.amount`).
+
+        Raises:
+            ValueError: Если для состояния хэндлер свободного ввода уже зарегистрирован.
+        """
+        def decorator(callback: Callable) -> Callable:
+            self._add([state], [None], callback)
+            return callback
+        return decorator
+
+    def resolve(self, state: Optional[str], text: Optional[str]) -> Optional[CallableObject]:
+        """
+        Находит хэндлер сообщения: точный маршрут состояния, кнопка любого состояния, свободный ввод.
+
+        Args:
+            state (Optional[str]): Текущее состояние пользователя (`raw_state`).
+            text (Optional[str]): Текст сообщения.
+
+        Returns:
+            Optional[CallableObject]: Хэндлер или None, если маршрута нет.
+        """
+        if text in self.texts:
+            route = self._routes.get((state, text)) or self._routes.get((ANY_STATE, text))
+            if route is not None:
+                return route
+        return self._routes.get((state, None))
+
+
+class TextRouteFilter(Filter):
+    """
+    Фильтр aiogram: пропускает сообщение, если для него есть маршрут, и передаёт его в `text_route`.
+    """
+    def __init__(self, routes: TextRoutes):
+        self.routes = routes
+
+    async def __call__(self, message: types.Message, raw_state: Optional[str] = None) -> Union[bool, Dict[str, Any]]:
+        route = self.routes.resolve(raw_state, message.text)
+        if route is None:
+            return False
+        return {"text_route": route}
+
+
+# Общая таблица маршрутов бота, заполняется модулями хэндлеров
+text_routes = TextRoutes()
+
+# Создаем роутер для хэндлеров
+router = Router()
+
+
+@router.message(TextRouteFilter(text_routes))
+async def dispatch_text(message: types.Message, text_route: CallableObject, **data: Any) -> Any:
+    """
+    Вызывает хэндлер из таблицы маршрутов с теми аргументами (`state`, `bot` и т. д.), которые он принимает.
+    """
+    return await text_route.call(message, **data)
@@ -0,0 +1,251 @@
+"""
+Модуль приёма обновлений Telegram через вебхук.
+
+При long polling все обновления забирает один процесс. В режиме вебхука Telegram сам
+отправляет обновления POST-запросами в приложение FastAPI (вместе с `model_router`),
+и приложение можно запустить в нескольких процессах uvicorn (`webhook_workers`).
+
+Обработка:
+- Секрет вебхука (`webhook_secret` в `.env`) обязателен: без него обработчик не запускается,
+  а эндпоинт отклоняет все запросы, иначе обновления мог бы отправить кто угодно.
+- Эндпоинт проверяет секрет (`X-Telegram-Bot-Api-Secret-Token`), ставит обновление
+  в обработку и сразу отвечает 200, не дожидаясь хэндлеров.
+- В каждом процессе одновременно обрабатывается не больше `webhook_max_concurrency`
+  обновлений; принятых, но не обработанных — не больше `webhook_max_pending`. Сверх этого
+  эндпоинт отвечает 503, и Telegram повторит доставку позже.
+- При остановке процесс дожидается обработки принятых обновлений.
+
+Несколько процессов (`run_webhook` в `app/main.py` проверяет настройки):
+- Состояния пользователей хранятся в Redis (`fsm_redis = True`, `app/bot/storage.py`),
+  иначе шаги ввода одного пользователя могут попасть в разные процессы.
+- Задания на отчёты хранятся в Redis (`report_job_redis = True`, `app/reports/jobs.py`):
+  задание ставит любой процесс, статус доступен в любом процессе.
+- Обработчики заданий и предварительное формирование отчётов (`app/reports/scheduler.py`)
+  работают только в ведущем процессе (`background_leader = True`, `app/cache/leader.py`).
+- Вебхук регистрируется в Telegram при запуске, если его адрес ещё не установлен.
+
+Основные компоненты:
+- `WebhookProcessor`: Фоновая обработка принятых обновлений с ограничением параллелизма.
+- `create_webhook_router`: Роутер FastAPI с эндпоинтом вебхука и его метриками.
+- `webhook_processor`: Обработчик обновлений бота по настройкам.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from fastapi import APIRouter, HTTPException, Request, Response
+from loguru import logger
+
+from app.bot.bot import bot, dp
+from app.metrics.registry import metrics
+from app.settings.config import (
+    webhook_url, webhook_path, webhook_max_concurrency, webhook_max_pending, webhook_max_connections
+)
+
+
+# Секрет вебхука из .env (загружается в app/bot/bot.py); Telegram передаёт его в заголовке
+WEBHOOK_SECRET = os.getenv("webhook_secret")
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def require_webhook_secret():
+    """
+    Проверяет, что секрет вебхука задан.
+
+    Raises:
+        ValueError: Если `webhook_secret` не найден в .env.
+    """
+    if not WEBHOOK_SECRET:
+        raise ValueError("Секрет вебхука не найден в .env файле (webhook_secret), режим вебхука не запускается!")
+
+
+class WebhookProcessor:
+    """
+    Фоновая обработка обновлений, принятых через вебхук.
+
+    Attributes:
+        dispatcher (Dispatcher): Диспетчер aiogram с хэндлерами бота.
+        bot (Bot): Бот, от имени которого обрабатываются обновления.
+        max_concurrency (int): Максимум одновременно обрабатываемых обновлений.
+        max_pending (int): Максимум принятых и ещё не обработанных обновлений.
+    """
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_concurrency: int = 100, max_pending: int = 1000):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._received = 0
+        self._processed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._processing = 0
+        self._process_total = 0.0
+        self._process_max = 0.0
+
+    async def start(self, emit_startup: bool = True):
+        """
+        Запускает обработку: вызывает хэндлеры запуска диспетчера и регистрирует вебхук.
+
+        Args:
+            emit_startup (bool): Вызывать ли хэндлеры запуска (`dp.startup`). По умолчанию True.
+
+        Raises:
+            ValueError: Если секрет вебхука не задан.
+        """
+        require_webhook_secret()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if emit_startup:
+            await self.dispatcher.emit_startup(bot=self.bot, bots=[self.bot], dispatcher=self.dispatcher)
+        if webhook_url:
+            await self.set_webhook()
+        logger.info(
+            f"Приём обновлений через вебхук {webhook_path}: до {self.max_concurrency} одновременно, "
+            f"очередь до {self.max_pending}."
+        )
+
+    async def stop(self, emit_shutdown: bool = True):
+        """
+        Дожидается обработки принятых обновлений и вызывает хэндлеры остановки диспетчера.
+
+        Args:
+            emit_shutdown (bool): Вызывать ли хэндлеры остановки (`dp.shutdown`). По умолчанию True.
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if emit_shutdown:
+            await self.dispatcher.emit_shutdown(bot=self.bot, bots=[self.bot], dispatcher=self.dispatcher)
+        logger.info(f"Приём обновлений через вебхук остановлен. Статистика: {self.stats()}")
+
+    async def set_webhook(self):
+        """
+        Регистрирует вебхук в Telegram с секретом, если адрес ещё не установлен.
+
+        Raises:
+            ValueError: Если секрет вебхука не задан.
+        """
+        require_webhook_secret()
+        url = webhook_url.rstrip("/") + webhook_path
+        info = await self.bot.get_webhook_info()
+        if info.url == url:
+            return
+        await self.bot.set_webhook(
+            url,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=self.dispatcher.resolve_used_update_types(),
+            max_connections=webhook_max_connections
+        )
+        logger.info(f"Вебхук зарегистрирован: {url}")
+
+    def submit(self, update: Dict[str, Any]) -> bool:
+        """
+        Принимает обновление в фоновую обработку.
+
+        Args:
+            update (Dict[str, Any]): Обновление Telegram в формате JSON.
+
+        Returns:
+            bool: False, если принятых и не обработанных обновлений уже `max_pending`.
+        """
+        if len(self._tasks) >= self.max_pending:
+            self._rejected += 1
+            return False
+        self._received += 1
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _process(self, update: Dict[str, Any]):
+        """Обрабатывает обновление хэндлерами диспетчера с ограничением параллелизма."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self._processing += 1
+            started = time.perf_counter()
+            try:
+                await self.dispatcher.feed_raw_update(self.bot, update)
+                self._processed += 1
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"Ошибка обработки обновления {update.get('update_id')}: {e}")
+            finally:
+                self._processing -= 1
+                elapsed = time.perf_counter() - started
+                self._process_total += elapsed
+                self._process_max = max(self._process_max, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Метрики приёма обновлений.
+
+        Returns:
+            Dict[str, Any]: Количество принятых, обработанных, неудачных и отклонённых обновлений,
+            обрабатываемых и ожидающих сейчас, длительность обработки в миллисекундах.
+        """
+        finished = self._processed + self._failed
+        return {
+            "received": self._received,
+            "processed": self._processed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "processing": self._processing,
+            "pending": len(self._tasks) - self._processing,
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "avg_process_ms": self._process_total / finished * 1000 if finished else 0,
+            "max_process_ms": self._process_max * 1000,
+        }
+
+
+def create_webhook_router(
+        processor: WebhookProcessor,
+        path: str = webhook_path,
+        secret: Optional[str] = WEBHOOK_SECRET
+) -> APIRouter:
+    """
+    Создаёт роутер FastAPI с эндпоинтом вебхука и эндпоинтом его метрик.
+
+    Args:
+        processor (WebhookProcessor): Обработчик принятых обновлений.
+        path (str): Путь эндпоинта вебхука.
+        secret (Optional[str]): Секрет вебхука; запросы без него отклоняются, а если секрет
+            не задан — отклоняются все запросы.
+
+    Returns:
+        APIRouter: Роутер вебхука.
+    """
+    router = APIRouter()
+
+    @router.post(path, include_in_schema=False)
+    async def telegram_webhook(request: Request) -> Response:
+        """
+        Принимает обновление Telegram и сразу отвечает, обработка идёт в фоне.
+        """
+        if not secret or request.headers.get(SECRET_HEADER) != secret:
+            raise HTTPException(status_code=403, detail="Неверный секрет вебхука")
+        if not processor.submit(await request.json()):
+            raise HTTPException(status_code=503, detail="Очередь обработки обновлений заполнена")
+        return Response(status_code=200)
+
+    @router.get("/webhook/stats")
+    async def get_webhook_stats() -> Dict[str, Any]:
+        """
+        Метрики приёма обновлений через вебхук в текущем процессе.
+        """
+        return processor.stats()
+
+    return router
+
+
+# Обработчик обновлений бота через вебхук
+webhook_processor = WebhookProcessor(
+    dp, bot,
+    max_concurrency=webhook_max_concurrency,
+    max_pending=webhook_max_pending
+)
+metrics.register_stats("webhook", webhook_processor.stats)
@@ -0,0 +1,119 @@
+"""
+Модуль кэша справочника категорий и подкатегорий.
+
+Справочник категорий (Доход / Расход) и подкатегорий меняется крайне редко, а читается
+на каждое нажатие "Доход" / "Расход". Класс `Catalog` загружает справочник один раз
+(при запуске бота) и хранит:
+- соответствие названия категории её идентификатору;
+- соответствие названия подкатегории её идентификатору внутри каждой категории;
+- заранее собранные клавиатуры подкатегорий (`get_subcategories_keyboard`).
+
+Благодаря этому выбор категории и подкатегории в боте не обращается к базе данных,
+а в состоянии FSM хранятся только идентификаторы.
+
+Инвалидация:
+- `add_one_model_data` / `add_many_model_data` вызывают `catalog.invalidate()` при добавлении
+  категорий или подкатегорий; справочник перечитывается при следующем обращении.
+- Каждая инвалидация увеличивает поколение справочника. Загрузка, во время которой
+  справочник инвалидировали, не считается актуальной: её данные могли быть прочитаны
+  до добавления записей, и следующее обращение загрузит справочник заново.
+
+Основные компоненты:
+- `Catalog`: Кэш справочника.
+- `catalog`: Общий экземпляр кэша, используется ботом и API.
+"""
+
+from typing import Dict, Optional
+
+from aiogram.types import ReplyKeyboardMarkup
+from loguru import logger
+from sqlalchemy import select
+
+from app.bot.keyboards import get_subcategories_keyboard
+from app.dao.base import DatabaseSession as DB
+from app.dao.models import Category, Subcategory
+
+
+class Catalog:
+    """
+    Кэш справочника категорий и подкатегорий с готовыми клавиатурами.
+
+    Attributes:
+        categories (Dict[str, int]): Название категории -> идентификатор.
+        subcategories (Dict[int, Dict[str, int]]): Идентификатор категории ->
+            (название подкатегории -> идентификатор подкатегории).
+        keyboards (Dict[int, ReplyKeyboardMarkup]): Идентификатор категории -> клавиатура подкатегорий.
+    """
+    def __init__(self):
+        self.categories: Dict[str, int] = {}
+        self.subcategories: Dict[int, Dict[str, int]] = {}
+        self.keyboards: Dict[int, ReplyKeyboardMarkup] = {}
+        self._loaded = False
+        # Номер поколения: увеличивается при каждой инвалидации
+        self._generation = 0
+
+    async def load(self):
+        """
+        Загружает справочник из базы данных и собирает клавиатуры подкатегорий.
+        """
+        generation = self._generation
+        async with DB.get_session(commit=False, read_only=True) as session:
+            categories = (await session.execute(select(Category.id, Category.name))).all()
+            subcategories = (await session.execute(
+                select(Subcategory.id, Subcategory.category_id, Subcategory.name).order_by(Subcategory.id)
+            )).all()
+
+        self.categories = {name: category_id for category_id, name in categories}
+        self.subcategories = {category_id: {} for category_id, _ in categories}
+        for subcategory_id, category_id, name in subcategories:
+            self.subcategories.setdefault(category_id, {})[name] = subcategory_id
+        self.keyboards = {
+            category_id: get_subcategories_keyboard(list(names))
+            for category_id, names in self.subcategories.items()
+        }
+        # Инвалидация во время чтения: данные могли устареть, справочник остаётся незагруженным
+        self._loaded = generation == self._generation
+        logger.info(f"Справочник загружен: {len(categories)} категорий, {len(subcategories)} подкатегорий.")
+
+    def invalidate(self):
+        """
+        Помечает справочник устаревшим. Он будет перечитан при следующем обращении.
+        """
+        self._generation += 1
+        self._loaded = False
+        logger.info("Справочник категорий помечен устаревшим.")
+
+    async def ensure_loaded(self):
+        """
+        Загружает справочник, если он ещё не загружен или был инвалидирован.
+        """
+        if not self._loaded:
+            await self.load()
+
+    async def category_id(self, name: str) -> Optional[int]:
+        """
+        Возвращает идентификатор категории по названию или None.
+        """
+        await self.ensure_loaded()
+        return self.categories.get(name)
+
+    async def subcategory_id(self, category_id: int, name: str) -> Optional[int]:
+        """
+        Возвращает идентификатор подкатегории по названию внутри категории или None.
+        """
+        await self.ensure_loaded()
+        return self.subcategories.get(category_id, {}).get(name)
+
+    async def keyboard(self, category_id: int) -> ReplyKeyboardMarkup:
+        """
+        Возвращает готовую клавиатуру подкатегорий категории.
+        """
+        await self.ensure_loaded()
+        keyboard = self.keyboards.get(category_id)
+        if keyboard is None:
+            keyboard = get_subcategories_keyboard([])
+        return keyboard
+
+
+# Общий кэш справочника
+catalog = Catalog()
@@ -0,0 +1,120 @@
+"""
+Модуль кэша количества записей для пагинированных запросов.
+
+Пагинированные `find_transactions` и `find_many` возвращают "total_records" / "total_pages",
+для чего на каждой странице выполнялся отдельный `SELECT count(*)` по всему отфильтрованному
+набору. Кэш `CountCache` хранит результат подсчёта по ключу:
+- таблицы, участвующие в запросе, и их версии записи;
+- нормализованные фильтры (отсортированные пары ключ-значение);
+- период выборки;
+- область запроса (например, номер шарда, см. `app/dao/shards.py`).
+
+Версия записи таблицы увеличивается после коммита любой сессии, которая добавляла записи
+в эту таблицу через `MainGeneric` (см. `mark_written`), поэтому запись сразу делает
+закэшированные количества по этой таблице недействительными. Так как границы периодов
+("month", "year", ...) сдвигаются со временем, записи кэша также ограничены TTL.
+
+Основные компоненты:
+- `CountCache`: Кэш количества записей с версиями таблиц, TTL и ограничением размера.
+- `count_cache`: Общий экземпляр кэша.
+- `mark_written`: Отмечает, что сессия записала данные в таблицу.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.settings.config import count_cache_ttl, count_cache_max_entries
+
+
+class CountCache:
+    """
+    Кэш количества записей с инвалидацией по версии записи таблиц.
+
+    Attributes:
+        ttl (float): Время жизни записи кэша в секундах.
+        max_entries (int): Максимальное количество записей; самые старые вытесняются первыми.
+    """
+    def __init__(self, ttl: float = 60, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._versions: Dict[str, int] = {}
+        self._entries: "OrderedDict[Tuple, Tuple[float, int]]" = OrderedDict()
+
+    def version(self, table: str) -> int:
+        """Текущая версия записи таблицы."""
+        return self._versions.get(table, 0)
+
+    def bump(self, table: str):
+        """Увеличивает версию записи таблицы, делая недействительными её закэшированные количества."""
+        self._versions[table] = self.version(table) + 1
+
+    def key(
+            self, tables: Iterable[str],
+            filters: Optional[Dict[str, Any]],
+            period: Optional[str] = None,
+            scope: Any = None
+    ) -> Tuple:
+        """
+        Строит ключ кэша для запроса.
+
+        Args:
+            tables (Iterable[str]): Таблицы, участвующие в запросе.
+            filters (Optional[Dict[str, Any]]): Фильтры запроса.
+            period (Optional[str]): Период выборки.
+            scope (Any): Область запроса, например номер шарда.
+
+        Returns:
+            Tuple: Ключ кэша.
+        """
+        versions = tuple((table, self.version(table)) for table in sorted(tables))
+        normalized_filters = tuple(sorted((key, repr(value)) for key, value in (filters or {}).items()))
+        return versions, normalized_filters, period, scope
+
+    def get(self, key: Tuple) -> Optional[int]:
+        """Возвращает закэшированное количество или None, если его нет или оно устарело."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Tuple, value: int):
+        """Сохраняет количество записей."""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# Общий кэш количества записей
+count_cache = CountCache(ttl=count_cache_ttl, max_entries=count_cache_max_entries)
+
+
+def mark_written(session, table: str):
+    """
+    Отмечает, что сессия записала данные в таблицу. Версия таблицы увеличится после коммита.
+
+    Args:
+        session: Сессия SQLAlchemy (синхронная или AsyncSession).
+        table (str): Имя таблицы.
+    """
+    session.info.setdefault("written_tables", set()).add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_written_tables(session):
+    for table in session.info.pop("written_tables", ()):
+        count_cache.bump(table)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tables(session):
+    session.info.pop("written_tables", None)
@@ -0,0 +1,143 @@
+"""
+Модуль выбора ведущего процесса через Redis.
+
+В режиме вебхука с несколькими процессами uvicorn (`webhook_workers > 1`) каждый процесс
+выполняет хэндлеры запуска бота. Фоновые задачи, которые должны работать в одном экземпляре
+(обработчики общей очереди заданий на отчёты, предварительное формирование отчётов), запускаются
+только в ведущем процессе:
+- ведущий — процесс, которому удалось записать свой токен в ключ `leader:<имя>`
+  (`SET NX PX`); ключ живёт `ttl` секунд и продлевается каждые `ttl / 3` секунд;
+- остальные процессы с той же периодичностью пытаются занять ключ, поэтому при остановке
+  или сбое ведущего его задачи через `ttl` секунд запускает другой процесс;
+- продление и освобождение ключа выполняются скриптом Lua, который сравнивает токен:
+  процесс не может продлить или удалить чужую блокировку;
+- если ключ не удалось продлить дольше `ttl` (Redis недоступен или ключ занят другим
+  процессом), процесс останавливает свои задачи ведущего.
+
+Основные компоненты:
+- `RedisLeader`: Выбор ведущего процесса и запуск / остановка его задач.
+"""
+
+import asyncio
+import uuid
+from typing import Awaitable, Callable, List, Optional
+
+from loguru import logger
+
+from app.cache.redis import init_redis
+
+
+# Продление ключа, только если он принадлежит этому процессу
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Удаление ключа, только если он принадлежит этому процессу
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLeader:
+    """
+    Ведущий процесс среди процессов с общим Redis.
+
+    Attributes:
+        key (str): Ключ блокировки в Redis.
+        ttl (float): Время жизни блокировки, секунды.
+        token (str): Уникальный токен процесса.
+        is_leader (bool): Является ли процесс ведущим сейчас.
+    """
+    def __init__(self, name: str, ttl: float = 30):
+        self.key = f"leader:{name}"
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+        self.is_leader = False
+        self._on_elected: List[Callable[[], Awaitable[None]]] = []
+        self._on_lost: List[Callable[[], Awaitable[None]]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._renewed_at = 0.0
+
+    def run_while_leader(self, start: Callable[[], Awaitable[None]], stop: Callable[[], Awaitable[None]]):
+        """
+        Регистрирует задачу ведущего: `start` вызывается при получении ведущей роли, `stop` — при её потере.
+
+        Args:
+            start (Callable[[], Awaitable[None]]): Запуск задачи.
+            stop (Callable[[], Awaitable[None]]): Остановка задачи.
+        """
+        self._on_elected.append(start)
+        self._on_lost.append(stop)
+
+    async def start(self):
+        """
+        Запускает выбор ведущего. Повторный вызов ничего не делает.
+        """
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Останавливает выбор ведущего, задачи ведущего и освобождает блокировку.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.is_leader:
+            await self._demote()
+            try:
+                await (await init_redis()).eval(RELEASE_SCRIPT, 1, self.key, self.token)
+            except Exception as e:
+                logger.warning(f"Не удалось освободить блокировку {self.key}: {e}")
+
+    async def _run(self):
+        """Фоновая задача: занимает или продлевает блокировку каждые `ttl / 3` секунд."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                redis = await init_redis()
+                if self.is_leader:
+                    renewed = await redis.eval(RENEW_SCRIPT, 1, self.key, self.token, int(self.ttl * 1000))
+                    if renewed:
+                        self._renewed_at = loop.time()
+                    else:
+                        logger.warning(f"Блокировка {self.key} занята другим процессом.")
+                        await self._demote()
+                elif await redis.set(self.key, self.token, nx=True, px=int(self.ttl * 1000)):
+                    self._renewed_at = loop.time()
+                    await self._elect()
+            except Exception as e:
+                logger.warning(f"Ошибка выбора ведущего процесса ({self.key}): {e}")
+                if self.is_leader and loop.time() - self._renewed_at > self.ttl:
+                    # Блокировка истекла: её мог занять другой процесс
+                    await self._demote()
+            await asyncio.sleep(self.ttl / 3)
+
+    async def _elect(self):
+        self.is_leader = True
+        logger.info(f"Процесс стал ведущим ({self.key}), запуск фоновых задач.")
+        for start in self._on_elected:
+            try:
+                await start()
+            except Exception as e:
+                logger.error(f"Ошибка запуска фоновой задачи ведущего: {e}")
+
+    async def _demote(self):
+        self.is_leader = False
+        logger.info(f"Процесс больше не ведущий ({self.key}), остановка фоновых задач.")
+        for stop in reversed(self._on_lost):
+            try:
+                await stop()
+            except Exception as e:
+                logger.error(f"Ошибка остановки фоновой задачи ведущего: {e}")
@@ -1,15 +1,38 @@
 """
+Модуль подключения к Redis.
 
+Используется асинхронный клиент `redis.asyncio` (библиотека aioredis вошла в redis-py
+и не работает на Python 3.11). Подключение создаётся один раз и переиспользуется.
+
+Клиент общий для кэша отчётов и хранилища состояний бота (`app/bot/storage.py`).
+
+Основные функции:
+- `get_redis`: Возвращает общий клиент Redis (синхронно, подключение открывается при первой команде).
+- `init_redis`: Возвращает общий клиент Redis, создавая его при первом вызове.
+- `close_redis`: Закрывает клиент и пул подключений.
 """
 
+from typing import Optional
 
-from aioredis import Redis, create_redis_pool
+from redis.asyncio import Redis
 
-# Глобальная переменная для хранения пула подключений Redis
-redis: Redis = None
+from app.settings.config import redis_url
 
-async def init_redis() -> Redis:
+
+# Глобальная переменная для хранения клиента Redis (с собственным пулом подключений)
+redis: Optional[Redis] = None
+
+def get_redis() -> Redis:
     global redis
     if redis is None:
-        redis = await create_redis_pool("redis://localhost")
+        redis = Redis.from_url(redis_url)
     return redis
+
+async def init_redis() -> Redis:
+    return get_redis()
+
+async def close_redis():
+    global redis
+    if redis is not None:
+        await redis.aclose()
+        redis = None
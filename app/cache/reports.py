@@ -0,0 +1,199 @@
+"""
+Модуль кэша готовых отчётов.
+
+Повторный запрос того же отчёта (например, пользователь дважды нажал "Месяц") раньше
+заново читал транзакции и собирал XLSX. Кэш `ReportCache` хранит содержимое файла отчёта
+по ключу:
+- пользователь (фильтр `user_telegram_id`, None — отчёт по всем пользователям);
+- период, нормализованные фильтры и формат;
+- версия данных: (максимальный id, количество) транзакций пользователя в каждом
+  затронутом шарде (`data_version`).
+
+Новая транзакция пользователя меняет версию данных, поэтому отчёт пересобирается только
+после изменения данных этого пользователя. Границы скользящих периодов ("month", ...)
+сдвигаются со временем, поэтому записи кэша также ограничены TTL. Для отдельных записей
+TTL можно задать явно: предварительно сформированные отчёты (`app/reports/scheduler.py`)
+хранятся до следующего прохода в часы низкой нагрузки.
+
+Уровни кэша:
+- в памяти процесса: LRU с ограничением суммарного размера отчётов в байтах;
+- в Redis (`report_cache_redis = True`): общий для процессов, с тем же TTL.
+  Ошибки Redis не прерывают формирование отчёта, кэш продолжает работать в памяти.
+
+Основные компоненты:
+- `ReportCache`: Двухуровневый кэш содержимого отчётов.
+- `report_cache`: Общий экземпляр кэша.
+- `data_version`: Версия данных для ключа кэша.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import select, func
+
+from app.cache.redis import init_redis
+from app.dao.models import Transaction
+from app.dao.shards import shard_router
+from app.settings.config import report_cache_max_bytes, report_cache_ttl, report_cache_redis
+
+
+class ReportCache:
+    """
+    Кэш содержимого отчётов: LRU в памяти с ограничением по байтам и необязательный уровень Redis.
+
+    Attributes:
+        max_bytes (int): Максимальный суммарный размер отчётов в памяти.
+        ttl (float): Время жизни отчёта в секундах.
+        use_redis (bool): Использовать ли Redis как второй уровень.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600, use_redis: bool = False):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.use_redis = use_redis
+        # Ключ -> (момент устаревания по time.monotonic(), содержимое)
+        self._entries: "OrderedDict[Tuple, Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._redis_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key(
+            period: str,
+            filters: Optional[Dict[str, Any]],
+            format: str,
+            version: Tuple
+    ) -> Tuple:
+        """
+        Строит ключ кэша отчёта.
+
+        Args:
+            period (str): Период отчёта.
+            filters (Optional[Dict[str, Any]]): Фильтры отчёта.
+            format (str): Формат отчёта.
+            version (Tuple): Версия данных (`data_version`).
+
+        Returns:
+            Tuple: Ключ кэша.
+        """
+        filters = filters or {}
+        normalized_filters = tuple(sorted((key, repr(value)) for key, value in filters.items()))
+        return filters.get("user_telegram_id"), period, normalized_filters, format, version
+
+    @staticmethod
+    def _redis_key(key: Tuple) -> str:
+        return "report:" + hashlib.sha1(repr(key).encode()).hexdigest()
+
+    async def get(self, key: Tuple) -> Optional[bytes]:
+        """Возвращает содержимое отчёта или None, если его нет или оно устарело."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, content = entry
+            if time.monotonic() <= expires_at:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return content
+            self._evict(key)
+
+        if self.use_redis:
+            try:
+                content = await (await init_redis()).get(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"Кэш отчётов: Redis недоступен при чтении: {e}")
+                content = None
+            if content is not None:
+                self._store(key, content)
+                self._redis_hits += 1
+                return content
+
+        self._misses += 1
+        return None
+
+    def contains(self, key: Tuple) -> bool:
+        """Есть ли неустаревший отчёт в памяти процесса (без учёта в метриках)."""
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() <= entry[0]
+
+    async def set(self, key: Tuple, content: bytes, ttl: Optional[float] = None):
+        """
+        Сохраняет содержимое отчёта в память и (если включено) в Redis.
+
+        Args:
+            key (Tuple): Ключ кэша (`ReportCache.key`).
+            content (bytes): Содержимое отчёта.
+            ttl (Optional[float]): Время жизни записи в секундах. По умолчанию `self.ttl`.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        self._store(key, content, ttl)
+        if self.use_redis:
+            try:
+                await (await init_redis()).set(self._redis_key(key), content, ex=max(1, int(ttl)))
+            except Exception as e:
+                logger.warning(f"Кэш отчётов: Redis недоступен при записи: {e}")
+
+    def _store(self, key: Tuple, content: bytes, ttl: Optional[float] = None):
+        if len(content) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), content)
+        self._size += len(content)
+        while self._size > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: Tuple):
+        _, content = self._entries.pop(key)
+        self._size -= len(content)
+
+    def clear(self):
+        """Очищает кэш в памяти процесса."""
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Метрики кэша.
+
+        Returns:
+            Dict[str, Any]: Количество и суммарный размер отчётов в памяти, попадания и промахи.
+        """
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "redis_hits": self._redis_hits,
+            "misses": self._misses,
+        }
+
+
+# Общий кэш отчётов
+report_cache = ReportCache(max_bytes=report_cache_max_bytes, ttl=report_cache_ttl, use_redis=report_cache_redis)
+
+
+async def data_version(filters: Optional[Dict[str, Any]] = None) -> Tuple:
+    """
+    Версия данных для ключа кэша отчёта: (максимальный id, количество) транзакций.
+
+    С фильтром `user_telegram_id` считаются только транзакции пользователя в его шарде
+    (по индексу по пользователю), иначе — все транзакции каждого шарда.
+
+    Args:
+        filters (Optional[Dict[str, Any]]): Фильтры отчёта.
+
+    Returns:
+        Tuple: Пары (максимальный id, количество) по шардам.
+    """
+    query = select(func.max(Transaction.id), func.count(Transaction.id))
+    user_telegram_id = (filters or {}).get("user_telegram_id")
+    if user_telegram_id is not None:
+        query = query.where(Transaction.user_telegram_id == user_telegram_id)
+    shard = shard_router.shard_for_filters(filters)
+
+    async def fetch(session) -> Tuple:
+        return tuple((await session.execute(query)).one())
+
+    return tuple(await shard_router.fan_out(fetch, shards=[shard] if shard is not None else None))
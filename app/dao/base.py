@@ -1,15 +1,70 @@
 from typing import AsyncGenerator
-from sqlalchemy import Integer, inspect
+from sqlalchemy import Integer, inspect, event
+from sqlalchemy.engine import make_url
 from contextlib import asynccontextmanager
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncAttrs
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncAttrs, AsyncEngine
 from sqlalchemy.ext.declarative import declared_attr
 
+from app.settings import config
 from app.settings.config import database_url
 
 
-engine = create_async_engine(url=database_url)
-async_session_maker = async_sessionmaker(engine, class_=AsyncSession)
+def _apply_sqlite_pragmas(dbapi_connection, connection_record, read_only: bool = False):
+    """
+    Применяет профиль производительности SQLite к новому подключению.
+
+    Args:
+        dbapi_connection: Подключение DBAPI.
+        connection_record: Запись пула подключений.
+        read_only (bool): Запретить запись через это подключение (PRAGMA query_only).
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={config.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={config.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA mmap_size={config.sqlite_mmap_size}")
+    cursor.execute(f"PRAGMA cache_size={config.sqlite_cache_size}")
+    cursor.execute(f"PRAGMA busy_timeout={config.sqlite_busy_timeout}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def create_engine_from_settings(url: str = database_url, read_only: bool = False) -> AsyncEngine:
+    """
+    Создаёт асинхронный движок с параметрами пула и профилем SQLite из настроек.
+
+    Args:
+        url (str): Строка подключения к базе данных.
+        read_only (bool): Движок только для чтения: отдельный пул, запись запрещена.
+
+    Returns:
+        AsyncEngine: Асинхронный движок SQLAlchemy.
+    """
+    parsed_url = make_url(url)
+    options = {"pool_pre_ping": config.db_pool_pre_ping}
+    # База в памяти использует один общий connection (StaticPool), размер пула к ней неприменим
+    if parsed_url.database not in (None, "", ":memory:"):
+        options["pool_size"] = config.db_read_pool_size if read_only else config.db_pool_size
+        options["max_overflow"] = config.db_read_max_overflow if read_only else config.db_max_overflow
+
+    new_engine = create_async_engine(url=url, **options)
+    if parsed_url.get_backend_name() == "sqlite":
+        event.listen(
+            new_engine.sync_engine, "connect",
+            lambda dbapi_connection, connection_record: _apply_sqlite_pragmas(
+                dbapi_connection, connection_record, read_only=read_only
+            )
+        )
+    return new_engine
+
+
+# Движок записи и отдельный движок только для чтения: в режиме WAL чтение отчётов не ждёт запись бота
+write_engine = create_engine_from_settings()
+read_engine = create_engine_from_settings(read_only=True)
+engine = write_engine
+async_session_maker = async_sessionmaker(write_engine, class_=AsyncSession)
+read_session_maker = async_sessionmaker(read_engine, class_=AsyncSession)
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -34,8 +89,16 @@ class Base(AsyncAttrs, DeclarativeBase):
 class DatabaseSession:
     @staticmethod
     @asynccontextmanager
-    async def get_session(commit: bool = False) -> AsyncSession:
-        async with async_session_maker() as session:
+    async def get_session(commit: bool = False, read_only: bool = False) -> AsyncSession:
+        """
+        Открывает асинхронную сессию.
+
+        Args:
+            commit (bool): Зафиксировать транзакцию при успешном завершении.
+            read_only (bool): Использовать движок только для чтения.
+        """
+        session_maker = read_session_maker if read_only else async_session_maker
+        async with session_maker() as session:
             try:
                 yield session
                 if commit:
@@ -7,8 +7,10 @@
 Основные возможности:
 - Поиск всех записей модели с возможностью пагинации и фильтрации.
 - Поиск одной записи по уникальному идентификатору (например, telegram_id).
-- Добавление одной или нескольких записей в модель.
+- Добавление одной или нескольких записей в модель (в том числе пакетная вставка без ORM-объектов).
+  Для транзакций в той же сессии обновляются дневные итоги (`app/dao/rollup.py`).
 - Поиск транзакций с объединением данных из связанных таблиц (пользователи, категории, подкатегории).
+- Потоковое чтение транзакций порциями из серверного курсора.
 - Обработка ошибок и логирование операций (Loguru).
 
 Классы:
@@ -20,17 +22,248 @@
 - Метод `find_transactions` предназначен для работы с моделью `Transaction` и объединяет данные из связанных таблиц.
 """
 
+import base64
+import json
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import Type, Generic, List, Any, Dict, Optional
+from typing import Type, Generic, List, Any, Dict, Optional, Tuple, AsyncIterator
+from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from sqlalchemy import select, func
+from sqlalchemy import select, insert, func, tuple_, bindparam, Integer
 from loguru import logger
 from datetime import datetime, timedelta
 
 from app.dao.schemas import PyBaseModel
-from app.dao.models import User, Transaction, Category, Subcategory
+from app.dao.models import User, Transaction, Category, Subcategory, DailyRollup
+from app.dao.rollup import apply_to_rollup
+from app.cache.counts import count_cache, mark_written
+
+
+def encode_cursor(date: datetime, record_id: int) -> str:
+    """
+    Кодирует позицию последней записи страницы в непрозрачный курсор.
+
+    Args:
+        date (datetime): Дата последней записи страницы.
+        record_id (int): Идентификатор последней записи страницы.
+
+    Returns:
+        str: Курсор для запроса следующей страницы.
+    """
+    payload = json.dumps([date.isoformat(), record_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Декодирует курсор, полученный из `encode_cursor`.
+
+    Args:
+        cursor (str): Курсор из поля "next_cursor" предыдущей страницы.
+
+    Returns:
+        Tuple[datetime, int]: Дата и идентификатор последней записи предыдущей страницы.
+
+    Raises:
+        HTTPException: Если курсор повреждён.
+    """
+    try:
+        date, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(date), int(record_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Некорректный курсор") from e
+
+
+def get_period_bounds(period: str) -> Tuple[datetime, datetime]:
+    """
+    Возвращает границы периода выборки относительно текущего момента.
+
+    Args:
+        period (str): Период: "month", "3months", "6months", "year" или "all".
+
+    Returns:
+        Tuple[datetime, datetime]: Начальная и конечная даты периода.
+
+    Raises:
+        HTTPException: Если период не поддерживается.
+    """
+    end_date = datetime.now()
+    if period == "month":
+        start_date = end_date - timedelta(days=30)
+    elif period == "3months":
+        start_date = end_date - timedelta(days=90)
+    elif period == "6months":
+        start_date = end_date - timedelta(days=180)
+    elif period == "year":
+        start_date = end_date - timedelta(days=365)
+    elif period == "all":
+        start_date = datetime.min  # Начало всех времён
+    else:
+        raise HTTPException(status_code=400, detail="Неподдерживаемый период")
+    return start_date, end_date
+
+
+def _build_filter_columns() -> Dict[str, Any]:
+    """
+    Собирает соответствие названия фильтра колонке модели.
+
+    Колонка ищется последовательно в моделях Transaction, User, Category и Subcategory,
+    поэтому, например, "name" относится к категории, а не к подкатегории.
+    """
+    filter_columns = {}
+    for model in (Transaction, User, Category, Subcategory):
+        for attr in model.__mapper__.column_attrs:
+            filter_columns.setdefault(attr.key, getattr(model, attr.key))
+    return filter_columns
+
+
+# Название фильтра -> колонка; вычисляется один раз вместо проверки hasattr на каждый запрос
+FILTER_COLUMNS = _build_filter_columns()
+
+
+def resolve_filter_column(key: str):
+    """
+    Находит колонку для фильтра по транзакциям.
+
+    Args:
+        key (str): Название фильтра.
+
+    Returns:
+        Колонка SQLAlchemy или None, если такой колонки нет ни в одной модели.
+    """
+    return FILTER_COLUMNS.get(key)
+
+
+@lru_cache(maxsize=None)
+def get_transactions_statements(filter_keys: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Возвращает готовые запросы транзакций для набора ключей фильтров.
+
+    Запросы строятся один раз для каждого набора ключей (размер кэша ограничен числом
+    сочетаний колонок из `FILTER_COLUMNS`), значения фильтров, границы периода, LIMIT/OFFSET
+    и позиция курсора передаются параметрами при выполнении (см. `transactions_query_params`).
+    Повторные вызовы не строят запрос заново, а SQLAlchemy находит его скомпилированную
+    форму в своём кэше.
+
+    Args:
+        filter_keys (Tuple[str, ...]): Отсортированные ключи фильтров из `FILTER_COLUMNS`.
+
+    Returns:
+        Dict[str, Any]: Запросы:
+            - "base": JOIN, фильтры и период без сортировки;
+            - "count": количество записей;
+            - "all": все записи по возрастанию (date, id);
+            - "page": страница по LIMIT/OFFSET (параметры "limit", "offset");
+            - "keyset": первая страница по курсору (параметр "limit");
+            - "keyset_after": страница после курсора (параметры "limit", "cursor_date", "cursor_id").
+    """
+    base = (
+        select(
+            Transaction.id,
+            Transaction.date,
+            User.username.label("user_name"),
+            Category.name.label("category_name"),
+            Subcategory.name.label("subcategory_name"),
+            Transaction.amount,
+            Transaction.comment
+        )
+        .join(User, Transaction.user_telegram_id == User.telegram_id)
+        .join(Category, Transaction.category_id == Category.id)
+        .join(Subcategory, Transaction.subcategory_id == Subcategory.id)
+    )
+    for key in filter_keys:
+        base = base.filter(FILTER_COLUMNS[key] == bindparam(f"filter_{key}"))
+    base = base.filter(
+        Transaction.date >= bindparam("start_date"),
+        Transaction.date <= bindparam("end_date")
+    )
+
+    cte = base.cte("filtered_transactions")
+    limit = bindparam("limit", type_=Integer)
+    ordered = base.order_by(Transaction.date.asc(), Transaction.id.asc())
+    return {
+        "base": base,
+        "count": select(func.count()).select_from(cte),
+        "all": ordered,
+        "page": select(cte).order_by(cte.c.date.asc(), cte.c.id.asc())
+            .limit(limit).offset(bindparam("offset", type_=Integer)),
+        "keyset": ordered.limit(limit),
+        "keyset_after": ordered.filter(
+            tuple_(Transaction.date, Transaction.id) > tuple_(
+                bindparam("cursor_date", type_=Transaction.date.type),
+                bindparam("cursor_id", type_=Integer)
+            )
+        ).limit(limit),
+    }
+
+
+def transactions_query_params(
+        filter_dict: Dict[str, Any],
+        start_date: datetime,
+        end_date: datetime
+) -> Tuple[Tuple[str, ...], Dict[str, Any]]:
+    """
+    Нормализует фильтры для `get_transactions_statements`.
+
+    Ключи, которым не соответствует ни одна колонка, игнорируются.
+
+    Args:
+        filter_dict (Dict[str, Any]): Фильтры для поиска.
+        start_date (datetime): Начальная дата периода.
+        end_date (datetime): Конечная дата периода.
+
+    Returns:
+        Tuple[Tuple[str, ...], Dict[str, Any]]: Набор ключей фильтров и параметры запроса.
+    """
+    filter_keys = tuple(sorted(key for key in filter_dict if key in FILTER_COLUMNS))
+    params = {f"filter_{key}": filter_dict[key] for key in filter_keys}
+    params["start_date"] = start_date
+    params["end_date"] = end_date
+    return filter_keys, params
+
+
+def format_record(record) -> Dict[str, Any]:
+    """
+    Преобразует строку результата запроса транзакций в словарь с датой в виде строки.
+
+    Args:
+        record: Строка результата (RowMapping) запроса `build_transactions_query`.
+
+    Returns:
+        Dict[str, Any]: Запись с датой в формате "%Y-%m-%d %H:%M:%S".
+    """
+    formatted_record = dict(record)
+    formatted_record["date"] = formatted_record["date"].strftime("%Y-%m-%d %H:%M:%S")
+    return formatted_record
+
+
+# Способы подсчёта общего количества записей в `MainGeneric.find_transactions`
+COUNT_MODES = ("exact", "cached", "estimate")
+
+# Таблицы запроса `build_transactions_query`: запись в любую из них меняет количество записей
+TRANSACTION_QUERY_TABLES = tuple(
+    model.__tablename__ for model in (Transaction, User, Category, Subcategory)
+)
+
+
+# Ключи группировки для `MainGeneric.aggregate`: колонка-идентификатор или формат даты (strftime)
+AGGREGATE_GROUP_COLUMNS = {
+    "user": "user_telegram_id",
+    "category": "category_id",
+    "subcategory": "subcategory_id",
+}
+AGGREGATE_GROUP_DATE_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-%W",
+    "month": "%Y-%m",
+}
+AGGREGATE_GROUPS = (*AGGREGATE_GROUP_COLUMNS, *AGGREGATE_GROUP_DATE_FORMATS)
+
+# Колонки транзакции, фильтр по которым можно применить к таблице дневных итогов:
+# у остальных (id, amount, date, ...) в `DailyRollup` либо нет аналога, либо смысл другой
+ROLLUP_FILTER_COLUMNS = frozenset(AGGREGATE_GROUP_COLUMNS.values())
 
 
 class MainGeneric:
@@ -72,11 +305,7 @@ class MainGeneric:
         else:
             filter_dict = filters if filters is not None else {}
         try:
-            # Запрос для подсчета общего количества записей
-            count_query = select(func.count()).select_from(self.model).filter_by(**filter_dict)
-            total_records = (await session.execute(count_query)).scalar()
-
-            # Запрос для получения записей с пагинацией
+            # Запрос для получения записей
             records_query = (
                 select(self.model)
                 .filter_by(**filter_dict)
@@ -85,55 +314,91 @@ class MainGeneric:
             records_result = await session.execute(records_query)
             records = records_result.scalars().all()
 
-            # Возвращаем записи и общее количество
+            # Возвращаются все подходящие записи, поэтому отдельный COUNT-запрос не нужен
             return {
                 "records": records,
-                "total_records": total_records,
+                "total_records": len(records),
             }
 
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при поиске всех записей: {e}.")
             raise
 
+    def build_transactions_query(
+            self,
+            filter_dict: Dict[str, Any],
+            start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None
+    ):
+        """
+        Строит запрос транзакций с объединением связанных таблиц, фильтрами и границами периода.
+
+        Значения фильтров и дат уже подставлены в запрос. Внутри `MainGeneric` используются
+        готовые запросы `get_transactions_statements` с параметрами при выполнении.
+
+        Args:
+            filter_dict (Dict[str, Any]): Фильтры для поиска.
+            start_date (Optional[datetime]): Начальная дата для фильтрации.
+            end_date (Optional[datetime]): Конечная дата для фильтрации.
+
+        Returns:
+            Select: Запрос SQLAlchemy без сортировки и пагинации.
+        """
+        filter_keys, params = transactions_query_params(
+            filter_dict, start_date or datetime.min, end_date or datetime.max
+        )
+        return get_transactions_statements(filter_keys)["base"].params(params)
+
     async def find_transactions(
             self, session: AsyncSession,
             filters: Optional[Dict[str, Any]] = None,
             paginate: bool = True,
             page: int = 1,
             page_size: int = 10,
-            period: str = "all"
+            period: str = "all",
+            keyset: bool = False,
+            cursor: Optional[str] = None,
+            with_total: bool = True,
+            count_mode: str = "cached"
     ) -> Dict[str, Any]:
         """
         Возвращает список записей с объединением данных из связанных таблиц.
 
+        Поддерживаются два режима пагинации:
+        - по номеру страницы (LIMIT/OFFSET), стоимость растёт с номером страницы;
+        - по курсору (keyset): выборка продолжается после пары (date, id) последней
+          записи предыдущей страницы, поэтому любая страница стоит как первая.
+
         Args:
             session (AsyncSession): Асинхронная сессия SQLAlchemy.
             filters (Optional[Dict[str, Any]]): Фильтры для поиска.
-            page (int): Номер страницы.
+            paginate (bool): Флаг пагинации. Если False, возвращаются все записи.
+            page (int): Номер страницы (только для пагинации по номеру страницы).
             page_size (int): Количество записей на странице.
-            start_date (Optional[datetime]): Начальная дата для фильтрации.
-            end_date (Optional[datetime]): Конечная дата для фильтрации.
+            period (str): Период выборки: "month", "3months", "6months", "year", "all".
+            keyset (bool): Включает пагинацию по курсору.
+            cursor (Optional[str]): Курсор "next_cursor" из предыдущей страницы.
+                Передача курсора включает пагинацию по курсору.
+            with_total (bool): Считать ли общее количество записей (отдельный COUNT-запрос).
+            count_mode (str): Способ подсчёта общего количества записей:
+                - "exact": COUNT-запрос на каждой странице;
+                - "cached": COUNT-запрос один раз, далее значение из `count_cache`
+                  до записи в участвующие таблицы или истечения TTL;
+                - "estimate": оценка по таблице дневных итогов (границы периода округляются
+                  до дней), если фильтры это позволяют, иначе как "cached".
 
         Returns:
             Dict[str, Any]: Словарь, содержащий:
                 - "records": Список записей с объединенными данными.
-                - "total_records": Общее количество записей, удовлетворяющих фильтрам.
-                - "total_pages": Общее количество страниц.
+                - "total_records": Общее количество записей, удовлетворяющих фильтрам
+                  (None, если with_total=False).
+                - "total_pages": Общее количество страниц (None, если with_total=False).
+                - "page": Номер страницы (только для пагинации по номеру страницы).
+                - "next_cursor": Курсор следующей страницы или None, если страница последняя
+                  (только для пагинации по курсору).
         """
         
-        end_date = datetime.now()
-        if period == "month":
-            start_date = end_date - timedelta(days=30)
-        elif period == "3months":
-            start_date = end_date - timedelta(days=90)
-        elif period == "6months":
-            start_date = end_date - timedelta(days=180)
-        elif period == "year":
-            start_date = end_date - timedelta(days=365)
-        elif period == "all":
-            start_date = datetime.min  # Начало всех времён
-        else:
-            raise HTTPException(status_code=400, detail="Неподдерживаемый период")
+        start_date, end_date = get_period_bounds(period)
 
         logger.info(f"Поиск записей {self.model.__name__} за период {period}по фильтрам: {filters}")
 
@@ -143,88 +408,306 @@ class MainGeneric:
             filter_dict = filters if filters is not None else {}
 
         try:
-            # Базовый запрос с JOIN и фильтрами
-            base_query = (
-                select(
-                    Transaction.id,
-                    Transaction.date,
-                    User.username.label("user_name"),
-                    Category.name.label("category_name"),
-                    Subcategory.name.label("subcategory_name"),
-                    Transaction.amount,
-                    Transaction.comment
-                )
-                .join(User, Transaction.user_telegram_id == User.telegram_id)
-                .join(Category, Transaction.category_id == Category.id)
-                .join(Subcategory, Transaction.subcategory_id == Subcategory.id)
-            )
+            filter_keys, params = transactions_query_params(filter_dict, start_date, end_date)
+            statements = get_transactions_statements(filter_keys)
 
-            # Применяем фильтры
-            for key, value in filter_dict.items():
-                if hasattr(Transaction, key):
-                    base_query = base_query.filter(getattr(Transaction, key) == value)
-                elif hasattr(User, key):
-                    base_query = base_query.filter(getattr(User, key) == value)
-                elif hasattr(Category, key):
-                    base_query = base_query.filter(getattr(Category, key) == value)
-                elif hasattr(Subcategory, key):
-                    base_query = base_query.filter(getattr(Subcategory, key) == value)
-
-            # Фильтрация по датам
-            if start_date:
-                base_query = base_query.filter(Transaction.date >= start_date)
-            if end_date:
-                base_query = base_query.filter(Transaction.date <= end_date)
-
-            # Используем CTE для подсчёта и пагинации
-            cte = base_query.cte("filtered_transactions")
-            count_query = select(func.count()).select_from(cte)
-            total_records = (await session.execute(count_query)).scalar()
-
-            logger.info(f"Найдено записей {total_records}")
-
-            # Если пагинация отключена, возвращаем все записи
+            # Если пагинация отключена, возвращаем все записи: их количество известно без COUNT-запроса
             if not paginate:
-                result = await session.execute(select(cte).order_by(cte.c.date.asc()))
+                result = await session.execute(statements["all"], params)
                 records = result.mappings().all()
-                formatted_records = [
-                    {**dict(record), "date": record["date"].strftime("%Y-%m-%d %H:%M:%S")}
-                    for record in records
-                ]
+                formatted_records = [format_record(record) for record in records]
+                logger.info(f"Найдено записей {len(formatted_records)}")
                 return {
                     "records": formatted_records,
-                    "total_records": total_records,
+                    "total_records": len(formatted_records),
                     "total_pages": 1  # Для совместимости с интерфейсом
                 }
 
+            total_records = None
+            if with_total:
+                total_records = await self._count_transactions(
+                    session, statements["count"], params, filter_dict, period, count_mode
+                )
+                logger.info(f"Найдено записей {total_records}")
 
-            paginated_query = (
-                select(cte)
-                .order_by(cte.c.date.asc())
-                .limit(page_size)
-                .offset((page - 1) * page_size)
+            total_pages = (
+                (total_records + page_size - 1) // page_size if total_records is not None else None
             )
 
-            result = await session.execute(paginated_query)
+            # Пагинация по курсору: поиск по (date, id) вместо OFFSET
+            if keyset or cursor is not None:
+                # Лишняя запись показывает, есть ли следующая страница
+                keyset_params = {**params, "limit": page_size + 1}
+                if cursor is not None:
+                    keyset_params["cursor_date"], keyset_params["cursor_id"] = decode_cursor(cursor)
+                    keyset_query = statements["keyset_after"]
+                else:
+                    keyset_query = statements["keyset"]
+                result = await session.execute(keyset_query, keyset_params)
+                records = result.mappings().all()
+
+                next_cursor = None
+                if len(records) > page_size:
+                    records = records[:page_size]
+                    next_cursor = encode_cursor(records[-1]["date"], records[-1]["id"])
+
+                formatted_records = [format_record(record) for record in records]
+                return {
+                    "records": formatted_records,
+                    "next_cursor": next_cursor,
+                    "total_records": total_records,
+                    "total_pages": total_pages
+                }
+
+            result = await session.execute(
+                statements["page"],
+                {**params, "limit": page_size, "offset": (page - 1) * page_size}
+            )
             records = result.mappings().all()
 
-            formatted_records = []
-            for record in records:
-                formatted_record = dict(record)
-                formatted_record["date"] = formatted_record["date"].strftime("%Y-%m-%d %H:%M:%S")
-                formatted_records.append(formatted_record)
+            formatted_records = [format_record(record) for record in records]
 
             return {
                 "page": page,
                 "records": formatted_records,
                 "total_records": total_records,
-                "total_pages": (total_records + page_size - 1) // page_size
+                "total_pages": total_pages
             }
         except SQLAlchemyError as e:
             logger.error(f"Ошибка при поиске записей с объединением: {e}")
             raise
 
 
+    async def _count_transactions(
+            self, session: AsyncSession,
+            count_query,
+            params: Dict[str, Any],
+            filter_dict: Dict[str, Any],
+            period: str,
+            count_mode: str
+    ) -> int:
+        """
+        Считает количество записей для `find_transactions` с учётом `count_mode`.
+
+        Returns:
+            int: Количество записей (точное, закэшированное или оценка по дневным итогам).
+
+        Raises:
+            HTTPException: Если передан неподдерживаемый `count_mode`.
+        """
+        if count_mode not in COUNT_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Неподдерживаемый способ подсчёта: {count_mode}. Доступные: {', '.join(COUNT_MODES)}"
+            )
+
+        if count_mode == "estimate":
+            summary = await self.aggregate(session, [], filter_dict, period)
+            if summary["source"] == DailyRollup.__tablename__:
+                return summary["records"][0]["count"] or 0
+
+        key = count_cache.key(TRANSACTION_QUERY_TABLES, filter_dict, period, scope=session.info.get("shard"))
+        if count_mode != "exact":
+            total_records = count_cache.get(key)
+            if total_records is not None:
+                return total_records
+
+        total_records = (await session.execute(count_query, params)).scalar()
+        count_cache.set(key, total_records)
+        return total_records
+
+    async def stream_transactions(
+            self, session: AsyncSession,
+            filters: Optional[Dict[str, Any]] = None,
+            period: str = "all",
+            chunk_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Потоково возвращает транзакции за период порциями фиксированного размера.
+
+        В отличие от `find_transactions(paginate=False)`, результат не загружается в память
+        целиком: строки читаются из серверного курсора (`session.stream` + `yield_per`),
+        и в памяти одновременно находится только текущая порция.
+
+        Args:
+            session (AsyncSession): Асинхронная сессия SQLAlchemy. Должна оставаться открытой,
+                пока генератор не будет исчерпан.
+            filters (Optional[Dict[str, Any]]): Фильтры для поиска.
+            period (str): Период выборки, как в `find_transactions`.
+            chunk_size (int): Количество записей в одной порции.
+
+        Yields:
+            List[Dict[str, Any]]: Порция записей в формате `find_transactions`, по возрастанию (date, id).
+
+        Raises:
+            SQLAlchemyError: Если произошла ошибка при выполнении запроса.
+        """
+        start_date, end_date = get_period_bounds(period)
+
+        logger.info(f"Потоковое чтение {self.model.__name__} за период {period} по фильтрам: {filters}")
+
+        if filters is not None and isinstance(filters, PyBaseModel):
+            filter_dict = filters.dict()
+        else:
+            filter_dict = filters if filters is not None else {}
+
+        try:
+            filter_keys, params = transactions_query_params(filter_dict, start_date, end_date)
+            result = await session.stream(
+                get_transactions_statements(filter_keys)["all"],
+                params,
+                execution_options={"yield_per": chunk_size}
+            )
+            total_records = 0
+            async for partition in result.mappings().partitions(chunk_size):
+                total_records += len(partition)
+                yield [format_record(record) for record in partition]
+            logger.info(f"Прочитано записей {total_records}")
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при потоковом чтении записей: {e}")
+            raise
+
+    async def aggregate(
+            self, session: AsyncSession,
+            group_by: List[str],
+            filters: Optional[Dict[str, Any]] = None,
+            period: str = "all",
+            use_rollup: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Возвращает сумму, количество и среднее транзакций, сгруппированные на стороне БД.
+
+        Группировка и агрегирование выполняются одним запросом с GROUP BY, строки транзакций
+        в Python не передаются. Связанные таблицы присоединяются только для фильтров по их
+        колонкам и для названий категорий / подкатегорий в результате.
+
+        Если все фильтры относятся к пользователю, категории или подкатегории, данные читаются
+        из таблицы дневных итогов `DailyRollup` (O(дней × подкатегорий) строк). Границы периода
+        в этом случае округляются до целых дней.
+
+        Args:
+            session (AsyncSession): Асинхронная сессия SQLAlchemy.
+            group_by (List[str]): Ключи группировки из `AGGREGATE_GROUPS`:
+                "user", "category", "subcategory", "day", "week", "month".
+            filters (Optional[Dict[str, Any]]): Фильтры, как в `find_transactions`.
+            period (str): Период выборки, как в `find_transactions`.
+            use_rollup (bool): Разрешить чтение из таблицы дневных итогов.
+                False — точный расчёт по таблице транзакций.
+
+        Returns:
+            Dict[str, Any]: Словарь, содержащий:
+                - "group_by": Ключи группировки.
+                - "records": Список групп с полями ключей, "total", "count" и "average".
+                - "total_records": Количество групп.
+                - "source": Источник данных: "rollup" или "transactions".
+
+        Raises:
+            HTTPException: Если передан неподдерживаемый ключ группировки или период.
+            SQLAlchemyError: Если произошла ошибка при выполнении запроса.
+        """
+        unknown = [key for key in group_by if key not in AGGREGATE_GROUPS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Неподдерживаемая группировка: {', '.join(unknown)}. "
+                       f"Доступные: {', '.join(AGGREGATE_GROUPS)}"
+            )
+        start_date, end_date = get_period_bounds(period)
+
+        if filters is not None and isinstance(filters, PyBaseModel):
+            filter_dict = filters.dict()
+        else:
+            filter_dict = filters if filters is not None else {}
+
+        # Фильтры по колонкам транзакции допустимы для итогов, только если колонка из ROLLUP_FILTER_COLUMNS
+        filter_columns = {key: resolve_filter_column(key) for key in filter_dict}
+        rollup_allowed = use_rollup and all(
+            column is None or column.class_ is not Transaction or column.key in ROLLUP_FILTER_COLUMNS
+            for column in filter_columns.values()
+        )
+        source = DailyRollup if rollup_allowed else Transaction
+
+        logger.info(
+            f"Агрегирование {self.model.__name__} за период {period} по {group_by}, фильтры: {filters}, "
+            f"источник: {source.__tablename__}"
+        )
+
+        try:
+            if source is DailyRollup:
+                date_column = DailyRollup.day
+                date_filters = [DailyRollup.day >= start_date.date(), DailyRollup.day <= end_date.date()]
+                total = func.sum(DailyRollup.total)
+                count = func.sum(DailyRollup.count)
+                average = total * 1.0 / count
+            else:
+                date_column = Transaction.date
+                date_filters = [Transaction.date >= start_date, Transaction.date <= end_date]
+                total = func.sum(Transaction.amount)
+                count = func.count(Transaction.id)
+                average = func.avg(Transaction.amount)
+
+            group_columns = []
+            for key in group_by:
+                if key in AGGREGATE_GROUP_COLUMNS:
+                    group_columns.append(getattr(source, AGGREGATE_GROUP_COLUMNS[key]).label(AGGREGATE_GROUP_COLUMNS[key]))
+                else:
+                    group_columns.append(func.strftime(AGGREGATE_GROUP_DATE_FORMATS[key], date_column).label(key))
+
+            grouped_query = select(
+                *group_columns,
+                total.label("total"),
+                count.label("count"),
+                average.label("average"),
+            ).select_from(source)
+
+            # Присоединяем только те таблицы, по колонкам которых есть фильтры
+            joins = {
+                User: source.user_telegram_id == User.telegram_id,
+                Category: source.category_id == Category.id,
+                Subcategory: source.subcategory_id == Subcategory.id,
+            }
+            joined = set()
+            for key, value in filter_dict.items():
+                column = filter_columns[key]
+                if column is None:
+                    continue
+                if column.class_ is Transaction:
+                    column = getattr(source, column.key)
+                elif column.class_ not in joined:
+                    grouped_query = grouped_query.join(column.class_, joins[column.class_])
+                    joined.add(column.class_)
+                grouped_query = grouped_query.filter(column == value)
+
+            grouped_query = grouped_query.filter(*date_filters).group_by(*group_columns)
+
+            # Названия категорий и подкатегорий подставляются уже к сгруппированным строкам
+            grouped = grouped_query.subquery("grouped")
+            columns = [grouped.c[column.name] for column in group_columns]
+            query = select(*columns)
+            if "category" in group_by:
+                query = query.add_columns(Category.name.label("category_name")).outerjoin(
+                    Category, grouped.c.category_id == Category.id
+                )
+            if "subcategory" in group_by:
+                query = query.add_columns(Subcategory.name.label("subcategory_name")).outerjoin(
+                    Subcategory, grouped.c.subcategory_id == Subcategory.id
+                )
+            query = query.add_columns(grouped.c.total, grouped.c.count, grouped.c.average).order_by(*columns)
+
+            result = await session.execute(query)
+            records = [dict(record) for record in result.mappings().all()]
+
+            logger.info(f"Получено групп: {len(records)}")
+            return {
+                "group_by": group_by,
+                "records": records,
+                "total_records": len(records),
+                "source": source.__tablename__,
+            }
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при агрегировании записей: {e}")
+            raise
+
     async def find_user(self, session: AsyncSession, tg_id: int):
         """
         Поиск записи по идентификатору пользователя (telegram_id).
@@ -273,6 +756,9 @@ class MainGeneric:
             session.add(new_record)
             await session.flush()
             await session.refresh(new_record)
+            mark_written(session, self.model.__tablename__)
+            if self.model is Transaction:
+                await apply_to_rollup(session, [new_record.to_dict()])
 
             logger.info(f"Запись успешно добавлена: {new_record.to_dict()}.")
             return new_record
@@ -281,22 +767,42 @@ class MainGeneric:
             await session.rollback()
             raise
 
-    async def add_many(self, session: AsyncSession, values: List[Dict[str, Any]]):
+    async def add_many(
+            self, session: AsyncSession,
+            values: List[Dict[str, Any]],
+            bulk: bool = False,
+            chunk_size: int = 1000,
+            return_ids: bool = True
+    ):
         """
         Добавление нескольких записей в модель.
 
+        По умолчанию создаются ORM-объекты, и каждый из них перечитывается из базы после вставки.
+        В режиме `bulk` записи вставляются пакетами через Core `insert()` по таблице модели
+        (executemany, а при `return_ids` — INSERT ... RETURNING на пакет) без создания
+        ORM-объектов, без перечитывания и без логирования каждой записи.
+
         Args:
             session (AsyncSession): Асинхронная сессия SQLAlchemy.
             values (List[Dict[str, Any]]): Список данных для добавления.
+            bulk (bool): Пакетная вставка без создания ORM-объектов.
+            chunk_size (int): Количество записей в одном пакете (только для `bulk`).
+            return_ids (bool): Возвращать идентификаторы добавленных записей (только для `bulk`).
 
         Returns:
             List[Any]: Список добавленных записей.
+            В режиме `bulk` — словарь с ключами "count" и "ids" (если return_ids=True),
+            идентификаторы отсортированы по возрастанию.
 
         Raises:
+            HTTPException: Если в режиме `bulk` размер пакета меньше 1 (400).
             SQLAlchemyError: Если произошла ошибка при добавлении записей.
         """
         logger.info(f"Добавление нескольких записей в {self.model.__name__}:")
         try:
+            if bulk:
+                return await self._bulk_insert(session, values, chunk_size, return_ids)
+
             new_records = [
                 self.model(**value.dict() if isinstance(value, PyBaseModel) else value)
                 for value in values
@@ -305,6 +811,9 @@ class MainGeneric:
             await session.flush()
             for record in new_records:
                 await session.refresh(record)
+            mark_written(session, self.model.__tablename__)
+            if self.model is Transaction:
+                await apply_to_rollup(session, [record.to_dict() for record in new_records])
 
             logger.info(f"Успешно добавлено {len(new_records)} записей.")
             return new_records
@@ -313,6 +822,45 @@ class MainGeneric:
             await session.rollback()
             raise
 
+    async def _bulk_insert(
+            self, session: AsyncSession,
+            values: List[Dict[str, Any]],
+            chunk_size: int,
+            return_ids: bool
+    ) -> Dict[str, Any]:
+        """
+        Пакетная вставка записей для `add_many(bulk=True)`.
+
+        Returns:
+            Dict[str, Any]: "count" — количество добавленных записей, "ids" — их идентификаторы
+            (только при return_ids=True).
+
+        Raises:
+            HTTPException: Если размер пакета меньше 1 (400).
+        """
+        if chunk_size < 1:
+            raise HTTPException(status_code=400, detail="Размер пакета chunk_size должен быть не меньше 1")
+        rows = [value.dict() if isinstance(value, PyBaseModel) else value for value in values]
+        table = self.model.__table__
+        ids = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            if return_ids:
+                # Без sort_by_parameter_order: упорядочивание RETURNING в SQLite на порядок медленнее
+                result = await session.execute(insert(table).returning(table.c.id), chunk)
+                ids.extend(result.scalars().all())
+            else:
+                await session.execute(insert(table), chunk)
+        ids.sort()
+        mark_written(session, self.model.__tablename__)
+        if self.model is Transaction:
+            await apply_to_rollup(session, rows)
+
+        logger.info(f"Пакетно добавлено {len(rows)} записей (размер пакета {chunk_size}).")
+        if return_ids:
+            return {"count": len(rows), "ids": ids}
+        return {"count": len(rows)}
+
     async def get_report(
         self, session: AsyncSession,
         start_date: datetime,
@@ -9,15 +9,23 @@
 - `Category`: Модель для таблицы категорий.
 - `Subcategory`: Модель для таблицы подкатегорий.
 - `Transaction`: Модель для таблицы транзакций.
+- `DailyRollup`: Модель для таблицы дневных итогов по транзакциям.
 
 Связи между моделями:
 - Пользователь (User) может иметь множество транзакций (Transaction).
 - Категория (Category) может иметь множество подкатегорий (Subcategory) и транзакций (Transaction).
 - Подкатегория (Subcategory) связана с одной категорией и может иметь множество транзакций.
 - Транзакция (Transaction) связана с пользователем, категорией и подкатегорией.
+- Дневной итог (DailyRollup) хранит сумму и количество транзакций пользователя за день
+  по подкатегории и обновляется в той же транзакции БД, что и вставка транзакций (`app/dao/rollup.py`).
+
+Индексы:
+- Индексы таблицы транзакций повторяют реальные шаблоны запросов (фильтр по пользователю,
+  подкатегории, категории и периоду, сортировка по (date, id)). Изменения индексов
+  сопровождаются миграцией Alembic в `migrations/versions`.
 """
 
-from sqlalchemy import DateTime, Integer, String, Text, ForeignKey
+from sqlalchemy import Date, DateTime, Integer, String, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship, DeclarativeBase
 
 from app.dao.base import Base
@@ -66,6 +74,9 @@ class Subcategory(Base):
         transactions (Mapped[list["Transaction"]]): Список транзакций, связанных с подкатегорией.
     """
     __tablename__ = 'subcategories'
+    __table_args__ = (
+        Index("ix_subcategories_category_id", "category_id"),
+    )
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id")) 
     name: Mapped[str] = mapped_column(String) 
     category: Mapped["Category"] = relationship(back_populates="subcategories")
@@ -88,6 +99,16 @@ class Transaction(Base):
         subcategory (Mapped["Subcategory"]): Подкатегория, связанная с транзакцией.
     """
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Отчёты и выборки пользователя за период
+        Index("ix_transactions_user_date", "user_telegram_id", "date"),
+        # Выборки пользователя по подкатегории за период
+        Index("ix_transactions_user_subcategory_date", "user_telegram_id", "subcategory_id", "date"),
+        # Выборки по категории (Доход / Расход) за период
+        Index("ix_transactions_category_date", "category_id", "date"),
+        # Выборки за период без фильтров и пагинация по курсору (date, id)
+        Index("ix_transactions_date_id", "date", "id"),
+    )
     date: Mapped[DateTime] = mapped_column(DateTime) 
     user_telegram_id: Mapped[int] = mapped_column(ForeignKey("users.telegram_id"))
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id")) 
@@ -100,6 +121,35 @@ class Transaction(Base):
     subcategory: Mapped["Subcategory"] = relationship(back_populates="transactions")
 
 
+class DailyRollup(Base):
+    """
+    Модель для таблицы дневных итогов по транзакциям.
+
+    Одна строка на (пользователь, день, категория, подкатегория). Поддерживается
+    инкрементально при добавлении транзакций, пересчитывается командой
+    `python -m app.dao.rollup rebuild`.
+
+    Attributes:
+        user_telegram_id (Mapped[int]): Идентификатор пользователя.
+        day (Mapped[Date]): День транзакций.
+        category_id (Mapped[int]): Идентификатор категории.
+        subcategory_id (Mapped[int]): Идентификатор подкатегории.
+        total (Mapped[int]): Сумма транзакций за день.
+        count (Mapped[int]): Количество транзакций за день.
+    """
+    __tablename__ = 'transactions_daily'
+    __table_args__ = (
+        UniqueConstraint("user_telegram_id", "day", "category_id", "subcategory_id", name="uq_transactions_daily_key"),
+        Index("ix_transactions_daily_day", "day"),
+    )
+    user_telegram_id: Mapped[int] = mapped_column(ForeignKey("users.telegram_id"))
+    day: Mapped[Date] = mapped_column(Date)
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
+    subcategory_id: Mapped[int] = mapped_column(ForeignKey("subcategories.id"))
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
 # Словарь с именами моделей, используется в роутерах API
 MODELS = {
     "User": User,
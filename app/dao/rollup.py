@@ -0,0 +1,188 @@
+"""
+Модуль для работы с таблицей дневных итогов по транзакциям (`DailyRollup`).
+
+Итоги хранятся по ключу (user_telegram_id, day, category_id, subcategory_id) и содержат
+сумму и количество транзакций. Благодаря им сводки за период читают
+O(дней × подкатегорий) строк вместо O(транзакций).
+
+Основные функции:
+- `apply_to_rollup`: Добавляет вставляемые транзакции к итогам (вызывается из `MainGeneric.add_one` /
+  `MainGeneric.add_many` в той же сессии, поэтому итоги фиксируются вместе с транзакциями).
+- `rebuild_rollup`: Полный пересчёт итогов по таблице транзакций (первичное заполнение).
+- `check_rollup`: Проверка согласованности итогов с таблицей транзакций.
+
+Запуск из командной строки:
+    python -m app.dao.rollup rebuild
+    python -m app.dao.rollup check
+"""
+
+import asyncio
+import sys
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from loguru import logger
+from sqlalchemy import select, delete, func, and_, literal
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.dao.base import DatabaseSession as DB
+from app.dao.models import Transaction, DailyRollup
+
+
+def _day_of(value: Any) -> date:
+    """Возвращает день транзакции для даты в виде datetime, date или строки ISO."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+
+async def apply_to_rollup(session: AsyncSession, rows: Iterable[Dict[str, Any]]):
+    """
+    Добавляет транзакции к дневным итогам (UPSERT по ключу итога).
+
+    Args:
+        session (AsyncSession): Сессия, в которой вставляются сами транзакции.
+        rows (Iterable[Dict[str, Any]]): Данные вставляемых транзакций.
+    """
+    deltas: Dict[Tuple[int, date, int, int], List[Any]] = {}
+    for row in rows:
+        key = (row["user_telegram_id"], _day_of(row["date"]), row["category_id"], row["subcategory_id"])
+        delta = deltas.setdefault(key, [0, 0])
+        delta[0] += row["amount"]
+        delta[1] += 1
+    if not deltas:
+        return
+
+    query = sqlite_insert(DailyRollup.__table__)
+    query = query.on_conflict_do_update(
+        index_elements=["user_telegram_id", "day", "category_id", "subcategory_id"],
+        set_={
+            "total": DailyRollup.__table__.c.total + query.excluded.total,
+            "count": DailyRollup.__table__.c.count + query.excluded.count,
+        },
+    )
+    await session.execute(query, [
+        {
+            "user_telegram_id": user_telegram_id,
+            "day": day,
+            "category_id": category_id,
+            "subcategory_id": subcategory_id,
+            "total": total,
+            "count": count,
+        }
+        for (user_telegram_id, day, category_id, subcategory_id), (total, count) in deltas.items()
+    ])
+
+
+def _rollup_from_transactions():
+    """Запрос, вычисляющий дневные итоги напрямую по таблице транзакций."""
+    return (
+        select(
+            Transaction.user_telegram_id,
+            func.date(Transaction.date).label("day"),
+            Transaction.category_id,
+            Transaction.subcategory_id,
+            func.sum(Transaction.amount).label("total"),
+            func.count(Transaction.id).label("count"),
+        )
+        .group_by(
+            Transaction.user_telegram_id,
+            func.date(Transaction.date),
+            Transaction.category_id,
+            Transaction.subcategory_id,
+        )
+    )
+
+
+async def rebuild_rollup(session: AsyncSession) -> int:
+    """
+    Полностью пересчитывает дневные итоги по таблице транзакций.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy (коммит выполняет вызывающий код).
+
+    Returns:
+        int: Количество строк итогов после пересчёта.
+    """
+    logger.info("Пересчёт дневных итогов по транзакциям.")
+    await session.execute(delete(DailyRollup))
+    source = _rollup_from_transactions()
+    await session.execute(
+        DailyRollup.__table__.insert().from_select(
+            ["user_telegram_id", "day", "category_id", "subcategory_id", "total", "count"], source
+        )
+    )
+    rows = (await session.execute(select(func.count()).select_from(DailyRollup))).scalar()
+    logger.info(f"Дневные итоги пересчитаны: {rows} строк.")
+    return rows
+
+
+async def check_rollup(session: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    Сравнивает дневные итоги с итогами, вычисленными по таблице транзакций.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy.
+
+    Returns:
+        List[Dict[str, Any]]: Расхождения: ключ итога, значения в таблице итогов ("rollup_*")
+        и значения по транзакциям ("actual_*"). Пустой список, если итоги согласованы.
+    """
+    actual = _rollup_from_transactions().subquery("actual")
+    rollup = DailyRollup.__table__
+    key_matches = and_(
+        actual.c.user_telegram_id == rollup.c.user_telegram_id,
+        actual.c.day == rollup.c.day,
+        actual.c.category_id == rollup.c.category_id,
+        actual.c.subcategory_id == rollup.c.subcategory_id,
+    )
+    # SQLite не поддерживает FULL OUTER JOIN: проверяем расхождения в обе стороны
+    missing_or_different = (
+        select(
+            actual.c.user_telegram_id, actual.c.day, actual.c.category_id, actual.c.subcategory_id,
+            rollup.c.total.label("rollup_total"), rollup.c.count.label("rollup_count"),
+            actual.c.total.label("actual_total"), actual.c.count.label("actual_count"),
+        )
+        .select_from(actual.outerjoin(rollup, key_matches))
+        .where((rollup.c.id.is_(None)) | (rollup.c.total != actual.c.total) | (rollup.c.count != actual.c.count))
+    )
+    orphaned = (
+        select(
+            rollup.c.user_telegram_id, rollup.c.day, rollup.c.category_id, rollup.c.subcategory_id,
+            rollup.c.total.label("rollup_total"), rollup.c.count.label("rollup_count"),
+            literal(None).label("actual_total"), literal(None).label("actual_count"),
+        )
+        .select_from(rollup.outerjoin(actual, key_matches))
+        .where(actual.c.user_telegram_id.is_(None), rollup.c.count != 0)
+    )
+    mismatches = []
+    for query in (missing_or_different, orphaned):
+        mismatches.extend(dict(row) for row in (await session.execute(query)).mappings().all())
+    if mismatches:
+        logger.warning(f"Дневные итоги расходятся с транзакциями: {len(mismatches)} ключей.")
+    else:
+        logger.info("Дневные итоги согласованы с транзакциями.")
+    return mismatches
+
+
+async def main(command: str):
+    if command == "rebuild":
+        async with DB.get_session(commit=True) as session:
+            await rebuild_rollup(session)
+    elif command == "check":
+        async with DB.get_session(commit=False, read_only=True) as session:
+            mismatches = await check_rollup(session)
+        for mismatch in mismatches:
+            print(mismatch)
+        if mismatches:
+            sys.exit(1)
+    else:
+        print("Использование: python -m app.dao.rollup [rebuild|check]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else ""))
@@ -0,0 +1,595 @@
+"""
+Модуль горизонтального шардирования транзакций по пользователям.
+
+Транзакции пользователя хранятся в одной из N баз данных (шардов): номер шарда равен
+`user_telegram_id % N`. У каждого шарда свои движки записи и чтения
+(`create_engine_from_settings`), поэтому блокировка записи одного файла SQLite
+не останавливает запись в остальные.
+
+Справочники (`User`, `Category`, `Subcategory`) небольшие и нужны каждому шарду для
+объединения данных в запросах транзакций, поэтому они дублируются во все шарды с теми же
+идентификаторами. Шард 0 — основная база `database_url`, при одном шарде все операции
+выполняются в ней без накладных расходов.
+
+Основные компоненты:
+- `ShardRouter`: Выбор шарда, сессии шардов и операции с маршрутизацией:
+  запись транзакций в шард пользователя, дублирование справочников во все шарды,
+  параллельный опрос всех шардов (`asyncio.gather`) с объединением результатов.
+- `shard_router`: Общий экземпляр по настройкам (`database_url` + `shard_urls`).
+- `reshard`: Перенос транзакций в шарды по текущим настройкам (после изменения числа шардов
+  или из прежней единой базы) с сохранением идентификаторов; прерванный перенос продолжается
+  с последней порции (`reshard_checkpoint_path`).
+
+Ограничения:
+- Пагинация по курсору без фильтра `user_telegram_id` при нескольких шардах не поддерживается:
+  курсор (date, id) однозначен только внутри одного шарда.
+- Идентификаторы транзакций выдаются каждым шардом независимо. Если при переносе id транзакции
+  уже занят в целевом шарде другой транзакцией, `reshard` останавливается с `ReshardConflict`.
+- Версии таблиц в `count_cache` общие для всех шардов: запись в любой шард делает
+  недействительными закэшированные количества всех шардов.
+
+Запуск из командной строки:
+    python -m app.dao.shards reshard [SOURCE_URL ...]
+"""
+
+import asyncio
+import heapq
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.dao.base import Base, write_engine, read_engine, create_engine_from_settings
+from app.dao.generic import MainGeneric
+from app.dao.models import User, Category, Subcategory, Transaction
+from app.dao.rollup import rebuild_rollup
+from app.dao.schemas import PyBaseModel
+from app.settings.config import shard_urls, reshard_checkpoint_path
+
+
+# Справочники, которые дублируются во все шарды (в порядке зависимостей внешних ключей)
+REPLICATED_MODELS = (User, Category, Subcategory)
+
+
+def _as_dict(values: Any) -> Dict[str, Any]:
+    """Возвращает данные записи в виде словаря (словарь или объект PyBaseModel)."""
+    return values.dict() if isinstance(values, PyBaseModel) else values
+
+
+class ShardRouter:
+    """
+    Маршрутизатор запросов по шардам.
+
+    Attributes:
+        engines (List[Tuple[AsyncEngine, AsyncEngine]]): Движки (запись, чтение) каждого шарда.
+    """
+    def __init__(self, engines: Sequence[Tuple[AsyncEngine, AsyncEngine]]):
+        self.engines = list(engines)
+        self._write_makers = [async_sessionmaker(write, class_=AsyncSession) for write, _ in self.engines]
+        self._read_makers = [async_sessionmaker(read, class_=AsyncSession) for _, read in self.engines]
+
+    @classmethod
+    def from_urls(cls, urls: Sequence[str]) -> "ShardRouter":
+        """
+        Создаёт маршрутизатор с новыми движками для каждой строки подключения.
+
+        Args:
+            urls (Sequence[str]): Строки подключения шардов, по порядку номеров.
+
+        Returns:
+            ShardRouter: Маршрутизатор.
+        """
+        return cls([
+            (create_engine_from_settings(url), create_engine_from_settings(url, read_only=True))
+            for url in urls
+        ])
+
+    @property
+    def count(self) -> int:
+        """Количество шардов."""
+        return len(self.engines)
+
+    def shard_for(self, user_telegram_id: int) -> int:
+        """Номер шарда пользователя."""
+        return int(user_telegram_id) % self.count
+
+    def shard_for_filters(self, filters: Optional[Dict[str, Any]]) -> Optional[int]:
+        """
+        Номер шарда, если фильтры ограничивают выборку одним пользователем или шард один.
+
+        Returns:
+            Optional[int]: Номер шарда или None, если нужно опросить все шарды.
+        """
+        if self.count == 1:
+            return 0
+        filter_dict = _as_dict(filters) if filters is not None else {}
+        if filter_dict.get("user_telegram_id") is not None:
+            return self.shard_for(filter_dict["user_telegram_id"])
+        return None
+
+    def split_by_shard(self, values: Sequence[Any]) -> Dict[int, List[Dict[str, Any]]]:
+        """Группирует данные транзакций по шардам их пользователей."""
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for value in values:
+            row = _as_dict(value)
+            groups.setdefault(self.shard_for(row["user_telegram_id"]), []).append(row)
+        return groups
+
+    @asynccontextmanager
+    async def session(self, shard: int, commit: bool = False, read_only: bool = False) -> AsyncSession:
+        """
+        Открывает асинхронную сессию шарда (как `DatabaseSession.get_session`).
+
+        Args:
+            shard (int): Номер шарда.
+            commit (bool): Зафиксировать транзакцию при успешном завершении.
+            read_only (bool): Использовать движок только для чтения.
+        """
+        session_maker = self._read_makers[shard] if read_only else self._write_makers[shard]
+        async with session_maker() as session:
+            # Номер шарда различает закэшированные количества записей разных шардов
+            session.info["shard"] = shard
+            try:
+                yield session
+                if commit:
+                    await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                await session.close()
+
+    async def fan_out(
+            self, func: Callable[[AsyncSession], Any],
+            shards: Optional[Sequence[int]] = None,
+            commit: bool = False,
+            read_only: bool = True
+    ) -> List[Any]:
+        """
+        Выполняет `func(session)` во всех (или указанных) шардах одновременно.
+
+        Args:
+            func (Callable[[AsyncSession], Any]): Асинхронная функция от сессии шарда.
+            shards (Optional[Sequence[int]]): Номера шардов. По умолчанию все.
+            commit (bool): Зафиксировать транзакцию в каждом шарде.
+            read_only (bool): Использовать движки только для чтения.
+
+        Returns:
+            List[Any]: Результаты по шардам в порядке номеров.
+        """
+        async def run(shard: int):
+            async with self.session(shard, commit=commit, read_only=read_only) as session:
+                return await func(session)
+
+        return await asyncio.gather(*(run(shard) for shard in (shards if shards is not None else range(self.count))))
+
+    async def add_one(self, model, values: Any):
+        """
+        Добавляет запись: транзакцию — в шард пользователя, справочник — во все шарды.
+
+        Returns:
+            Any: Добавленная запись (для справочников — из шарда 0).
+        """
+        if model is Transaction:
+            shard = self.shard_for(_as_dict(values)["user_telegram_id"])
+            async with self.session(shard, commit=True) as session:
+                return await MainGeneric(model).add_one(session=session, values=values)
+
+        async with self.session(0, commit=True) as session:
+            result = await MainGeneric(model).add_one(session=session, values=values)
+            ids = [result.id]
+        await self._replicate(model, ids)
+        return result
+
+    async def add_many(self, model, values: Sequence[Any], **kwargs):
+        """
+        Добавляет записи: транзакции — пакетами в шарды пользователей (параллельно),
+        справочники — в шард 0 с последующим дублированием в остальные шарды.
+
+        Args:
+            model: Модель SQLAlchemy.
+            values (Sequence[Any]): Данные для добавления.
+            **kwargs: Параметры `MainGeneric.add_many` (bulk, chunk_size, return_ids).
+
+        Returns:
+            Результат `MainGeneric.add_many`. Для транзакций в нескольких шардах при `bulk`
+            количества складываются, а идентификаторы возвращаются по шардам ("ids_by_shard").
+        """
+        if model is not Transaction:
+            if self.count > 1 and kwargs.get("bulk"):
+                # Идентификаторы нужны, чтобы скопировать записи в остальные шарды
+                kwargs["return_ids"] = True
+            async with self.session(0, commit=True) as session:
+                result = await MainGeneric(model).add_many(session=session, values=values, **kwargs)
+                ids = result.get("ids", []) if isinstance(result, dict) else [record.id for record in result]
+            await self._replicate(model, ids)
+            return result
+
+        groups = self.split_by_shard(values)
+        if len(groups) <= 1:
+            shard = next(iter(groups), 0)
+            async with self.session(shard, commit=True) as session:
+                return await MainGeneric(model).add_many(session=session, values=values, **kwargs)
+
+        shards = sorted(groups)
+        results = await asyncio.gather(*(
+            self._add_many_to_shard(model, shard, groups[shard], **kwargs) for shard in shards
+        ))
+        if not kwargs.get("bulk"):
+            return [record for shard_records in results for record in shard_records]
+        merged: Dict[str, Any] = {"count": sum(result["count"] for result in results)}
+        if kwargs.get("return_ids", True):
+            merged["ids_by_shard"] = {shard: result["ids"] for shard, result in zip(shards, results)}
+        return merged
+
+    async def _add_many_to_shard(self, model, shard: int, rows: List[Dict[str, Any]], **kwargs):
+        async with self.session(shard, commit=True) as session:
+            return await MainGeneric(model).add_many(session=session, values=rows, **kwargs)
+
+    async def _replicate(self, model, ids: Sequence[int]):
+        """Копирует записи справочника из шарда 0 в остальные шарды с теми же идентификаторами."""
+        if self.count == 1 or not ids:
+            return
+        async with self.session(0, read_only=True) as session:
+            records = (await session.execute(select(model).where(model.id.in_(ids)))).scalars().all()
+            rows = [record.to_dict() for record in records]
+        await self.fan_out(
+            lambda session: upsert_rows(session, model, rows),
+            shards=range(1, self.count), commit=True, read_only=False
+        )
+
+    async def find_transactions(self, filters: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """
+        `MainGeneric.find_transactions` с маршрутизацией по шардам.
+
+        С фильтром по пользователю (или при одном шарде) запрос выполняется в одном шарде.
+        Иначе опрашиваются все шарды: для пагинации по номеру страницы каждый шард возвращает
+        первые `page * page_size` записей, результаты объединяются по (date, id) и обрезаются
+        до нужной страницы; количества записей складываются.
+
+        Args:
+            filters (Optional[Dict[str, Any]]): Фильтры для поиска.
+            **kwargs: Параметры `MainGeneric.find_transactions`.
+
+        Returns:
+            Dict[str, Any]: Результат в формате `MainGeneric.find_transactions`.
+
+        Raises:
+            HTTPException: Пагинация по курсору без фильтра по пользователю при нескольких шардах.
+        """
+        generic = MainGeneric(Transaction)
+        shard = self.shard_for_filters(filters)
+        if shard is not None:
+            async with self.session(shard, read_only=True) as session:
+                return await generic.find_transactions(session=session, filters=filters, **kwargs)
+
+        if kwargs.get("keyset") or kwargs.get("cursor") is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="Пагинация по курсору при нескольких шардах требует фильтра user_telegram_id"
+            )
+
+        paginate = kwargs.get("paginate", True)
+        page = kwargs.get("page", 1)
+        page_size = kwargs.get("page_size", 10)
+        shard_kwargs = dict(kwargs)
+        if paginate:
+            shard_kwargs.update(page=1, page_size=page * page_size)
+
+        results = await self.fan_out(
+            lambda session: generic.find_transactions(session=session, filters=filters, **shard_kwargs)
+        )
+        records = sorted(
+            (record for result in results for record in result["records"]),
+            key=lambda record: (record["date"], record["id"])
+        )
+        totals = [result["total_records"] for result in results]
+        total_records = sum(totals) if all(total is not None for total in totals) else None
+        if not paginate:
+            return {"records": records, "total_records": len(records), "total_pages": 1}
+        return {
+            "page": page,
+            "records": records[(page - 1) * page_size:page * page_size],
+            "total_records": total_records,
+            "total_pages": (total_records + page_size - 1) // page_size if total_records is not None else None
+        }
+
+    async def stream_transactions(
+            self, filters: Optional[Dict[str, Any]] = None,
+            period: str = "all",
+            chunk_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        `MainGeneric.stream_transactions` с маршрутизацией по шардам.
+
+        При нескольких шардах потоки всех шардов читаются одновременно и сливаются по дате
+        (k-way merge), так что в памяти находится не больше одной порции на шард.
+
+        Yields:
+            List[Dict[str, Any]]: Порция записей по возрастанию даты.
+        """
+        shard = self.shard_for_filters(filters)
+        shards = [shard] if shard is not None else list(range(self.count))
+        streams = [self._stream_shard(shard, filters, period, chunk_size) for shard in shards]
+        try:
+            if len(streams) == 1:
+                async for chunk in streams[0]:
+                    yield chunk
+                return
+
+            chunks = list(await asyncio.gather(*(anext(stream, None) for stream in streams)))
+            positions = [0] * len(streams)
+            heap = [(chunk[0]["date"], index) for index, chunk in enumerate(chunks) if chunk]
+            heapq.heapify(heap)
+            output = []
+            while heap:
+                _, index = heapq.heappop(heap)
+                output.append(chunks[index][positions[index]])
+                positions[index] += 1
+                if positions[index] == len(chunks[index]):
+                    chunks[index] = await anext(streams[index], None)
+                    positions[index] = 0
+                if chunks[index]:
+                    heapq.heappush(heap, (chunks[index][positions[index]]["date"], index))
+                if len(output) == chunk_size:
+                    yield output
+                    output = []
+            if output:
+                yield output
+        finally:
+            for stream in streams:
+                await stream.aclose()
+
+    async def _stream_shard(self, shard: int, filters, period: str, chunk_size: int):
+        async with self.session(shard, read_only=True) as session:
+            async for chunk in MainGeneric(Transaction).stream_transactions(
+                session=session, filters=filters, period=period, chunk_size=chunk_size
+            ):
+                yield chunk
+
+    async def aggregate(self, group_by: List[str], filters: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        """
+        `MainGeneric.aggregate` с маршрутизацией по шардам.
+
+        Группы разных шардов с одинаковыми ключами объединяются: суммы и количества
+        складываются, среднее пересчитывается.
+
+        Returns:
+            Dict[str, Any]: Результат в формате `MainGeneric.aggregate`.
+        """
+        generic = MainGeneric(Transaction)
+        shard = self.shard_for_filters(filters)
+        if shard is not None:
+            async with self.session(shard, read_only=True) as session:
+                return await generic.aggregate(session=session, group_by=group_by, filters=filters, **kwargs)
+
+        results = await self.fan_out(
+            lambda session: generic.aggregate(session=session, group_by=group_by, filters=filters, **kwargs)
+        )
+        groups: Dict[Tuple, Dict[str, Any]] = {}
+        for result in results:
+            for record in result["records"]:
+                key = tuple((name, value) for name, value in record.items() if name not in ("total", "count", "average"))
+                merged = groups.setdefault(key, {**dict(key), "total": 0, "count": 0})
+                merged["total"] += record["total"] or 0
+                merged["count"] += record["count"] or 0
+        records = []
+        for key in sorted(groups, key=lambda key: tuple((value is None, value) for _, value in key)):
+            record = groups[key]
+            record["average"] = record["total"] / record["count"] if record["count"] else None
+            records.append(record)
+        return {
+            "group_by": group_by,
+            "records": records,
+            "total_records": len(records),
+            "source": ",".join(sorted({result["source"] for result in results})),
+        }
+
+    async def create_all(self):
+        """Создаёт таблицы во всех шардах (для новых файлов шардов)."""
+        for write, _ in self.engines:
+            async with write.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+
+    async def dispose(self):
+        """Закрывает подключения всех шардов."""
+        for write, read in self.engines:
+            await write.dispose()
+            await read.dispose()
+
+
+async def upsert_rows(session: AsyncSession, model, rows: List[Dict[str, Any]]):
+    """Вставляет записи с их идентификаторами, пропуская уже существующие."""
+    if rows:
+        await session.execute(sqlite_insert(model.__table__).on_conflict_do_nothing(), rows)
+
+
+# Общий маршрутизатор: шард 0 использует основные движки приложения
+shard_router = ShardRouter(
+    [(write_engine, read_engine)]
+    + [(create_engine_from_settings(url), create_engine_from_settings(url, read_only=True)) for url in shard_urls]
+)
+
+
+class ReshardConflict(RuntimeError):
+    """Запись с тем же идентификатором уже есть в целевом шарде, но с другими данными."""
+
+
+def _load_checkpoint(path: str) -> Dict[str, int]:
+    """Читает последние перенесённые id по источникам (пустой словарь, если переноса не было)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _save_checkpoint(path: str, checkpoint: Dict[str, int]):
+    """Атомарно сохраняет последние перенесённые id по источникам."""
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(path + ".tmp", path)
+
+
+async def copy_rows(session: AsyncSession, model, rows: List[Dict[str, Any]]) -> int:
+    """
+    Копирует записи с их идентификаторами: уже существующие совпадающие записи пропускаются.
+
+    Args:
+        session (AsyncSession): Сессия целевого шарда.
+        model: Модель SQLAlchemy.
+        rows (List[Dict[str, Any]]): Записи вместе с "id".
+
+    Returns:
+        int: Количество вставленных записей.
+
+    Raises:
+        ReshardConflict: Если запись с тем же id уже есть, но её данные отличаются.
+    """
+    if not rows:
+        return 0
+    existing = {
+        record.id: record.to_dict()
+        for record in (await session.execute(
+            select(model).where(model.id.in_([row["id"] for row in rows]))
+        )).scalars().all()
+    }
+    conflicts = [row["id"] for row in rows if row["id"] in existing and existing[row["id"]] != row]
+    if conflicts:
+        raise ReshardConflict(
+            f"{model.__tablename__}: записи с id {conflicts[:10]} уже есть в целевой базе с другими данными"
+        )
+    new_rows = [row for row in rows if row["id"] not in existing]
+    if new_rows:
+        await session.execute(
+            sqlite_insert(model.__table__).on_conflict_do_nothing(index_elements=["id"]), new_rows
+        )
+    return len(new_rows)
+
+
+async def reshard(
+        router: ShardRouter,
+        source_urls: Sequence[str] = (),
+        chunk_size: int = 5000,
+        checkpoint_path: str = reshard_checkpoint_path
+) -> Dict[int, int]:
+    """
+    Переносит транзакции в шарды по правилу `router.shard_for`.
+
+    Источники — шарды самого маршрутизатора (перебалансировка после изменения числа шардов)
+    и дополнительные базы `source_urls` (например, прежняя единая база). Справочники копируются
+    из источников во все шарды. Транзакции, уже лежащие в своём шарде, не трогаются;
+    остальные копируются в целевой шард с прежними идентификаторами и только после фиксации
+    копии удаляются из шарда-источника (из дополнительных баз — только копируются).
+    В конце пересчитываются дневные итоги изменённых шардов.
+
+    Перенос идемпотентен: запись, уже скопированная с тем же id и теми же данными, пропускается,
+    поэтому повторный запуск (в том числе с теми же `source_urls`) не создаёт дубликатов.
+    После каждой порции последний обработанный id источника сохраняется в `checkpoint_path`,
+    и прерванный перенос продолжается с этого места; после успешного завершения файл удаляется.
+
+    Запись с тем же id, но другими данными в целевой базе (справочник или транзакция)
+    останавливает перенос с ошибкой `ReshardConflict` до удаления чего-либо из источника
+    этой порции: такие записи нужно разобрать вручную.
+
+    Args:
+        router (ShardRouter): Маршрутизатор целевых шардов.
+        source_urls (Sequence[str]): Дополнительные базы-источники.
+        chunk_size (int): Количество транзакций, переносимых за один шаг.
+        checkpoint_path (str): Файл с последними перенесёнными id по источникам.
+
+    Returns:
+        Dict[int, int]: Количество перенесённых транзакций по целевым шардам.
+
+    Raises:
+        ReshardConflict: Если в целевой базе есть запись с тем же id и другими данными.
+    """
+    await router.create_all()
+    external = ShardRouter.from_urls(source_urls)
+    sources = [(router, shard, True) for shard in range(router.count)]
+    sources += [(external, shard, False) for shard in range(external.count)]
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if checkpoint:
+        logger.info(f"Продолжение прерванного переноса с позиций: {checkpoint}")
+
+    moved: Dict[int, int] = {shard: 0 for shard in range(router.count)}
+    changed = set()
+    try:
+        for source, source_shard, is_target in sources:
+            source_key = source.engines[source_shard][0].url.render_as_string(hide_password=True)
+            async with source.session(source_shard, read_only=True) as session:
+                catalog_rows = {
+                    model: [record.to_dict() for record in (await session.execute(select(model))).scalars().all()]
+                    for model in REPLICATED_MODELS
+                }
+
+            async def copy_catalog(session: AsyncSession):
+                for model in REPLICATED_MODELS:
+                    await copy_rows(session, model, catalog_rows[model])
+
+            await router.fan_out(copy_catalog, commit=True, read_only=False)
+
+            last_id = checkpoint.get(source_key, 0)
+            while True:
+                async with source.session(source_shard, read_only=True) as session:
+                    records = (await session.execute(
+                        select(Transaction).where(Transaction.id > last_id).order_by(Transaction.id).limit(chunk_size)
+                    )).scalars().all()
+                    rows = [record.to_dict() for record in records]
+                if not rows:
+                    break
+                last_id = rows[-1]["id"]
+
+                groups: Dict[int, List[Dict[str, Any]]] = {}
+                for row in rows:
+                    target = router.shard_for(row["user_telegram_id"])
+                    if is_target and target == source_shard:
+                        continue
+                    groups.setdefault(target, []).append(row)
+                for target, target_rows in groups.items():
+                    async with router.session(target, commit=True) as session:
+                        moved[target] += await copy_rows(session, Transaction, target_rows)
+                    changed.add(target)
+
+                if is_target and groups:
+                    # Удаляются только записи, копии которых уже зафиксированы в целевых шардах
+                    async with router.session(source_shard, commit=True) as session:
+                        await session.execute(delete(Transaction).where(
+                            Transaction.id.in_([row["id"] for target_rows in groups.values() for row in target_rows])
+                        ))
+                    changed.add(source_shard)
+
+                checkpoint[source_key] = last_id
+                _save_checkpoint(checkpoint_path, checkpoint)
+
+            logger.info(f"Источник {source_shard} ({'шард' if is_target else 'внешняя база'}) обработан.")
+
+        for shard in sorted(changed):
+            async with router.session(shard, commit=True) as session:
+                await rebuild_rollup(session)
+    finally:
+        await external.dispose()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    logger.info(f"Перенесено транзакций по шардам: {moved}")
+    return moved
+
+
+async def main(args: List[str]):
+    if not args or args[0] != "reshard":
+        print("Использование: python -m app.dao.shards reshard [SOURCE_URL ...]")
+        sys.exit(2)
+    moved = await reshard(shard_router, args[1:])
+    for shard, count in moved.items():
+        print(f"Шард {shard}: перенесено {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,221 @@
+"""
+Модуль отложенной пакетной записи (write-behind) для транзакций бота.
+
+Каждая транзакция, введённая пользователем, раньше записывалась отдельной сессией
+с собственным INSERT и COMMIT. При всплесках нагрузки SQLite выполняет такие коммиты
+строго последовательно. Очередь `WriteQueue` собирает записи от многих пользователей
+и записывает их одним пакетным INSERT в одной транзакции — раз в `max_delay` секунд
+или при накоплении `max_batch` записей.
+
+Основные компоненты:
+- `WriteQueue`: Очередь пакетной записи с фоновым обработчиком.
+- `transaction_write_queue`: Очередь для модели `Transaction`, используется ботом.
+
+Гарантии:
+- `WriteQueue.submit` возвращает управление только после коммита пакета, поэтому
+  пользователь получает подтверждение, когда данные уже записаны.
+- При ошибке записи пакета исключение получает каждый ожидающий `submit`.
+- `WriteQueue.stop` записывает всё, что осталось в очереди (хук завершения работы);
+  записи, поставленные во время остановки, записываются сразу отдельным пакетом.
+- Пакет транзакций делится по шардам пользователей (`app/dao/shards.py`), части
+  записываются в свои шарды параллельно; ошибка одного шарда не отменяет запись в другие.
+
+Метрики (`WriteQueue.stats`):
+- Количество пакетов и записей, размер последнего и максимального пакета.
+- Задержка в очереди (от `submit` до коммита): средняя и максимальная.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from loguru import logger
+
+from app.dao.generic import MainGeneric
+from app.dao.shards import shard_router
+from app.dao.models import Transaction
+from app.settings.config import write_queue_max_batch, write_queue_max_delay
+
+
+class WriteQueue:
+    """
+    Очередь отложенной пакетной записи в модель SQLAlchemy.
+
+    Attributes:
+        model (Type): Модель SQLAlchemy, в которую выполняется запись.
+        max_batch (int): Максимальное количество записей в одном пакете.
+        max_delay (float): Максимальное время ожидания пакета в секундах.
+    """
+    def __init__(self, model: Type, max_batch: int = 500, max_delay: float = 0.05):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._batches = 0
+        self._rows = 0
+        self._last_batch_size = 0
+        self._max_batch_size = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли фоновый обработчик очереди."""
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        """
+        Запускает фоновый обработчик очереди. Повторный вызов ничего не делает.
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._stopping = False
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            f"Очередь записи {self.model.__name__} запущена: "
+            f"пакет до {self.max_batch} записей, ожидание до {self.max_delay * 1000:.0f} мс."
+        )
+
+    async def stop(self):
+        """
+        Записывает оставшиеся в очереди записи и останавливает обработчик.
+        """
+        if not self.running:
+            return
+        # Новые записи больше не ставятся в очередь: обработчик завершится на маркере
+        self._stopping = True
+        await self._queue.put(None)  # Маркер остановки: обработчик допишет всё, что было до него
+        await self._worker
+        self._worker = None
+        self._stopping = False
+        logger.info(f"Очередь записи {self.model.__name__} остановлена. Статистика: {self.stats()}")
+
+    async def submit(self, values: Dict[str, Any]):
+        """
+        Ставит запись в очередь и ждёт, пока пакет с ней будет записан в базу данных.
+
+        Если обработчик не запущен или останавливается, запись выполняется сразу отдельным пакетом.
+
+        Args:
+            values (Dict[str, Any]): Данные для добавления.
+
+        Raises:
+            KeyError: Если в данных транзакции нет `user_telegram_id`.
+            SQLAlchemyError: Если запись пакета завершилась ошибкой.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        item = (values, future, loop.time())
+        if not self.running or self._stopping:
+            await self._write([item])
+        else:
+            await self._queue.put(item)
+        await future
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает метрики очереди.
+
+        Returns:
+            Dict[str, Any]: Количество пакетов и записей, размеры пакетов,
+            текущая длина очереди и задержка в очереди в миллисекундах.
+        """
+        return {
+            "batches": self._batches,
+            "rows": self._rows,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "last_batch_size": self._last_batch_size,
+            "max_batch_size": self._max_batch_size,
+            "avg_batch_size": self._rows / self._batches if self._batches else 0,
+            "avg_latency_ms": self._latency_total / self._rows * 1000 if self._rows else 0,
+            "max_latency_ms": self._latency_max * 1000,
+        }
+
+    async def _run(self):
+        """Фоновый обработчик: собирает пакеты из очереди и записывает их."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+        # Записи, попавшие в очередь после маркера, не должны потеряться
+        rest = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                rest.append(item)
+        if rest:
+            await self._write(rest)
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]]):
+        """Записывает пакет (по одной транзакции на шард) и сообщает результат всем ожидающим."""
+        groups: Dict[int, List[Tuple[Dict[str, Any], asyncio.Future, float]]] = {}
+        for item in batch:
+            values, future, _ = item
+            try:
+                shard = shard_router.shard_for(values["user_telegram_id"]) if self.model is Transaction else 0
+            except Exception as e:
+                # Ошибка одной записи (например, без user_telegram_id) не должна останавливать обработчик
+                logger.error(f"Не удалось определить шард записи {self.model.__name__}: {e!r}")
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            groups.setdefault(shard, []).append(item)
+        await asyncio.gather(*(self._write_shard(shard, items) for shard, items in groups.items()))
+
+    async def _write_shard(self, shard: int, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]]):
+        """Записывает часть пакета в один шард одной транзакцией."""
+        try:
+            async with shard_router.session(shard, commit=True) as session:
+                await MainGeneric(self.model).add_many(
+                    session=session,
+                    values=[values for values, _, _ in batch],
+                    bulk=True,
+                    chunk_size=self.max_batch,
+                    return_ids=False
+                )
+        except Exception as e:
+            logger.error(f"Ошибка при записи пакета из {len(batch)} записей в {self.model.__name__} (шард {shard}): {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        now = asyncio.get_running_loop().time()
+        for _, future, enqueued_at in batch:
+            latency = now - enqueued_at
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+            if not future.done():
+                future.set_result(None)
+        self._batches += 1
+        self._rows += len(batch)
+        self._last_batch_size = len(batch)
+        self._max_batch_size = max(self._max_batch_size, len(batch))
+
+
+# Очередь записи транзакций бота
+transaction_write_queue = WriteQueue(
+    Transaction,
+    max_batch=write_queue_max_batch,
+    max_delay=write_queue_max_delay
+)
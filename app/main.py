@@ -1,10 +1,57 @@
+"""
+Точка входа приложения: API и бот.
+
+Режимы запуска:
+- `python -m app.main`: API (uvicorn) и long polling бота как две задачи одного цикла событий.
+  Они используют общие движки базы данных, клиент Redis, очереди и кэши, поэтому пулы
+  подключений не удваиваются.
+- `python -m app.main webhook`: приём обновлений через вебхук в процессе uvicorn (`app/bot/webhook.py`).
+  Нужен секрет `webhook_secret`. При `webhook_workers > 1` состояния FSM и задания на отчёты
+  хранятся в Redis (`fsm_redis`, `report_job_redis`), а фоновые задачи работают только
+  в ведущем процессе (`background_leader`, `app/cache/leader.py`).
+
+Порядок запуска в одном цикле:
+1. Схема базы данных и сокет API: ошибка адреса обнаруживается до запуска очередей.
+2. Хэндлеры запуска бота (справочник, очереди записи и отчётов, предварительные отчёты),
+   последним — API, чтобы запросы обслуживались уже с загруженным справочником.
+3. Long polling.
+
+Порядок остановки (SIGINT / SIGTERM):
+1. API перестаёт принимать запросы и дожидается начатых.
+2. Long polling останавливается, хэндлеры остановки бота дописывают очереди.
+3. Закрываются общие ресурсы: пул отчётов, Redis, подключения к базам.
+
+Основные компоненты:
+- `ApplicationRunner`: Совместный запуск API и бота с упорядоченным запуском и остановкой.
+- `close_resources`: Закрытие общих ресурсов процесса.
+- `webhook_app`: Приложение FastAPI для режима вебхука.
+"""
+
 import asyncio
+import signal
+import socket
+import sys
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
 from fastapi import FastAPI
+from loguru import logger
 import uvicorn
 
 from app.api.routers import router as model_router
+from app.cache import redis as redis_cache
+from app.cache.redis import close_redis, init_redis
 from app.dao.base import engine, Base
+from app.dao.shards import shard_router
+from app.metrics.middleware import HttpMetricsMiddleware, instrument_db
 from app.bot.bot import dp, bot
+from app.bot.webhook import webhook_processor, create_webhook_router, require_webhook_secret
+from app.reports.export import render_pool
+from app.settings.config import (
+    fsm_redis, report_cache_redis, report_job_redis, background_leader, webhook_host, webhook_port, webhook_workers,
+    api_enabled, api_host, api_port, api_shutdown_timeout, metrics_enabled
+)
 
 
 # Функция для инициализации схемы базы данных
@@ -13,19 +60,185 @@ async def init_db():
         await conn.run_sync(Base.metadata.create_all)
 
 # Функция для инициализации API
-async def init_api():
+def init_api() -> FastAPI:
     app = FastAPI()
+    add_metrics(app)
+    app.include_router(model_router)
+    return app
+
+
+# Метрики запросов API: длительность, ошибки и время БД по маршрутам
+def add_metrics(app: FastAPI):
+    if metrics_enabled:
+        instrument_db()
+        app.add_middleware(HttpMetricsMiddleware)
+
+
+async def close_resources():
+    """
+    Закрывает общие ресурсы процесса: потоки формирования отчётов, клиент Redis
+    и подключения ко всем базам (основной и шардам).
+    """
+    render_pool.shutdown()
+    if redis_cache.redis is not None:
+        await close_redis()
+    await shard_router.dispose()
+
+
+class ApiServer(uvicorn.Server):
+    """Сервер uvicorn без собственной обработки сигналов: остановкой управляет `ApplicationRunner`."""
+
+    @contextmanager
+    def capture_signals(self):
+        yield
+
+
+class ApplicationRunner:
+    """
+    Совместный запуск API и long polling бота в одном цикле событий.
+
+    Attributes:
+        dispatcher (Dispatcher): Диспетчер aiogram с хэндлерами бота.
+        bot (Bot): Бот для long polling.
+        app (Optional[FastAPI]): Приложение API; None — только бот.
+        server (Optional[ApiServer]): Сервер uvicorn для приложения API.
+    """
+    def __init__(
+            self,
+            dispatcher: Dispatcher,
+            bot: Bot,
+            app: Optional[FastAPI] = None,
+            host: str = api_host,
+            port: int = api_port
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.app = app
+        self.server: Optional[ApiServer] = None
+        if app is not None:
+            self.server = ApiServer(uvicorn.Config(
+                app, host=host, port=port, timeout_graceful_shutdown=api_shutdown_timeout
+            ))
+        self._socket: Optional[socket.socket] = None
+        self._serving: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Task] = None
+
+    async def run(self):
+        """
+        Запускает API и бота и возвращается после остановки обоих с закрытием общих ресурсов.
+
+        Raises:
+            OSError: Если адрес API занят.
+        """
+        await init_db()
+        if fsm_redis or report_cache_redis or report_job_redis or background_leader:
+            await init_redis()
+        if self.server is not None:
+            self._socket = self.server.config.bind_socket()
+            self.dispatcher.startup.register(self._start_api)
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.request_stop)
+        try:
+            await self.dispatcher.start_polling(self.bot, handle_signals=False)
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+            await self._stop_api()
+            if self._stopping is not None:
+                await self._stopping
+            await close_resources()
+            logger.info("Приложение остановлено.")
+
+    async def _start_api(self):
+        """Хэндлер запуска бота (последний): начинает обслуживать запросы API на открытом сокете."""
+        self._serving = asyncio.create_task(self.server.serve(sockets=[self._socket]))
+        self._serving.add_done_callback(lambda _: self.request_stop())
+        while not self.server.started and not self._serving.done():
+            await asyncio.sleep(0.05)
+        logger.info(f"API запущено на {self.server.config.host}:{self.server.config.port}.")
+
+    async def _stop_api(self):
+        """Останавливает API и дожидается завершения начатых запросов."""
+        if self._serving is None:
+            return
+        self.server.should_exit = True
+        try:
+            await self._serving
+        except Exception as e:
+            logger.error(f"Ошибка сервера API: {e}")
+        self._serving = None
+
+    def request_stop(self):
+        """Запрашивает остановку: сначала API, затем long polling (вызывается из обработчика сигнала)."""
+        if self._stopping is None:
+            logger.info("Остановка приложения...")
+            self._stopping = asyncio.create_task(self._stop())
+
+    async def _stop(self):
+        await self._stop_api()
+        try:
+            await self.dispatcher.stop_polling()
+        except RuntimeError:
+            # Long polling ещё не запущен или уже остановлен
+            pass
+
+
+# Приложение для режима вебхука: API и приём обновлений Telegram в одном процессе uvicorn
+@asynccontextmanager
+async def webhook_lifespan(app: FastAPI):
+    # Схема создаётся в цикле событий процесса uvicorn, к которому привязаны подключения
+    await init_db()
+    if fsm_redis or report_cache_redis or report_job_redis or background_leader:
+        await init_redis()
+    await webhook_processor.start()
+    yield
+    await webhook_processor.stop()
+    await close_resources()
+
+
+def create_webhook_app() -> FastAPI:
+    app = FastAPI(lifespan=webhook_lifespan)
+    add_metrics(app)
+    app.include_router(create_webhook_router(webhook_processor))
     app.include_router(model_router)
+    return app
+
+
+# Запуск в режиме вебхука: uvicorn с webhook_workers процессами, каждый импортирует webhook_app
+def run_webhook():
+    require_webhook_secret()
+    if webhook_workers > 1:
+        # Общее между процессами состояние хранится в Redis, фоновые задачи — в одном процессе
+        missing = [
+            name for name, enabled in (
+                ("fsm_redis", fsm_redis),
+                ("report_job_redis", report_job_redis),
+                ("background_leader", background_leader),
+            ) if not enabled
+        ]
+        if missing:
+            raise ValueError(
+                f"Для webhook_workers > 1 включите в настройках: {', '.join(missing)}. "
+                "Иначе состояния пользователей и задания на отчёты не будут общими, "
+                "а фоновые задачи запустятся в каждом процессе."
+            )
+    uvicorn.run("app.main:webhook_app", host=webhook_host, port=webhook_port, workers=webhook_workers)
 
 
 async def main():
-    await dp.start_polling(bot)
+    # API и бот в одном цикле событий
+    await ApplicationRunner(dp, bot, init_api() if api_enabled else None).run()
+
+
+webhook_app = create_webhook_app()
 
 
 if __name__ == "__main__":
-    # Инициализация базы данных
-    asyncio.run(init_db())
-    # Инициализация API
-    asyncio.run(init_api())
-    # Запуск основной логики
-    asyncio.run(main())
+    if len(sys.argv) > 1 and sys.argv[1] == "webhook":
+        # Приём обновлений через вебхук
+        run_webhook()
+    else:
+        # Запуск основной логики
+        asyncio.run(main())
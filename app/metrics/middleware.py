@@ -0,0 +1,189 @@
+"""
+Модуль middleware для метрик бота и API.
+
+Для каждого обновления бота и каждого запроса API создаётся запись `RequestRecord`
+в контекстной переменной. Слушатели SQLAlchemy (`before/after_cursor_execute` на всех
+движках, `instrument_db`) добавляют в неё время и количество запросов к БД; запросы вне обновлений
+и запросов API (очереди записи и отчётов, предварительные отчёты) учитываются отдельно.
+
+Метрики (`app/metrics/registry.py`):
+- `financier_bot_update_duration_seconds{event, handler}`: Длительность обработки обновления по хэндлерам.
+- `financier_bot_update_errors_total{event, handler}`: Обновления, завершившиеся ошибкой.
+- `financier_bot_update_db_seconds{handler}`: Время запросов к БД за обновление.
+- `financier_http_request_duration_seconds{method, route}`: Длительность запросов API по маршрутам.
+- `financier_http_request_errors_total{method, route}`: Запросы API с ответом 5xx или ошибкой.
+- `financier_http_request_db_seconds{method, route}`: Время запросов к БД за запрос API.
+- `financier_db_queries_total{source}`: Запросы к БД от бота, API и фоновых задач.
+- `financier_db_background_seconds_total`: Время запросов к БД фоновых задач.
+
+Основные компоненты:
+- `UpdateMetricsMiddleware`: Внешний middleware обновлений aiogram.
+- `HandlerNameMiddleware`: Внутренний middleware, запоминающий имя выбранного хэндлера.
+- `HttpMetricsMiddleware`: ASGI middleware приложения FastAPI.
+- `instrument_db`: Подключение учёта времени запросов к БД.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metrics.registry import metrics
+
+
+class RequestRecord:
+    """Хэндлер и время запросов к БД одного обновления или запроса API."""
+    __slots__ = ("handler", "db_time", "db_queries")
+
+    def __init__(self):
+        self.handler = "unhandled"
+        self.db_time = 0.0
+        self.db_queries = 0
+
+
+_current: ContextVar[Optional[RequestRecord]] = ContextVar("metrics_request", default=None)
+
+update_duration = metrics.histogram(
+    "bot_update_duration_seconds", "Длительность обработки обновления бота.", ("event", "handler")
+)
+update_errors = metrics.counter(
+    "bot_update_errors_total", "Обновления бота, завершившиеся ошибкой.", ("event", "handler")
+)
+update_db = metrics.histogram(
+    "bot_update_db_seconds", "Время запросов к БД за обновление бота.", ("handler",)
+)
+http_duration = metrics.histogram(
+    "http_request_duration_seconds", "Длительность запросов API.", ("method", "route")
+)
+http_errors = metrics.counter(
+    "http_request_errors_total", "Запросы API с ответом 5xx или ошибкой.", ("method", "route")
+)
+http_db = metrics.histogram(
+    "http_request_db_seconds", "Время запросов к БД за запрос API.", ("method", "route")
+)
+db_queries = metrics.counter("db_queries_total", "Запросы к БД по источнику.", ("source",))
+db_background = metrics.counter(
+    "db_background_seconds_total", "Время запросов к БД вне обновлений бота и запросов API."
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    record = _current.get()
+    if record is None:
+        db_background.inc(amount=elapsed)
+        db_queries.inc(("background",))
+    else:
+        record.db_time += elapsed
+        record.db_queries += 1
+
+
+def instrument_db():
+    """Подключает учёт времени запросов к БД на всех движках (повторный вызов ничего не делает)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Внешний middleware обновлений (`dp.update.outer_middleware`): длительность, ошибки
+    и время БД каждого обновления с именем хэндлера, который его обработал.
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        record = RequestRecord()
+        token = _current.set(record)
+        started = time.perf_counter()
+        failed = False
+        try:
+            return await handler(event, data)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            labels = (event.event_type, record.handler)
+            update_duration.observe(labels, elapsed)
+            if failed:
+                update_errors.inc(labels)
+            update_db.observe((record.handler,), record.db_time)
+            if record.db_queries:
+                db_queries.inc(("bot",), record.db_queries)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware (`dp.message.middleware`): вызывается только для выбранного
+    хэндлера и записывает его имя для `UpdateMetricsMiddleware`.
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        record = _current.get()
+        if record is not None:
+            # Для таблицы маршрутов — имя хэндлера из таблицы, а не общего dispatch_text
+            route = data.get("text_route") or data["handler"]
+            record.handler = route.callback.__name__
+        return await handler(event, data)
+
+
+class HttpMetricsMiddleware:
+    """
+    ASGI middleware FastAPI (`app.add_middleware`): длительность, ошибки и время БД запросов API
+    по шаблону маршрута (`/{model_name}/get_many`), а не по фактическому пути.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        record = RequestRecord()
+        token = _current.set(record)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"))
+            http_duration.observe(labels, elapsed)
+            if status >= 500:
+                http_errors.inc(labels)
+            http_db.observe(labels, record.db_time)
+            if record.db_queries:
+                db_queries.inc(("api",), record.db_queries)
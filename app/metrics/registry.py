@@ -0,0 +1,190 @@
+"""
+Модуль реестра метрик в формате Prometheus.
+
+Метрики хранятся в памяти процесса и обновляются только из цикла событий, поэтому
+обходятся без блокировок: наблюдение — поиск корзины гистограммы (`bisect`) и
+сложение в словаре по кортежу меток. Пакет `prometheus_client` не нужен: текстовый
+формат экспозиции (`text/plain; version=0.0.4`) формируется при запросе `/metrics`.
+
+Кроме гистограмм и счётчиков в реестре регистрируются сборщики: функции `stats()`
+очередей, кэшей и пулов приложения. Их числовые значения выводятся как gauge
+`financier_<имя>_<ключ>` в момент запроса, без затрат на горячем пути.
+
+Основные компоненты:
+- `Histogram`: Гистограмма длительностей с метками.
+- `Counter`: Счётчик с метками.
+- `MetricsRegistry`: Реестр метрик, сборщиков и формирование текста для Prometheus.
+- `metrics`: Общий реестр приложения.
+"""
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from loguru import logger
+
+from app.settings.config import metrics_latency_buckets
+
+
+PREFIX = "financier"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """
+    Счётчик с метками.
+
+    Attributes:
+        name (str): Имя метрики.
+        documentation (str): Описание метрики.
+        labelnames (Tuple[str, ...]): Имена меток.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        """Увеличивает счётчик для значений меток `labels`."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple[str, ...] = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Гистограмма с метками: количество наблюдений по корзинам, сумма и количество.
+
+    Attributes:
+        name (str): Имя метрики.
+        documentation (str): Описание метрики.
+        labelnames (Tuple[str, ...]): Имена меток.
+        buckets (Tuple[float, ...]): Верхние границы корзин по возрастанию (без +Inf).
+    """
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = metrics_latency_buckets
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Значения меток -> [количество в каждой корзине и в +Inf, сумма]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        """Добавляет наблюдение `value` для значений меток `labels`."""
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, labels: Tuple[str, ...] = ()) -> int:
+        series = self._values.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, observed in zip(self.buckets + (float("inf"),), series):
+                cumulative += observed
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса.
+    """
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        """Создаёт и регистрирует гистограмму `financier_<name>`."""
+        metric = Histogram(f"{PREFIX}_{name}", documentation, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Создаёт и регистрирует счётчик `financier_<name>`."""
+        metric = Counter(f"{PREFIX}_{name}", documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, name: str, stats: Callable[[], Dict[str, Any]]):
+        """
+        Регистрирует сборщик: числовые значения `stats()` выводятся как gauge `financier_<name>_<ключ>`,
+        вложенные словари — с ключами через подчёркивание.
+
+        Args:
+            name (str): Префикс метрик сборщика.
+            stats (Callable[[], Dict[str, Any]]): Функция метрик компонента (например, `report_cache.stats`).
+        """
+        self._collectors[name] = stats
+
+    def _render_stats(self, name: str, values: Dict[str, Any]) -> List[str]:
+        lines = []
+        for key, value in values.items():
+            metric = f"{name}_{key}"
+            if isinstance(value, dict):
+                lines.extend(self._render_stats(metric, value))
+            elif isinstance(value, (int, float)):
+                lines.append(f"# TYPE {PREFIX}_{metric} gauge")
+                lines.append(f"{PREFIX}_{metric} {_format_value(value)}")
+        return lines
+
+    def render(self) -> str:
+        """
+        Формирует текст всех метрик в формате экспозиции Prometheus.
+
+        Returns:
+            str: Текст для ответа эндпоинта `/metrics`.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, stats in self._collectors.items():
+            try:
+                lines.extend(self._render_stats(name, stats()))
+            except Exception as e:
+                logger.error(f"Ошибка сборщика метрик {name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр метрик приложения
+metrics = MetricsRegistry()
@@ -0,0 +1,437 @@
+"""
+Модуль аналитики по транзакциям пользователя.
+
+В отличие от отчёта (выгрузки всех строк), аналитика возвращает сводные показатели:
+- разбивку доходов и расходов по подкатегориям с долями;
+- помесячные доходы и расходы, изменение расходов к предыдущему месяцу (абсолютное и в %);
+- скользящее среднее расходов и доходов за `analytics_rolling_months` месяцев;
+- норму сбережений (доля дохода, оставшаяся после расходов) за период и по месяцам;
+- выбросы: расходы, которые отклоняются от среднего по своей подкатегории больше чем на
+  `analytics_outlier_z` стандартных отклонений.
+
+Из базы читаются только три колонки транзакций пользователя — (дата, подкатегория, сумма) —
+по индексу `ix_transactions_user_date` в шарде пользователя. Они хранятся в компактных
+массивах NumPy (`UserArrays`: дни int32, подкатегории int16, суммы float64), и все показатели
+считаются векторными проходами (`np.bincount`, `np.cumsum`, маски) без циклов по транзакциям.
+Категория подкатегории (Доход / Расход) берётся из кэша справочника (`catalog`).
+
+Кэш массивов:
+- Чтение строк из SQLite и создание Python-объектов для каждой строки — самая дорогая часть
+  (сотни миллисекунд на 100 000 транзакций), сам расчёт занимает десятки миллисекунд.
+- Поэтому массивы всех транзакций пользователя хранятся в `UserArraysCache` (LRU с ограничением
+  по байтам) вместе с версией данных (максимальный id, количество). При новых транзакциях
+  догружаются только строки с id больше сохранённого, при других изменениях массивы читаются заново.
+- Период выборки применяется к массивам маской по дням.
+
+Разбор строк и расчёт выполняются в пуле потоков `render_pool`, чтобы не задерживать
+цикл событий.
+
+Основные компоненты:
+- `UserArrays`: Колонки транзакций пользователя в массивах NumPy.
+- `load_user_arrays`: Загружает колонки транзакций пользователя.
+- `UserArraysCache`: Кэш массивов пользователей с инкрементальной догрузкой.
+- `compute_analytics`: Считает показатели по массивам (синхронно, только NumPy).
+- `user_analytics`: Загрузка и расчёт, используется API и ботом.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import String, func, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache.catalog import catalog
+from app.dao.generic import get_period_bounds
+from app.dao.models import Transaction
+from app.dao.shards import shard_router
+from app.reports.export import render_pool
+from app.settings.config import (
+    analytics_rolling_months, analytics_outlier_z, analytics_outlier_limit, analytics_cache_max_bytes
+)
+
+
+INCOME_CATEGORY = "Доход"
+MIN_OUTLIER_SAMPLE = 5  # Минимум расходов в подкатегории для поиска выбросов
+
+
+class UserArrays:
+    """
+    Колонки транзакций пользователя в массивах NumPy.
+
+    Attributes:
+        days (np.ndarray): Дата транзакции, дни от 1970-01-01 (int32).
+        subcategories (np.ndarray): Идентификатор подкатегории (int16).
+        amounts (np.ndarray): Сумма транзакции (float64).
+    """
+    __slots__ = ("days", "subcategories", "amounts")
+
+    def __init__(self, days: np.ndarray, subcategories: np.ndarray, amounts: np.ndarray):
+        self.days = days
+        self.subcategories = subcategories
+        self.amounts = amounts
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @property
+    def nbytes(self) -> int:
+        """Объём массивов в байтах."""
+        return self.days.nbytes + self.subcategories.nbytes + self.amounts.nbytes
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[str, int, float]]) -> "UserArrays":
+        """
+        Собирает массивы из строк (дата в формате SQLite, подкатегория, сумма).
+
+        Args:
+            rows (Sequence[Tuple[str, int, float]]): Строки запроса `load_user_arrays`.
+
+        Returns:
+            UserArrays: Массивы транзакций.
+        """
+        if not rows:
+            return cls(np.empty(0, np.int32), np.empty(0, np.int16), np.empty(0, np.float64))
+        dates, subcategories, amounts = zip(*rows)
+        return cls(
+            np.array(dates).astype("datetime64[D]").astype(np.int32),
+            np.array(subcategories, dtype=np.int16),
+            np.array(amounts, dtype=np.float64),
+        )
+
+    def concat(self, other: "UserArrays") -> "UserArrays":
+        """Массивы с добавленными в конец транзакциями `other`."""
+        return UserArrays(
+            np.concatenate((self.days, other.days)),
+            np.concatenate((self.subcategories, other.subcategories)),
+            np.concatenate((self.amounts, other.amounts)),
+        )
+
+    def in_period(self, start_date: datetime, end_date: datetime) -> "UserArrays":
+        """
+        Транзакции, дата которых попадает в период (с точностью до дня).
+
+        Args:
+            start_date (datetime): Начальная дата периода.
+            end_date (datetime): Конечная дата периода.
+
+        Returns:
+            UserArrays: Массивы транзакций периода.
+        """
+        start_day = np.datetime64(start_date.date(), "D").astype(np.int64)
+        end_day = np.datetime64(end_date.date(), "D").astype(np.int64)
+        mask = (self.days >= start_day) & (self.days <= end_day)
+        if mask.all():
+            return self
+        return UserArrays(self.days[mask], self.subcategories[mask], self.amounts[mask])
+
+
+async def load_user_arrays(
+        session: AsyncSession,
+        user_telegram_id: int,
+        after_id: Optional[int] = None,
+        until_id: Optional[int] = None
+) -> UserArrays:
+    """
+    Загружает (дату, подкатегорию, сумму) транзакций пользователя.
+
+    Дата читается строкой без преобразования в `datetime` и разбирается NumPy.
+
+    Args:
+        session (AsyncSession): Асинхронная сессия шарда пользователя.
+        user_telegram_id (int): Идентификатор пользователя в Telegram.
+        after_id (Optional[int]): Только транзакции с id больше заданного.
+        until_id (Optional[int]): Только транзакции с id не больше заданного.
+
+    Returns:
+        UserArrays: Массивы транзакций пользователя (порядок строк не важен для расчёта).
+    """
+    query = (
+        select(type_coerce(Transaction.date, String), Transaction.subcategory_id, Transaction.amount)
+        .where(Transaction.user_telegram_id == user_telegram_id)
+    )
+    if after_id is not None:
+        query = query.where(Transaction.id > after_id)
+    if until_id is not None:
+        query = query.where(Transaction.id <= until_id)
+    rows = (await session.execute(query)).all()
+    return await render_pool.run(UserArrays.from_rows, rows)
+
+
+class UserArraysCache:
+    """
+    Кэш массивов транзакций пользователей: LRU с ограничением суммарного размера в байтах.
+
+    Attributes:
+        max_bytes (int): Максимальный суммарный размер массивов.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[int, Tuple[Tuple, UserArrays]]" = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._appends = 0
+        self._loads = 0
+
+    async def get(self, session: AsyncSession, user_telegram_id: int) -> UserArrays:
+        """
+        Возвращает массивы всех транзакций пользователя, догружая новые транзакции.
+
+        Args:
+            session (AsyncSession): Асинхронная сессия шарда пользователя.
+            user_telegram_id (int): Идентификатор пользователя в Telegram.
+
+        Returns:
+            UserArrays: Массивы транзакций пользователя.
+        """
+        version = tuple((await session.execute(
+            select(func.max(Transaction.id), func.count(Transaction.id))
+            .where(Transaction.user_telegram_id == user_telegram_id)
+        )).one())
+        last_id, count = version
+
+        entry = self._entries.get(user_telegram_id)
+        if entry is not None:
+            (cached_last_id, cached_count), arrays = entry
+            if (cached_last_id, cached_count) == version:
+                self._entries.move_to_end(user_telegram_id)
+                self._hits += 1
+                return arrays
+            # Только новые транзакции: догружаем строки после сохранённого id
+            if cached_last_id is not None and last_id is not None and last_id > cached_last_id:
+                added = await load_user_arrays(session, user_telegram_id, after_id=cached_last_id, until_id=last_id)
+                if cached_count + len(added) == count:
+                    self._appends += 1
+                    arrays = arrays.concat(added)
+                    self._store(user_telegram_id, version, arrays)
+                    return arrays
+
+        self._loads += 1
+        arrays = await load_user_arrays(session, user_telegram_id, until_id=last_id)
+        self._store(user_telegram_id, version, arrays)
+        return arrays
+
+    def _store(self, user_telegram_id: int, version: Tuple, arrays: UserArrays):
+        if user_telegram_id in self._entries:
+            self._evict(user_telegram_id)
+        if arrays.nbytes > self.max_bytes:
+            return
+        self._entries[user_telegram_id] = (version, arrays)
+        self._size += arrays.nbytes
+        while self._size > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, user_telegram_id: int):
+        _, arrays = self._entries.pop(user_telegram_id)
+        self._size -= arrays.nbytes
+
+    def clear(self):
+        """Очищает кэш."""
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Метрики кэша.
+
+        Returns:
+            Dict[str, Any]: Количество пользователей и размер массивов, попадания,
+            догрузки новых транзакций и полные загрузки.
+        """
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "appends": self._appends,
+            "loads": self._loads,
+        }
+
+
+# Общий кэш массивов транзакций пользователей
+user_arrays_cache = UserArraysCache(max_bytes=analytics_cache_max_bytes)
+
+
+def _round(value: float) -> float:
+    return round(float(value), 2)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> List[Optional[float]]:
+    """Поэлементное отношение, None там, где знаменатель не положителен."""
+    valid = denominator > 0
+    result = np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=np.float64), where=valid)
+    return [round(float(value), 4) if ok else None for value, ok in zip(result, valid)]
+
+
+def compute_analytics(
+        arrays: UserArrays,
+        subcategory_category: np.ndarray,
+        income_category_id: Optional[int],
+        subcategory_names: Dict[int, str],
+        rolling_months: int = 3,
+        outlier_z: float = 3.0,
+        outlier_limit: int = 10
+) -> Dict[str, Any]:
+    """
+    Считает показатели по массивам транзакций пользователя.
+
+    Args:
+        arrays (UserArrays): Транзакции пользователя.
+        subcategory_category (np.ndarray): Идентификатор категории по индексу подкатегории.
+        income_category_id (Optional[int]): Идентификатор категории доходов.
+        subcategory_names (Dict[int, str]): Названия подкатегорий.
+        rolling_months (int): Окно скользящего среднего, месяцы.
+        outlier_z (float): Порог выброса в стандартных отклонениях.
+        outlier_limit (int): Максимальное количество выбросов в ответе.
+
+    Returns:
+        Dict[str, Any]: Итоги ("income", "expense", "savings_rate"), разбивка по подкатегориям
+        ("categories"), помесячные показатели ("months") и выбросы ("outliers").
+    """
+    days, subcategories, amounts = arrays.days, arrays.subcategories, arrays.amounts
+    result = {
+        "transactions": len(arrays),
+        "first_date": None, "last_date": None,
+        "income": 0.0, "expense": 0.0, "savings_rate": None,
+        "categories": [], "months": [], "outliers": [],
+    }
+    if not len(arrays):
+        return result
+
+    size = max(len(subcategory_category), int(subcategories.max()) + 1)
+    lookup = np.full(size, -1, dtype=np.int64)
+    lookup[:len(subcategory_category)] = subcategory_category
+    income = lookup[subcategories] == income_category_id
+    income_amounts = np.where(income, amounts, 0.0)
+    expense_amounts = amounts - income_amounts
+
+    # Разбивка по подкатегориям
+    by_subcategory = np.bincount(subcategories, weights=amounts, minlength=size)
+    count_by_subcategory = np.bincount(subcategories, minlength=size)
+    expense_by_subcategory = np.bincount(subcategories, weights=expense_amounts, minlength=size)
+    total_income, total_expense = income_amounts.sum(), expense_amounts.sum()
+    totals = np.where(lookup == income_category_id, total_income, total_expense)
+    for subcategory_id in np.flatnonzero(count_by_subcategory)[np.argsort(-by_subcategory[count_by_subcategory > 0])]:
+        is_income = lookup[subcategory_id] == income_category_id
+        result["categories"].append({
+            "subcategory_id": int(subcategory_id),
+            "subcategory": subcategory_names.get(int(subcategory_id)),
+            "type": "income" if is_income else "expense",
+            "amount": _round(by_subcategory[subcategory_id]),
+            "count": int(count_by_subcategory[subcategory_id]),
+            "share": round(float(by_subcategory[subcategory_id] / totals[subcategory_id]), 4)
+            if totals[subcategory_id] > 0 else None,
+        })
+
+    # Помесячные показатели
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    first_month = months.min()
+    month_index = months - first_month
+    month_count = int(month_index.max()) + 1
+    monthly_income = np.bincount(month_index, weights=income_amounts, minlength=month_count)
+    monthly_expense = np.bincount(month_index, weights=expense_amounts, minlength=month_count)
+    expense_delta = np.diff(monthly_expense, prepend=np.nan)
+    previous_expense = np.concatenate(([0.0], monthly_expense[:-1]))
+    window_start = np.maximum(np.arange(month_count) + 1 - rolling_months, 0)
+    window_size = np.arange(month_count) + 1 - window_start
+
+    def rolling(values: np.ndarray) -> np.ndarray:
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return (cumulative[1:] - cumulative[window_start]) / window_size
+
+    rolling_expense, rolling_income = rolling(monthly_expense), rolling(monthly_income)
+    savings = _ratio(monthly_income - monthly_expense, monthly_income)
+    expense_delta_pct = _ratio(expense_delta, previous_expense)
+    labels = np.arange(first_month, first_month + month_count).astype("datetime64[M]").astype(str)
+    for index in range(month_count):
+        result["months"].append({
+            "month": str(labels[index]),
+            "income": _round(monthly_income[index]),
+            "expense": _round(monthly_expense[index]),
+            "savings_rate": savings[index],
+            "expense_delta": _round(expense_delta[index]) if index else None,
+            "expense_delta_pct": expense_delta_pct[index] if index else None,
+            "expense_rolling_avg": _round(rolling_expense[index]),
+            "income_rolling_avg": _round(rolling_income[index]),
+        })
+
+    # Выбросы: z-оценка расхода относительно среднего и отклонения его подкатегории
+    expense_count = np.bincount(subcategories, weights=~income, minlength=size)
+    mean = np.divide(expense_by_subcategory, expense_count, out=np.zeros(size), where=expense_count > 0)
+    squares = np.bincount(subcategories, weights=expense_amounts ** 2, minlength=size)
+    variance = np.divide(squares, expense_count, out=np.zeros(size), where=expense_count > 0) - mean ** 2
+    std = np.sqrt(np.maximum(variance, 0.0))
+    candidates = ~income & (expense_count[subcategories] >= MIN_OUTLIER_SAMPLE) & (std[subcategories] > 0)
+    z = np.zeros(len(arrays))
+    z[candidates] = (amounts[candidates] - mean[subcategories[candidates]]) / std[subcategories[candidates]]
+    outliers = np.flatnonzero(z > outlier_z)
+    for index in outliers[np.argsort(-z[outliers])][:outlier_limit]:
+        subcategory_id = int(subcategories[index])
+        result["outliers"].append({
+            "date": str(np.datetime64(int(days[index]), "D")),
+            "subcategory_id": subcategory_id,
+            "subcategory": subcategory_names.get(subcategory_id),
+            "amount": _round(amounts[index]),
+            "subcategory_mean": _round(mean[subcategory_id]),
+            "z": round(float(z[index]), 2),
+        })
+
+    result.update({
+        "first_date": str(np.datetime64(int(days.min()), "D")),
+        "last_date": str(np.datetime64(int(days.max()), "D")),
+        "income": _round(total_income),
+        "expense": _round(total_expense),
+        "savings_rate": _ratio(np.array([total_income - total_expense]), np.array([total_income]))[0],
+    })
+    return result
+
+
+async def catalog_arrays() -> Tuple[np.ndarray, Optional[int], Dict[int, str]]:
+    """
+    Справочник для `compute_analytics` из кэша `catalog`.
+
+    Returns:
+        Tuple[np.ndarray, Optional[int], Dict[int, str]]: Категория по индексу подкатегории,
+        идентификатор категории доходов и названия подкатегорий.
+    """
+    await catalog.ensure_loaded()
+    names = {
+        subcategory_id: name
+        for subcategories in catalog.subcategories.values()
+        for name, subcategory_id in subcategories.items()
+    }
+    lookup = np.full(max(names, default=0) + 1, -1, dtype=np.int64)
+    for category_id, subcategories in catalog.subcategories.items():
+        lookup[list(subcategories.values())] = category_id
+    return lookup, catalog.categories.get(INCOME_CATEGORY), names
+
+
+async def user_analytics(user_telegram_id: int, period: str = "all") -> Dict[str, Any]:
+    """
+    Аналитика транзакций пользователя за период.
+
+    Args:
+        user_telegram_id (int): Идентификатор пользователя в Telegram.
+        period (str): Период: "month", "3months", "6months", "year" или "all".
+
+    Returns:
+        Dict[str, Any]: Показатели `compute_analytics` с пользователем, периодом и датой расчёта.
+
+    Raises:
+        HTTPException: Если период не поддерживается.
+    """
+    start_date, end_date = get_period_bounds(period)
+    async with shard_router.session(shard_router.shard_for(user_telegram_id), read_only=True) as session:
+        arrays = await user_arrays_cache.get(session, user_telegram_id)
+    lookup, income_category_id, names = await catalog_arrays()
+    result = await render_pool.run(
+        compute_analytics, arrays.in_period(start_date, end_date), lookup, income_category_id, names,
+        analytics_rolling_months, analytics_outlier_z, analytics_outlier_limit
+    )
+    return {
+        "user_telegram_id": user_telegram_id,
+        "period": period,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        **result,
+    }
@@ -0,0 +1,136 @@
+"""
+Модуль формирования отчётов по транзакциям.
+
+Отчёт собирается в памяти (`io.BytesIO`): порции записей из курсора БД
+(`shard_router.stream_transactions`) сразу кодируются потоковым писателем
+(`app/reports/export.py`) в пуле потоков `render_pool`. Готовые отчёты без пагинации
+кэшируются (`app/cache/reports.py`).
+
+Используется эндпоинтом `get_report` (`app/api/routers.py`), ботом и очередью
+фоновых заданий (`app/reports/jobs.py`).
+
+Основные компоненты:
+- `REPORT_PERIODS`: Кнопки периодов отчёта в боте и соответствующие периоды выборки.
+- `user_report_filters`: Фильтры отчёта, который бот формирует для пользователя.
+- `build_report`: Формирует отчёт CSV / XLSX и возвращает его содержимое и имя файла.
+"""
+
+import io
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.cache.reports import report_cache, data_version
+from app.dao.generic import get_transactions_statements
+from app.dao.shards import shard_router
+from app.reports.export import REPORT_MEDIA_TYPES, RenderQueueFull, export_report, render_pool
+
+
+# Кнопка периода в боте -> период выборки
+REPORT_PERIODS = {
+    "Месяц": "month",
+    "3 месяца": "3months",
+    "Полгода": "6months",
+    "Год": "year",
+    "Всё время": "all",
+}
+
+
+def user_report_filters(user_id: int) -> Dict[str, Any]:
+    """
+    Фильтры отчёта, который бот формирует по запросу пользователя.
+
+    Отчёт содержит только транзакции пользователя: выборка идёт по индексу
+    `ix_transactions_user_date` в шарде пользователя, поэтому стоимость отчёта
+    зависит от объёма данных пользователя, а не от размера таблицы.
+
+    Используются и обработчиком бота, и предварительным формированием отчётов
+    (`app/reports/scheduler.py`), поэтому ключи кэша у них совпадают.
+
+    Args:
+        user_id (int): Идентификатор пользователя в Telegram.
+
+    Returns:
+        Dict[str, Any]: Фильтры отчёта.
+    """
+    return {"user_telegram_id": user_id}
+
+
+async def _single_chunk(records: List[Dict[str, Any]]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Представляет одну страницу записей как поток из одной порции."""
+    yield records
+
+
+async def build_report(
+    period: str = "all",
+    filters: Optional[Dict[str, Any]] = None,
+    paginate: bool = False,
+    page: int = 1,
+    page_size: int = 20,
+    format: str = "xlsx",
+    use_cache: bool = True,
+    cache_ttl: Optional[float] = None
+) -> Tuple[bytes, str]:
+    """
+    Формирует отчёт в формате CSV или XLSX в памяти.
+
+    Файл собирается в буфере `io.BytesIO`, на диск ничего не записывается, поэтому
+    одновременные отчёты разных пользователей не мешают друг другу. Порции записей
+    из курсора БД сразу пишутся в файл (`app/reports/export.py`), без DataFrame.
+
+    Отчёты без пагинации кэшируются (`app/cache/reports.py`) до изменения данных
+    пользователя из фильтров (или любых транзакций, если фильтра по пользователю нет).
+
+    Args:
+        period (str): Период, за который нужно получить данные. По умолчанию "all".
+        filters (Optional[Dict[str, Any]]): Фильтры для выборки данных. По умолчанию None.
+        paginate (bool): Выгрузить только одну страницу записей. По умолчанию False.
+        page (int): Номер страницы для пагинации. По умолчанию 1.
+        page_size (int): Количество записей на странице. По умолчанию 20.
+        format (str): Формат отчёта: "csv" или "xlsx". По умолчанию "xlsx".
+        use_cache (bool): Использовать кэш отчётов. По умолчанию True.
+        cache_ttl (Optional[float]): Время жизни отчёта в кэше, секунды. По умолчанию — из настроек кэша.
+
+    Returns:
+        Tuple[bytes, str]: Содержимое файла отчёта и имя файла.
+
+    Raises:
+        HTTPException: Если формат не поддерживается (400) или очередь формирования отчётов заполнена (503).
+    """
+    if format not in REPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неподдерживаемый формат выгрузки. Доступные форматы: {', '.join(REPORT_MEDIA_TYPES)}"
+        )
+
+    filename = f"report_{period}.{format}"
+    cache_key = None
+    if use_cache and not paginate:
+        cache_key = report_cache.key(period, filters, format, await data_version(filters))
+        content = await report_cache.get(cache_key)
+        if content is not None:
+            return content, filename
+
+    if paginate:
+        report = await shard_router.find_transactions(
+            filters=filters, paginate=True, page=page, page_size=page_size, period=period
+        )
+        chunks = _single_chunk(report["records"])
+    else:
+        chunks = shard_router.stream_transactions(filters=filters, period=period)
+
+    buffer = io.BytesIO()
+    columns = get_transactions_statements(())["base"].selected_columns.keys()
+    try:
+        # Кодирование выполняется в пуле потоков, цикл событий продолжает обслуживать другие запросы
+        async with render_pool.slot():
+            await export_report(chunks, format, buffer, columns=columns, pool=render_pool)
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Сервер формирует слишком много отчётов, повторите позже. {e}")
+    finally:
+        # Курсор БД закрывается и при ошибке кодирования или отмене задачи
+        await chunks.aclose()
+    content = buffer.getvalue()
+    if cache_key is not None:
+        await report_cache.set(cache_key, content, ttl=cache_ttl)
+    return content, filename
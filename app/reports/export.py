@@ -0,0 +1,224 @@
+"""
+Модуль потоковой выгрузки отчётов в CSV и XLSX.
+
+Раньше отчёт собирался через pandas: все строки превращались в словари, из них строился
+DataFrame, и только затем вызывался `to_excel`, поэтому в памяти одновременно находилось
+несколько полных копий данных. Здесь порции записей из курсора БД
+(`MainGeneric.stream_transactions`) сразу пишутся в файл отчёта:
+- CSV — модулем `csv` в текстовую обёртку над выходным потоком;
+- XLSX — книгой openpyxl в режиме `write_only`, которая не хранит ячейки в памяти.
+
+В памяти находится только текущая порция строк и выходной файл, поэтому отчёт
+за всё время на миллионах строк не увеличивает потребление памяти пропорционально числу строк.
+
+Кодирование строк и сохранение книги — синхронная работа процессора. Чтобы она не
+останавливала цикл событий (обновления бота и запросы API), её можно выполнять в пуле
+потоков `RenderPool`: каждая порция кодируется в потоке, пока цикл событий читает
+следующую порцию из курсора. Пул ограничивает число одновременно формируемых отчётов
+и длину очереди ожидания; при переполнении очереди отчёт отклоняется (`RenderQueueFull`).
+
+Основные компоненты:
+- `REPORT_MEDIA_TYPES`: Поддерживаемые форматы и их типы содержимого.
+- `RenderPool`: Пул потоков для кодирования отчётов с ограниченной очередью.
+- `render_pool`: Общий пул по настройкам.
+- `write_csv`: Потоковая запись CSV.
+- `write_xlsx`: Потоковая запись XLSX.
+- `export_report`: Выбор записи по формату.
+"""
+
+import asyncio
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Sequence
+
+from openpyxl import Workbook
+
+from app.settings.config import report_render_workers, report_render_max_pending
+
+
+# Типы содержимого отчётов по форматам выгрузки
+REPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class RenderQueueFull(Exception):
+    """Очередь формирования отчётов переполнена."""
+
+
+class RenderPool:
+    """
+    Пул потоков для кодирования отчётов с ограниченной очередью.
+
+    Attributes:
+        workers (int): Количество одновременно формируемых отчётов (и потоков пула).
+        max_pending (int): Максимальное количество отчётов, ожидающих свободный поток.
+    """
+    def __init__(self, workers: int = 2, max_pending: int = 8):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._busy = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Занимает место для формирования одного отчёта.
+
+        Raises:
+            RenderQueueFull: Если свободных потоков нет и очередь ожидания заполнена.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        if self._semaphore.locked() and self._pending >= self.max_pending:
+            raise RenderQueueFull(f"В очереди формирования уже {self._pending} отчётов")
+        self._pending += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._pending -= 1
+        self._busy += 1
+        try:
+            yield self
+        finally:
+            self._busy -= 1
+            self._semaphore.release()
+
+    async def run(self, func: Callable, *args):
+        """Выполняет синхронную функцию в потоке пула."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        """Количество занятых потоков и ожидающих отчётов."""
+        return {"workers": self.workers, "busy": self._busy, "pending": self._pending, "max_pending": self.max_pending}
+
+    def shutdown(self):
+        """Останавливает потоки пула."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Общий пул кодирования отчётов
+render_pool = RenderPool(workers=report_render_workers, max_pending=report_render_max_pending)
+
+
+async def _call(pool: Optional[RenderPool], func: Callable, *args):
+    """Выполняет функцию в пуле или, если пул не задан, в текущем потоке."""
+    if pool is None:
+        return func(*args)
+    return await pool.run(func, *args)
+
+
+def _append_rows(sheet, columns: Sequence[str], chunk: List[Dict[str, Any]]):
+    for record in chunk:
+        sheet.append([record[column] for column in columns])
+
+
+async def write_csv(
+        chunks: AsyncIterator[List[Dict[str, Any]]],
+        output: BinaryIO,
+        columns: Optional[Sequence[str]] = None,
+        pool: Optional[RenderPool] = None
+) -> int:
+    """
+    Записывает порции записей в CSV (UTF-8) по мере их получения.
+
+    Args:
+        chunks (AsyncIterator[List[Dict[str, Any]]]): Порции записей.
+        output (BinaryIO): Выходной двоичный поток.
+        columns (Optional[Sequence[str]]): Заголовок. По умолчанию — ключи первой записи.
+        pool (Optional[RenderPool]): Пул для кодирования порций. По умолчанию — текущий поток.
+
+    Returns:
+        int: Количество записанных строк.
+    """
+    text = io.TextIOWrapper(output, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    if columns is not None:
+        writer.writerow(columns)
+    rows = 0
+    async for chunk in chunks:
+        if columns is None and chunk:
+            columns = list(chunk[0])
+            writer.writerow(columns)
+        if chunk:
+            await _call(pool, writer.writerows, [[record[column] for column in columns] for record in chunk])
+        rows += len(chunk)
+    text.flush()
+    text.detach()
+    return rows
+
+
+async def write_xlsx(
+        chunks: AsyncIterator[List[Dict[str, Any]]],
+        output: BinaryIO,
+        columns: Optional[Sequence[str]] = None,
+        sheet_title: str = "Отчёт",
+        pool: Optional[RenderPool] = None
+) -> int:
+    """
+    Записывает порции записей в XLSX книгой openpyxl в режиме `write_only`.
+
+    Args:
+        chunks (AsyncIterator[List[Dict[str, Any]]]): Порции записей.
+        output (BinaryIO): Выходной двоичный поток.
+        columns (Optional[Sequence[str]]): Заголовок. По умолчанию — ключи первой записи.
+        sheet_title (str): Название листа.
+        pool (Optional[RenderPool]): Пул для кодирования порций и сохранения книги.
+            По умолчанию — текущий поток.
+
+    Returns:
+        int: Количество записанных строк.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title)
+    if columns is not None:
+        sheet.append(list(columns))
+    rows = 0
+    async for chunk in chunks:
+        if columns is None and chunk:
+            columns = list(chunk[0])
+            sheet.append(columns)
+        if chunk:
+            await _call(pool, _append_rows, sheet, columns, chunk)
+        rows += len(chunk)
+    await _call(pool, workbook.save, output)
+    return rows
+
+
+async def export_report(
+        chunks: AsyncIterator[List[Dict[str, Any]]],
+        format: str,
+        output: BinaryIO,
+        columns: Optional[Sequence[str]] = None,
+        pool: Optional[RenderPool] = None
+) -> int:
+    """
+    Потоково записывает отчёт в указанном формате.
+
+    Args:
+        chunks (AsyncIterator[List[Dict[str, Any]]]): Порции записей.
+        format (str): Формат отчёта из `REPORT_MEDIA_TYPES`.
+        output (BinaryIO): Выходной двоичный поток.
+        columns (Optional[Sequence[str]]): Заголовок. По умолчанию — ключи первой записи.
+        pool (Optional[RenderPool]): Пул для кодирования. По умолчанию — текущий поток.
+
+    Returns:
+        int: Количество записанных строк.
+
+    Raises:
+        ValueError: Если формат не поддерживается.
+    """
+    if format == "csv":
+        return await write_csv(chunks, output, columns, pool=pool)
+    if format == "xlsx":
+        return await write_xlsx(chunks, output, columns, pool=pool)
+    raise ValueError(f"Неподдерживаемый формат выгрузки: {format}")
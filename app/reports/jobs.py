@@ -0,0 +1,469 @@
+"""
+Модуль фоновых заданий на формирование отчётов.
+
+Раньше отчёт формировался прямо в обработчике `process_report_period`: пока строился
+большой отчёт, пользователь ничего не получал. Теперь обработчик ставит задание в очередь
+и сразу отвечает, а пул обработчиков формирует отчёт (`build_report`) и вызывает
+функцию доставки очереди (`ReportJobQueue.delivery`: бот отправляет документ в чат задания).
+
+Дедупликация:
+- Пока задание (пользователь, период, формат, фильтры) в очереди или выполняется,
+  повторный запрос с теми же параметрами не создаёт новое задание и не добавляет
+  доставку: пользователь получит отчёт один раз.
+
+Хранение заданий:
+- в памяти процесса (по умолчанию): очередь `asyncio.Queue`, обработчики запускаются
+  в том же процессе, в том числе при первом `submit`;
+- в Redis (`report_job_redis = True`): очередь — список `report_jobs:queue`, задания —
+  хэши `report_jobs:job:<id>`, незавершённые задания для дедупликации — ключи
+  `report_jobs:active:<хэш параметров>`. Задание может поставить любой процесс, статус
+  виден во всех процессах, а обработчики работают только там, где вызван `start`
+  (в ведущем процессе, `app/cache/leader.py`). Задания, не взятые обработчиками, переживают
+  перезапуск; статус завершённого задания хранится `report_job_redis_ttl` секунд.
+
+Основные компоненты:
+- `ReportJob`: Задание на отчёт и его состояние.
+- `ReportJobQueue`: Ограниченная очередь заданий с пулом обработчиков.
+- `ReportQueueFull`: Очередь заданий переполнена.
+- `report_job_queue`: Общая очередь, используется ботом и API.
+
+Метрики (`ReportJobQueue.stats`):
+- Длина очереди, количество выполняемых, выполненных, неудачных и объединённых заданий.
+- Длительность формирования (средняя и максимальная) и ожидания в очереди.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.cache.redis import init_redis
+from app.reports.builder import build_report
+from app.settings.config import (
+    report_job_workers, report_job_max_queue, report_job_keep_finished, report_job_redis, report_job_redis_ttl
+)
+
+
+# Функция доставки: получает задание, содержимое отчёта и имя файла (или None при ошибке)
+Delivery = Callable[["ReportJob", Optional[bytes], Optional[str]], Awaitable[None]]
+
+# Ключи заданий в Redis
+REDIS_QUEUE_KEY = "report_jobs:queue"
+REDIS_JOB_PREFIX = "report_jobs:job:"
+REDIS_ACTIVE_PREFIX = "report_jobs:active:"
+
+
+def _text(value: Any) -> str:
+    """Значение из Redis (bytes или str) в виде строки."""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class ReportQueueFull(Exception):
+    """Очередь заданий на отчёты переполнена."""
+
+
+class ReportJob:
+    """
+    Задание на формирование отчёта.
+
+    Attributes:
+        id (str): Идентификатор задания.
+        user_id (int): Идентификатор пользователя, запросившего отчёт.
+        period (str): Период отчёта.
+        format (str): Формат отчёта.
+        filters (Optional[Dict[str, Any]]): Фильтры отчёта.
+        chat_id (Optional[int]): Чат, в который доставляется отчёт; None — без доставки.
+        status (str): "queued", "running", "done" или "failed".
+        error (Optional[str]): Текст ошибки для неудачного задания.
+        requests (int): Количество объединённых в задание запросов.
+    """
+    # Поля, которые хранятся в хэше задания в Redis (значения в JSON)
+    FIELDS = (
+        "id", "user_id", "period", "format", "filters", "chat_id", "status", "error",
+        "requests", "size", "created_at", "started_at", "finished_at",
+    )
+
+    def __init__(
+            self, user_id: int,
+            period: str,
+            format: str,
+            filters: Optional[Dict[str, Any]] = None,
+            chat_id: Optional[int] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.period = period
+        self.format = format
+        self.filters = filters
+        self.chat_id = chat_id
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.requests = 1
+        self.size: Optional[int] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def key(self) -> Tuple:
+        """Ключ дедупликации."""
+        filters = tuple(sorted((key, repr(value)) for key, value in (self.filters or {}).items()))
+        return self.user_id, self.period, self.format, filters
+
+    @property
+    def active(self) -> bool:
+        """Задание ещё не завершено."""
+        return self.status in ("queued", "running")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Состояние задания для API.
+
+        Returns:
+            Dict[str, Any]: Параметры, статус, отметки времени и длительности в секундах.
+        """
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "period": self.period,
+            "format": self.format,
+            "filters": self.filters,
+            "status": self.status,
+            "error": self.error,
+            "requests": self.requests,
+            "size": self.size,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wait_seconds": self.started_at - self.created_at if self.started_at else None,
+            "build_seconds": self.finished_at - self.started_at if self.finished_at and self.started_at else None,
+        }
+
+    def to_fields(self) -> Dict[str, str]:
+        """Поля хэша задания в Redis."""
+        return {name: json.dumps(getattr(self, name), ensure_ascii=False) for name in self.FIELDS}
+
+    @classmethod
+    def from_fields(cls, fields: Dict[Any, Any]) -> "ReportJob":
+        """
+        Восстанавливает задание из хэша в Redis.
+
+        Args:
+            fields (Dict[Any, Any]): Результат HGETALL (ключи и значения — bytes или str).
+
+        Returns:
+            ReportJob: Задание.
+        """
+        values = {_text(name): json.loads(value) for name, value in fields.items()}
+        job = cls(values["user_id"], values["period"], values["format"], values["filters"], values["chat_id"])
+        for name in cls.FIELDS:
+            setattr(job, name, values.get(name))
+        return job
+
+
+class ReportJobQueue:
+    """
+    Очередь заданий на отчёты с дедупликацией и пулом обработчиков.
+
+    Attributes:
+        workers (int): Количество обработчиков (одновременно формируемых отчётов).
+        max_queue (int): Максимальная длина очереди заданий.
+        keep_finished (int): Сколько завершённых заданий хранить в памяти для запросов статуса.
+        use_redis (bool): Хранить очередь и задания в Redis (общие для процессов).
+        redis_ttl (float): Время хранения завершённого задания в Redis, секунды.
+        delivery (Optional[Delivery]): Функция доставки готовых отчётов (задаётся ботом).
+    """
+    def __init__(
+            self, workers: int = 2,
+            max_queue: int = 100,
+            keep_finished: int = 1000,
+            use_redis: bool = False,
+            redis_ttl: float = 3600
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.keep_finished = keep_finished
+        self.use_redis = use_redis
+        self.redis_ttl = redis_ttl
+        self.delivery: Optional[Delivery] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._active: Dict[Tuple, ReportJob] = {}
+        self._stopping = False
+        self._queue_depth = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._deduplicated = 0
+        self._build_total = 0.0
+        self._build_max = 0.0
+        self._wait_total = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Запущены ли обработчики очереди."""
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self):
+        """
+        Запускает обработчики очереди. Повторный вызов ничего не делает.
+        """
+        if self.running:
+            return
+        self._stopping = False
+        if self.use_redis:
+            self._tasks = [asyncio.create_task(self._run_redis()) for _ in range(self.workers)]
+        else:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+        logger.info(
+            f"Очередь отчётов запущена ({'Redis' if self.use_redis else 'память процесса'}): "
+            f"обработчиков {self.workers}, очередь до {self.max_queue} заданий."
+        )
+
+    async def stop(self):
+        """
+        Останавливает обработчики. Задания в памяти процесса выполняются до остановки,
+        задания в Redis остаются в очереди для следующего запуска обработчиков.
+        """
+        if not self.running:
+            return
+        # Новые задания не принимаются: они оказались бы в очереди после маркеров остановки
+        self._stopping = True
+        if not self.use_redis:
+            for _ in self._tasks:
+                await self._queue.put(None)  # Маркер остановки для каждого обработчика
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
+        self._stopping = False
+        logger.info(f"Очередь отчётов остановлена. Статистика: {self.stats()}")
+
+    async def submit(
+            self, user_id: int,
+            period: str,
+            format: str = "xlsx",
+            filters: Optional[Dict[str, Any]] = None,
+            chat_id: Optional[int] = None
+    ) -> Tuple[ReportJob, bool]:
+        """
+        Ставит задание в очередь или присоединяется к такому же незавершённому заданию.
+
+        В памяти процесса обработчики запускаются, если ещё не запущены: задание никогда
+        не выполняется в вызывающей задаче, поэтому ответ пользователю не ждёт формирования отчёта.
+        В Redis задание выполнят обработчики ведущего процесса.
+
+        Args:
+            user_id (int): Идентификатор пользователя.
+            period (str): Период отчёта.
+            format (str): Формат отчёта. По умолчанию "xlsx".
+            filters (Optional[Dict[str, Any]]): Фильтры отчёта.
+            chat_id (Optional[int]): Чат для доставки готового отчёта (`delivery`);
+                для объединённого запроса не используется.
+
+        Returns:
+            Tuple[ReportJob, bool]: Задание и признак того, что оно создано этим запросом
+            (False — запрос объединён с уже поставленным заданием).
+
+        Raises:
+            ReportQueueFull: Если очередь заданий заполнена или останавливается.
+        """
+        job = ReportJob(user_id, period, format, filters, chat_id)
+        if self.use_redis:
+            return await self._submit_redis(job)
+
+        if self._stopping:
+            raise ReportQueueFull("Очередь отчётов останавливается")
+        if not self.running:
+            await self.start()
+
+        existing = self._active.get(job.key)
+        if existing is not None:
+            existing.requests += 1
+            self._deduplicated += 1
+            logger.info(f"Запрос отчёта пользователя {user_id} объединён с заданием {existing.id}.")
+            return existing, False
+
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise ReportQueueFull(f"В очереди уже {self._queue.qsize()} заданий")
+        self._active[job.key] = job
+        self._remember(job)
+        logger.info(f"Задание {job.id}: отчёт {period}/{format} для пользователя {user_id} поставлено в очередь.")
+        return job, True
+
+    async def get(self, job_id: str) -> Optional[ReportJob]:
+        """Возвращает задание по идентификатору или None."""
+        if self.use_redis:
+            fields = await (await init_redis()).hgetall(REDIS_JOB_PREFIX + job_id)
+            return ReportJob.from_fields(fields) if fields else None
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает метрики очереди.
+
+        Returns:
+            Dict[str, Any]: Длина очереди (для Redis — по последнему обращению к ней),
+            количество заданий по состояниям в этом процессе и длительности
+            формирования / ожидания в миллисекундах.
+        """
+        finished = self._completed + self._failed
+        if not self.use_redis:
+            self._queue_depth = self._queue.qsize() if self._queue is not None else 0
+        return {
+            "queue_depth": self._queue_depth,
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "deduplicated": self._deduplicated,
+            "avg_build_ms": self._build_total / finished * 1000 if finished else 0,
+            "max_build_ms": self._build_max * 1000,
+            "avg_wait_ms": self._wait_total / finished * 1000 if finished else 0,
+        }
+
+    @staticmethod
+    def _active_key(job: ReportJob) -> str:
+        return REDIS_ACTIVE_PREFIX + hashlib.sha1(repr(job.key).encode()).hexdigest()
+
+    async def _submit_redis(self, job: ReportJob) -> Tuple[ReportJob, bool]:
+        """Ставит задание в очередь в Redis или присоединяется к незавершённому заданию любого процесса."""
+        redis = await init_redis()
+        active_key = self._active_key(job)
+        self._queue_depth = await redis.llen(REDIS_QUEUE_KEY)
+        if self._queue_depth >= self.max_queue:
+            raise ReportQueueFull(f"В очереди уже {self._queue_depth} заданий")
+
+        # Ключ незавершённого задания живёт не дольше redis_ttl: задание процесса,
+        # остановленного во время формирования, не блокирует повторные запросы навсегда
+        if not await redis.set(active_key, job.id, nx=True, ex=int(self.redis_ttl)):
+            existing_id = await redis.get(active_key)
+            if existing_id is not None:
+                existing_key = REDIS_JOB_PREFIX + _text(existing_id)
+                if await redis.hincrby(existing_key, "requests", 1) > 1:
+                    existing = ReportJob.from_fields(await redis.hgetall(existing_key))
+                    if existing.active:
+                        self._deduplicated += 1
+                        logger.info(f"Запрос отчёта пользователя {job.user_id} объединён с заданием {existing.id}.")
+                        return existing, False
+                else:
+                    # Хэш задания уже удалён по TTL: HINCRBY создал пустой хэш
+                    await redis.delete(existing_key)
+            # Задание завершилось между проверками или ключ устарел: создаётся новое задание
+            await redis.set(active_key, job.id, ex=int(self.redis_ttl))
+
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(REDIS_JOB_PREFIX + job.id, mapping=job.to_fields())
+            pipe.expire(REDIS_JOB_PREFIX + job.id, int(self.redis_ttl))
+            pipe.lpush(REDIS_QUEUE_KEY, job.id)
+            await pipe.execute()
+        logger.info(
+            f"Задание {job.id}: отчёт {job.period}/{job.format} для пользователя {job.user_id} поставлено в очередь Redis."
+        )
+        return job, True
+
+    def _remember(self, job: ReportJob):
+        """Сохраняет задание для запросов статуса, вытесняя самые старые завершённые."""
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.keep_finished:
+            oldest = next((job_id for job_id, stored in self._jobs.items() if not stored.active), None)
+            if oldest is None:
+                break
+            del self._jobs[oldest]
+
+    async def _run(self):
+        """Обработчик: выполняет задания из очереди до маркера остановки."""
+        while True:
+            job = await self._queue.get()
+            if job is None:
+                break
+            await self._execute(job)
+
+    async def _run_redis(self):
+        """Обработчик очереди в Redis: берёт задания, пока очередь не останавливается."""
+        while not self._stopping:
+            try:
+                redis = await init_redis()
+                # Ожидание ограничено, чтобы остановка не ждала нового задания
+                item = await redis.brpop([REDIS_QUEUE_KEY], timeout=1)
+                if item is None:
+                    continue
+                job_id = _text(item[1])
+                fields = await redis.hgetall(REDIS_JOB_PREFIX + job_id)
+                self._queue_depth = await redis.llen(REDIS_QUEUE_KEY)
+            except Exception as e:
+                logger.error(f"Ошибка чтения очереди отчётов из Redis: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not fields:
+                logger.warning(f"Задание {job_id} не найдено в Redis, пропущено.")
+                continue
+            await self._execute(ReportJob.from_fields(fields))
+
+    async def _save(self, job: ReportJob, finished: bool = False):
+        """Сохраняет состояние задания в Redis (в памяти процесса задание уже актуально)."""
+        if not self.use_redis:
+            return
+        try:
+            redis = await init_redis()
+            fields = job.to_fields()
+            # Количество объединённых запросов увеличивают другие процессы
+            fields.pop("requests")
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.hset(REDIS_JOB_PREFIX + job.id, mapping=fields)
+                pipe.expire(REDIS_JOB_PREFIX + job.id, int(self.redis_ttl))
+                if finished:
+                    pipe.delete(self._active_key(job))
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Задание {job.id}: не удалось сохранить состояние в Redis: {e}")
+
+    async def _execute(self, job: ReportJob):
+        """Формирует отчёт задания и доставляет его в чат задания."""
+        job.status = "running"
+        job.started_at = time.time()
+        self._running += 1
+        await self._save(job)
+        content = filename = None
+        try:
+            content, filename = await build_report(period=job.period, filters=job.filters, format=job.format)
+            job.status = "done"
+            job.size = len(content)
+            self._completed += 1
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self._failed += 1
+            logger.error(f"Задание {job.id}: ошибка при формировании отчёта: {e}")
+        finally:
+            job.finished_at = time.time()
+            self._running -= 1
+            self._active.pop(job.key, None)
+            build_seconds = job.finished_at - job.started_at
+            self._build_total += build_seconds
+            self._build_max = max(self._build_max, build_seconds)
+            self._wait_total += job.started_at - job.created_at
+        await self._save(job, finished=True)
+
+        logger.info(f"Задание {job.id} завершено ({job.status}) за {build_seconds * 1000:.0f} мс.")
+        if job.chat_id is not None and self.delivery is not None:
+            try:
+                await self.delivery(job, content, filename)
+            except Exception as e:
+                logger.error(f"Задание {job.id}: ошибка доставки отчёта: {e}")
+
+
+# Очередь заданий на отчёты
+report_job_queue = ReportJobQueue(
+    workers=report_job_workers,
+    max_queue=report_job_max_queue,
+    keep_finished=report_job_keep_finished,
+    use_redis=report_job_redis,
+    redis_ttl=report_job_redis_ttl
+)
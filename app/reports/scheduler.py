@@ -0,0 +1,257 @@
+"""
+Модуль предварительного формирования отчётов за стандартные периоды.
+
+Пять периодов бота ("Месяц", "3 месяца", "Полгода", "Год", "Всё время") известны заранее,
+поэтому планировщик `ReportPrebuilder` формирует эти отчёты в фоне и кладёт их в кэш
+отчётов (`app/cache/reports.py`). Запрос пользователя в этом случае обслуживается из кэша
+без чтения транзакций и кодирования файла.
+
+Проходы планировщика выполняются каждые `interval` секунд:
+- в часы низкой нагрузки (`hours`) — для всех пользователей, у которых были транзакции
+  за последние `active_days` дней (по таблице дневных итогов каждого шарда): формируются
+  все отсутствующие в кэше отчёты, неактивные пользователи перестают отслеживаться;
+- в остальное время — только для отслеживаемых пользователей с новыми транзакциями и только
+  те отчёты, предыдущая версия которых ещё в кэше. Вытесненные и устаревшие отчёты в часы
+  нагрузки не пересобираются, их сформирует следующий проход в часы низкой нагрузки.
+
+Предварительно сформированные отчёты хранятся в кэше до начала следующего периода низкой
+нагрузки (`prebuild_ttl`), а не `report_cache_ttl`, поэтому не устаревают в часы нагрузки.
+За один проход формируется не больше `cache_share` от размера кэша отчётов в байтах, чтобы
+проход не вытеснял отчёты, запрошенные пользователями; остальное — в следующих проходах.
+
+Проход инкрементальный: для каждого пользователя сравнивается версия данных (`data_version`)
+с версией последнего формирования. Отчёты формируются по одному, чтобы не занимать
+пул кодирования (`render_pool`), нужный запросам пользователей.
+
+Основные компоненты:
+- `ReportPrebuilder`: Планировщик с фоновой задачей на asyncio.
+- `report_prebuilder`: Общий планировщик по настройкам, запускается вместе с ботом.
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import select
+
+from app.cache.reports import report_cache, data_version
+from app.dao.models import DailyRollup
+from app.dao.shards import shard_router
+from app.reports.builder import REPORT_PERIODS, build_report, user_report_filters
+from app.settings.config import (
+    report_prebuild_interval, report_prebuild_active_days, report_prebuild_hours, report_prebuild_format,
+    report_prebuild_cache_share
+)
+
+
+class ReportPrebuilder:
+    """
+    Планировщик предварительного формирования отчётов.
+
+    Attributes:
+        interval (float): Пауза между проходами, секунды.
+        active_days (int): Пользователь активен, если у него были транзакции за столько дней.
+        hours (Tuple[int, int]): Часы низкой нагрузки [начало, конец) по местному времени.
+        format (str): Формат формируемых отчётов.
+        cache_share (float): Доля размера кэша отчётов, которую может заполнить один проход.
+    """
+    def __init__(
+            self, interval: float = 600,
+            active_days: int = 7,
+            hours: Tuple[int, int] = (0, 6),
+            format: str = "xlsx",
+            cache_share: float = 0.5
+    ):
+        self.interval = interval
+        self.active_days = active_days
+        self.hours = hours
+        self.format = format
+        self.cache_share = cache_share
+        self._task: Optional[asyncio.Task] = None
+        self._versions: Dict[int, Tuple] = {}
+        self._passes = 0
+        self._built = 0
+        self._skipped = 0
+        self._errors = 0
+        self._last_pass_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        """Запущена ли фоновая задача планировщика."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """
+        Запускает фоновую задачу планировщика. Повторный вызов ничего не делает.
+        """
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Предварительное формирование отчётов запущено: каждые {self.interval:.0f} с, "
+            f"полный проход в {self.hours[0]}-{self.hours[1]} ч, активность за {self.active_days} дн."
+        )
+
+    async def stop(self):
+        """
+        Останавливает фоновую задачу (текущий отчёт прерывается).
+        """
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Предварительное формирование отчётов остановлено. Статистика: {self.stats()}")
+
+    def off_peak(self, now: Optional[datetime] = None) -> bool:
+        """Попадает ли момент в часы низкой нагрузки."""
+        start, end = self.hours
+        hour = (now or datetime.now()).hour
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def prebuild_ttl(self, now: Optional[datetime] = None) -> float:
+        """
+        Время жизни предварительно сформированного отчёта: до начала следующего периода
+        низкой нагрузки, но не меньше `interval`.
+
+        Args:
+            now (Optional[datetime]): Момент формирования. По умолчанию — текущее время.
+
+        Returns:
+            float: Время жизни в секундах.
+        """
+        now = now or datetime.now()
+        next_start = now.replace(hour=self.hours[0], minute=0, second=0, microsecond=0)
+        if next_start <= now:
+            next_start += timedelta(days=1)
+        return max((next_start - now).total_seconds(), self.interval)
+
+    async def active_users(self) -> List[int]:
+        """
+        Пользователи с транзакциями за последние `active_days` дней (по дневным итогам всех шардов).
+
+        Returns:
+            List[int]: Идентификаторы пользователей в Telegram.
+        """
+        since = date.today() - timedelta(days=self.active_days)
+        query = select(DailyRollup.user_telegram_id).where(DailyRollup.day >= since).distinct()
+
+        async def fetch(session) -> List[int]:
+            return list((await session.execute(query)).scalars().all())
+
+        results = await shard_router.fan_out(fetch)
+        return sorted({user_id for users in results for user_id in users})
+
+    async def run_once(self, users: Optional[Sequence[int]] = None) -> Dict[str, int]:
+        """
+        Выполняет один проход: формирует устаревшие или отсутствующие в кэше отчёты.
+
+        Args:
+            users (Optional[Sequence[int]]): Пользователи прохода. По умолчанию — активные
+                в часы низкой нагрузки и ранее обработанные в остальное время.
+
+        Returns:
+            Dict[str, int]: Количество сформированных и пропущенных (актуальных) отчётов.
+        """
+        now = datetime.now()
+        full = self.off_peak(now)
+        if users is None:
+            if full:
+                users = await self.active_users()
+                # Пользователи без транзакций за `active_days` дней больше не отслеживаются
+                active = set(users)
+                for user_id in [user_id for user_id in self._versions if user_id not in active]:
+                    del self._versions[user_id]
+            else:
+                users = list(self._versions)
+        started = asyncio.get_running_loop().time()
+        ttl = self.prebuild_ttl(now)
+        budget = report_cache.max_bytes * self.cache_share
+        built = skipped = built_bytes = 0
+
+        for user_id in users:
+            if built_bytes >= budget:
+                logger.info(f"Проход предварительного формирования остановлен: сформировано {built_bytes} байт.")
+                break
+            filters = user_report_filters(user_id)
+            version = await data_version(filters)
+            previous = self._versions.get(user_id)
+            periods = list(REPORT_PERIODS.values())
+            if not full:
+                if previous is None or previous == version:
+                    # Новых транзакций нет: вытесненные отчёты сформирует проход в часы низкой нагрузки
+                    skipped += len(periods)
+                    continue
+                # Обновляются только отчёты, которые пользователь получал и которые ещё в кэше
+                periods = [
+                    period for period in periods
+                    if report_cache.contains(report_cache.key(period, filters, self.format, previous))
+                ]
+            complete = True
+            for period in periods:
+                if report_cache.contains(report_cache.key(period, filters, self.format, version)):
+                    skipped += 1
+                    continue
+                if built_bytes >= budget:
+                    complete = False
+                    break
+                try:
+                    content, _ = await build_report(
+                        period=period, filters=filters, format=self.format, cache_ttl=ttl
+                    )
+                    built += 1
+                    built_bytes += len(content)
+                except Exception as e:
+                    self._errors += 1
+                    logger.warning(f"Предварительное формирование отчёта {period} ({filters}) не удалось: {e}")
+            if complete:
+                self._versions[user_id] = version
+
+        self._passes += 1
+        self._built += built
+        self._skipped += skipped
+        self._last_pass_seconds = asyncio.get_running_loop().time() - started
+        if built:
+            logger.info(f"Предварительно сформировано отчётов: {built}, актуальных: {skipped}.")
+        return {"built": built, "skipped": skipped}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Метрики планировщика.
+
+        Returns:
+            Dict[str, Any]: Количество проходов, сформированных, пропущенных отчётов и ошибок,
+            число отслеживаемых пользователей и длительность последнего прохода в миллисекундах.
+        """
+        return {
+            "passes": self._passes,
+            "built": self._built,
+            "skipped": self._skipped,
+            "errors": self._errors,
+            "tracked": len(self._versions),
+            "last_pass_ms": self._last_pass_seconds * 1000,
+        }
+
+    async def _run(self):
+        """Фоновая задача: проходы с паузой `interval`."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"Ошибка прохода предварительного формирования отчётов: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Планировщик предварительного формирования отчётов бота
+report_prebuilder = ReportPrebuilder(
+    interval=report_prebuild_interval,
+    active_days=report_prebuild_active_days,
+    hours=report_prebuild_hours,
+    format=report_prebuild_format,
+    cache_share=report_prebuild_cache_share
+)
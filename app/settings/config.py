@@ -1 +1,93 @@
-database_url = 'sqlite+aiosqlite:////content/drive/MyDrive/GitHub/financier_bot/data/fin.db'
\ No newline at end of file
+database_url = 'sqlite+aiosqlite:////content/drive/MyDrive/GitHub/financier_bot/data/fin.db'
+
+# Очередь пакетной записи транзакций бота (app/dao/write_queue.py)
+write_queue_max_batch = 500  # Максимум записей в одном пакете
+write_queue_max_delay = 0.05  # Максимальное ожидание пакета, секунды
+
+# Кэш количества записей для пагинации (app/cache/counts.py)
+count_cache_ttl = 60  # Время жизни закэшированного количества, секунды
+count_cache_max_entries = 10000  # Максимум закэшированных запросов
+
+# Подключения к базе данных (app/dao/base.py)
+db_pool_size = 5  # Постоянных подключений в пуле движка записи
+db_max_overflow = 10  # Дополнительных подключений сверх пула
+db_read_pool_size = 10  # Постоянных подключений в пуле движка чтения
+db_read_max_overflow = 20
+db_pool_pre_ping = True  # Проверять подключение перед выдачей из пула
+
+# Профиль производительности SQLite, применяется к каждому новому подключению
+sqlite_journal_mode = "WAL"  # Чтение не блокируется записью
+sqlite_synchronous = "NORMAL"  # В режиме WAL безопасно и без fsync на каждый коммит
+sqlite_mmap_size = 256 * 1024 * 1024  # Байт, отображаемых в память
+sqlite_cache_size = -65536  # Отрицательное значение — размер кэша страниц в КиБ (64 МиБ)
+sqlite_busy_timeout = 5000  # Ожидание блокировки записи, мс
+
+# Шардирование транзакций по пользователям (app/dao/shards.py)
+# Шард 0 — основная база database_url, здесь перечисляются дополнительные базы.
+# Пользователь попадает в шард user_telegram_id % (1 + len(shard_urls)).
+# После изменения списка выполните: python -m app.dao.shards reshard
+shard_urls = []
+reshard_checkpoint_path = "reshard_checkpoint.json"  # Последний перенесённый id по источникам, для продолжения прерванного переноса
+
+# Redis (app/cache/redis.py)
+redis_url = "redis://localhost"
+
+# Кэш готовых отчётов (app/cache/reports.py)
+report_cache_max_bytes = 64 * 1024 * 1024  # Суммарный размер отчётов в памяти процесса
+report_cache_ttl = 3600  # Время жизни отчёта, секунды (границы скользящих периодов сдвигаются)
+report_cache_redis = False  # Второй уровень кэша в Redis, общий для процессов
+
+# Кодирование отчётов вне цикла событий (app/reports/export.py)
+report_render_workers = 2  # Потоков пула = одновременно формируемых отчётов
+report_render_max_pending = 8  # Отчётов в очереди ожидания, сверх — отказ
+
+# Фоновые задания на отчёты (app/reports/jobs.py)
+report_job_workers = 2  # Обработчиков очереди заданий
+report_job_max_queue = 100  # Максимальная длина очереди, сверх — отказ
+report_job_keep_finished = 1000  # Завершённых заданий, доступных для запроса статуса
+report_job_redis = False  # Очередь и статусы заданий в Redis (общие для процессов, нужны при webhook_workers > 1)
+report_job_redis_ttl = 3600  # Хранение задания в Redis, секунды
+
+# Предварительное формирование отчётов за стандартные периоды (app/reports/scheduler.py)
+report_prebuild_enabled = True  # Запускать планировщик вместе с ботом
+report_prebuild_interval = 600  # Пауза между проходами, секунды
+report_prebuild_active_days = 7  # Активный пользователь — с транзакциями за столько дней
+report_prebuild_hours = (0, 6)  # Часы низкой нагрузки [начало, конец) для полного прохода
+report_prebuild_format = "xlsx"  # Формат отчётов, который запрашивает бот
+report_prebuild_cache_share = 0.5  # Доля кэша отчётов (в байтах), которую может заполнить один проход
+
+# Аналитика по транзакциям пользователя (app/reports/analytics.py)
+analytics_rolling_months = 3  # Окно скользящего среднего, месяцы
+analytics_outlier_z = 3.0  # Порог выброса: отклонение от среднего подкатегории в стандартных отклонениях
+analytics_outlier_limit = 10  # Максимум выбросов в ответе
+analytics_cache_max_bytes = 64 * 1024 * 1024  # Размер кэша массивов транзакций пользователей, байты
+
+# Хранилище состояний FSM бота (app/bot/storage.py)
+fsm_redis = False  # Хранить состояния в Redis (общие для нескольких процессов бота и переживают перезапуск)
+fsm_state_ttl = 24 * 3600  # Время жизни состояния пользователя, секунды (незавершённый ввод сбрасывается)
+fsm_data_ttl = 24 * 3600  # Время жизни данных состояния, секунды
+fsm_events_isolation = True  # Блокировка в Redis: обновления одного чата обрабатываются по очереди во всех процессах
+
+# Приём обновлений бота через вебхук (app/bot/webhook.py), запуск: python -m app.main webhook
+webhook_url = ""  # Публичный адрес приложения (https://...), пусто — вебхук не регистрируется при запуске
+webhook_path = "/telegram/webhook"  # Путь эндпоинта вебхука
+webhook_host = "0.0.0.0"
+webhook_port = 8000
+webhook_workers = 1  # Процессов uvicorn; при нескольких процессах нужны fsm_redis, report_job_redis и background_leader
+webhook_max_concurrency = 100  # Одновременно обрабатываемых обновлений в процессе
+webhook_max_pending = 1000  # Принятых и не обработанных обновлений в процессе, сверх — ответ 503
+webhook_max_connections = 40  # Одновременных подключений Telegram к вебхуку (1-100)
+
+# Фоновые задачи в одном процессе из нескольких (app/cache/leader.py)
+background_leader = False  # Обработчики заданий и предварительные отчёты только в ведущем процессе (блокировка в Redis)
+background_leader_ttl = 30  # Время жизни блокировки ведущего, секунды: через столько задачи переходят к другому процессу
+
+# Совместный запуск API и бота в одном цикле событий (app/main.py), запуск: python -m app.main
+api_enabled = True  # Запускать API вместе с ботом; False — только бот
+api_host = "127.0.0.1"  # API администрирования по умолчанию доступен только локально
+api_port = 8000
+api_shutdown_timeout = 10  # Ожидание завершения запросов API при остановке, секунды
+
+# Метрики обработки обновлений бота и запросов API (app/metrics), эндпоинт /metrics
+metrics_enabled = True  # Middleware бота и API: длительность, ошибки и время БД по хэндлерам и маршрутам
+metrics_latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Границы корзин гистограмм, секунды
@@ -0,0 +1,58 @@
+"""Исходная схема: пользователи, категории, подкатегории и транзакции.
+
+Совпадает со схемой, которую создавал `Base.metadata.create_all` до появления миграций.
+Для уже существующей базы данных выполните `alembic stamp 0001`, затем `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("telegram_id", sa.Integer(), nullable=False, unique=True),
+        sa.Column("username", sa.String(), nullable=True),
+    )
+    op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+    )
+    op.create_table(
+        "subcategories",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+    )
+    op.create_table(
+        "transactions",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("user_telegram_id", sa.Integer(), sa.ForeignKey("users.telegram_id"), nullable=False),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=False),
+        sa.Column("subcategory_id", sa.Integer(), sa.ForeignKey("subcategories.id"), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("comment", sa.String(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("transactions")
+    op.drop_table("subcategories")
+    op.drop_table("categories")
+    op.drop_table("users")
@@ -0,0 +1,39 @@
+"""Индексы для основных запросов к транзакциям.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Имя индекса, таблица и колонки — совпадают с __table_args__ в app/dao/models.py
+INDEXES = [
+    ("ix_subcategories_category_id", "subcategories", ["category_id"]),
+    ("ix_transactions_user_date", "transactions", ["user_telegram_id", "date"]),
+    ("ix_transactions_user_subcategory_date", "transactions", ["user_telegram_id", "subcategory_id", "date"]),
+    ("ix_transactions_category_date", "transactions", ["category_id", "date"]),
+    ("ix_transactions_date_id", "transactions", ["date", "id"]),
+]
+
+
+def upgrade() -> None:
+    # if_not_exists: индексы уже есть в базах, созданных через create_all после их объявления в моделях
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+    op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
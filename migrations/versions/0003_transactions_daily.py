@@ -0,0 +1,46 @@
+"""Таблица дневных итогов по транзакциям с первичным заполнением.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transactions_daily",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_telegram_id", sa.Integer(), sa.ForeignKey("users.telegram_id"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=False),
+        sa.Column("subcategory_id", sa.Integer(), sa.ForeignKey("subcategories.id"), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.UniqueConstraint(
+            "user_telegram_id", "day", "category_id", "subcategory_id", name="uq_transactions_daily_key"
+        ),
+    )
+    op.create_index("ix_transactions_daily_day", "transactions_daily", ["day"])
+    # Первичное заполнение — то же, что `python -m app.dao.rollup rebuild`
+    op.execute(
+        "INSERT INTO transactions_daily (user_telegram_id, day, category_id, subcategory_id, total, count) "
+        "SELECT user_telegram_id, date(date), category_id, subcategory_id, sum(amount), count(id) "
+        "FROM transactions GROUP BY user_telegram_id, date(date), category_id, subcategory_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_daily_day", table_name="transactions_daily")
+    op.drop_table("transactions_daily")